@@ -1,74 +1,78 @@
-import yfinance as yf
-import pandas as pd
-import ta
-import subprocess
+import argparse
+import datetime
 import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import gemini_cache
+import market_data
+import ohlcv_cache
+import prompt_encoding
+import scan_metrics
+import trade_ledger
+from compare_stocks import load_watchlist
+
+PROMPT_TEMPLATE_VERSION = "committee-v1"  # 프롬프트 문구를 바꾸면 올려서 이전 응답 캐시를 무효화
+REPORT_DIR = os.path.join("reports", "committee")
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT_SECONDS = 300
+HISTORY_PERIOD = "2y"   # 60주 이평선까지 계산할 수 있는 일봉 기간 (주봉은 여기서 직접 생성)
+DAILY_PERIOD = "1y"     # 일봉 지표/차트에 쓰는 기간
+
+def split_daily_weekly(df_2y):
+    """2년치 일봉 하나로 (최근 1년 일봉, 2년 주봉) 생성 - 주봉은 거래일 기준으로 직접 묶음"""
+    return ohlcv_cache.trim_to_period(df_2y, DAILY_PERIOD), ohlcv_cache.to_weekly(df_2y)
 
 def get_stock_data(ticker):
     print(f"Fetching data for {ticker}...")
-    stock = yf.Ticker(ticker)
-    df_daily = stock.history(period="1y")
-    df_weekly = stock.history(period="2y", interval="1wk")
-    if df_daily.empty or df_weekly.empty:
+    with scan_metrics.stage('fetch'):
+        df_2y = ohlcv_cache.get_history(ticker, period=HISTORY_PERIOD)
+    if df_2y.empty:
         raise ValueError(f"Could not fetch data for {ticker}")
-    return df_daily, df_weekly
+    return split_daily_weekly(df_2y)
 
 def calculate_indicators(df_daily, df_weekly):
-    close = df_daily['Close']
-    ma_values = {
-        'MA5': close.rolling(window=5).mean().iloc[-1],
-        'MA20': close.rolling(window=20).mean().iloc[-1],
-        'MA60': close.rolling(window=60).mean().iloc[-1],
-        'MA90': close.rolling(window=90).mean().iloc[-1],
-        'MA120': close.rolling(window=120).mean().iloc[-1],
-        'MA200': close.rolling(window=200).mean().iloc[-1]
-    }
+    import pandas as pd
+
+    import indicators
+
+    close = df_daily['Close'].to_numpy(dtype=float)
+    high = df_daily['High'].to_numpy(dtype=float)
+    low = df_daily['Low'].to_numpy(dtype=float)
+    ma_values = {f'MA{window}': indicators.last_sma(close, window) for window in (5, 20, 60, 90, 120, 200)}
     ma_values = {k: f"{v:.2f}" if not pd.isna(v) else "N/A" for k, v in ma_values.items()}
 
-    rsi = ta.momentum.RSIIndicator(close, window=14).rsi().iloc[-1]
+    rsi = indicators.last_rsi_ewm(close, 14)
     rsi_str = f"{rsi:.2f}" if not pd.isna(rsi) else "N/A"
 
-    stoch = ta.momentum.StochasticOscillator(high=df_daily['High'], low=df_daily['Low'], close=close, window=14, smooth_window=3)
-    stoch_k = stoch.stoch().iloc[-1]
-    stoch_d = stoch.stoch_signal().iloc[-1]
+    stoch_k, stoch_d = indicators.last_stochastic(high, low, close, window=14, smooth=3)
     stoch_str = f"K: {stoch_k:.2f}, D: {stoch_d:.2f}" if not pd.isna(stoch_k) else "N/A"
 
-    ichimoku = ta.trend.IchimokuIndicator(high=df_daily['High'], low=df_daily['Low'], window1=9, window2=26, window3=52)
-    tenkan = ichimoku.ichimoku_conversion_line().iloc[-1]
-    kijun = ichimoku.ichimoku_base_line().iloc[-1]
-    span_a = ichimoku.ichimoku_a().iloc[-1]
-    span_b = ichimoku.ichimoku_b().iloc[-1]
+    ichimoku = indicators.last_ichimoku(high, low, window1=9, window2=26, window3=52)
+    tenkan = ichimoku['conversion']
+    kijun = ichimoku['base']
+    span_a = ichimoku['span_a']
+    span_b = ichimoku['span_b']
     
-    current_price = close.iloc[-1]
+    current_price = close[-1]
     cloud_status = "위" if current_price > max(span_a, span_b) else "아래" if current_price < min(span_a, span_b) else "내부"
     ichimoku_str = f"전환선({tenkan:.2f}), 기준선({kijun:.2f}), 구름대 {cloud_status}" if not pd.isna(tenkan) else "N/A"
 
-    close_w = df_weekly['Close']
-    wma_values = {
-        'WMA5': close_w.rolling(window=5).mean().iloc[-1],
-        'WMA20': close_w.rolling(window=20).mean().iloc[-1],
-        'WMA60': close_w.rolling(window=60).mean().iloc[-1]
-    }
+    close_w = df_weekly['Close'].to_numpy(dtype=float)
+    wma_values = {f'WMA{window}': indicators.last_sma(close_w, window) for window in (5, 20, 60)}
     wma_values = {k: f"{v:.2f}" if not pd.isna(v) else "N/A" for k, v in wma_values.items()}
 
     return ma_values, wma_values, rsi_str, stoch_str, ichimoku_str
 
-def main():
-    import sys
-    if len(sys.argv) > 1:
-        ticker = sys.argv[1].upper()
-    else:
-        ticker_input = input("분석할 종목의 티커를 입력하세요 (기본값: APP): ").strip().upper()
-        ticker = ticker_input if ticker_input else "APP"
+def build_prompt(ticker, df_daily, df_weekly, encoding=prompt_encoding.DEFAULT_ENCODING, budget=0):
+    """
+    위원회 프롬프트 생성. 차트 데이터는 encoding 방식으로 넣고, budget(추정 토큰)이 있으면
+    전체가 그 안에 들어오도록 오래된 봉부터 뺀다. 반환: (prompt, 섹션별 문자열)
+    """
     portfolio_context = "현재 평단가 $388에 50주 보유 중. 장기 투자 목적."
     trading_activity_feedback = "최근 1주일간 매매 없음. 관망 유지 중."
     previous_report_context = "지난 주 리포트에서는 20일선 지지 여부를 확인하며 홀딩을 권장했음."
-    
-    try:
-        df_daily, df_weekly = get_stock_data(ticker)
-    except Exception as e:
-        print(f"Error fetching data: {e}")
-        return
 
     latest_day = df_daily.iloc[-1]
     current_market_price = latest_day['Close']
@@ -76,11 +80,11 @@ def main():
     l_open, l_high, l_low, l_close, l_vol = latest_day['Open'], latest_day['High'], latest_day['Low'], latest_day['Close'], latest_day['Volume']
 
     recent_100_df = df_daily.tail(100)[['Open', 'High', 'Low', 'Close', 'Volume']]
-    recent_data = recent_100_df.to_string()
 
     ma_values, wma_values, rsi_str, stoch_str, ichimoku_str = calculate_indicators(df_daily, df_weekly)
 
-    prompt = f"""
+    def render(recent_data, n_bars):
+        return f"""
         당신은 단일 분석가가 아닙니다. 당신은 **'AI 투자 위원회(AI Investment Committee)'**입니다.
         이 위원회는 서로 다른 투자 성향을 가진 두 명의 전문가(Expert)와 최종 결정을 내리는 의장(Moderator)으로 구성되어 있습니다.
         **[중요] 클라이언트의 성향: "좋은 기업을 사서 오랫동안 묵혀두는 Buy & Hold 전략"을 선호합니다.**
@@ -123,7 +127,7 @@ def main():
         ---------------------------------------------------
         {previous_report_context}
         ---------------------------------------------------
-        [4. 최근 100일 차트 데이터]
+        [4. 최근 {n_bars}일 차트 데이터]
         {recent_data}
         ### 📝 [분석 가이드라인 (Analysis Guidelines)]
         **[공통 분석 원칙 (Common Guidelines)]**
@@ -266,30 +270,179 @@ def main():
         - **최종 판결:** (의장의 최종 조언 한마디)
         """
 
-    # Save prompt to a temporary file
-    prompt_file = "temp_prompt.txt"
-    with open(prompt_file, "w", encoding="utf-8") as f:
-        f.write(prompt)
+    base = render("", len(recent_100_df))
+    bars_budget = max(budget - prompt_encoding.estimate_tokens(base), 1) if budget else None
+    recent_data, n_bars = prompt_encoding.fit_bars(recent_100_df, encoding, bars_budget)
+    prompt = render(recent_data, n_bars)
+    return prompt, {'지시문/지표': base, f'차트 데이터({encoding}, {n_bars}봉)': recent_data}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AI 투자 위원회 종목 분석 (여러 종목이면 배치 모드)")
+    parser.add_argument('tickers', nargs='*', help="분석할 티커 (생략 시 입력받음, 2개 이상이면 배치 모드)")
+    parser.add_argument('-f', '--file', help="배치 모드: 티커 목록 파일 (한 줄에 하나)")
+    parser.add_argument('--from-ledger', type=int, metavar='K', default=0,
+                        help="배치 모드: 가장 최근 스캔에서 장부에 기록된 상위 K개 신호")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"배치 모드: 동시에 실행할 gemini 수 (기본: {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT_SECONDS,
+                        help=f"배치 모드: gemini 호출당 제한 시간(초, 기본: {DEFAULT_TIMEOUT_SECONDS})")
+    parser.add_argument('--out-dir', default=None,
+                        help=f"배치 모드: 리포트 저장 디렉터리 (기본: {REPORT_DIR}/<오늘 날짜>)")
+    market_data.add_provider_args(parser)
+    gemini_cache.add_cache_args(parser)
+    parser.add_argument('--validate-weekly', action='store_true',
+                        help="직접 만든 주봉을 데이터 소스 주봉과 비교만 하고 종료")
+    prompt_encoding.add_encoding_args(parser)
+    scan_metrics.add_metrics_args(parser)
+    return parser.parse_args(argv)
+
+def fetch_batch_data(tickers):
+    """2년치 일봉을 캐시로 한 번에 받아 종목별 (일봉, 주봉) 생성. 반환: ({ticker: (daily, weekly)}, errors)"""
+    with scan_metrics.stage('fetch'):
+        frames, errors = ohlcv_cache.get_histories(tickers, period=HISTORY_PERIOD)
+    data = {t: split_daily_weekly(frames[t]) for t in tickers if t in frames and not frames[t].empty}
+    for ticker in tickers:
+        if ticker not in data and ticker not in errors:
+            errors[ticker] = "일봉 데이터 없음"
+    return data, errors
+
+def validate_weekly(tickers):
+    """직접 만든 주봉을 데이터 소스의 interval='1wk' 주봉과 비교해 출력"""
+    frames, errors = ohlcv_cache.get_histories(tickers, period=HISTORY_PERIOD)
+    for ticker in tickers:
+        if ticker not in frames:
+            print(f"  [ SKIP] {ticker}: {errors.get(ticker, '일봉 데이터 없음')}")
+            continue
+        reference = market_data.get_provider().history(ticker, period=HISTORY_PERIOD, interval="1wk")
+        compared, mismatches = ohlcv_cache.validate_weekly(frames[ticker], reference)
+        status = "   OK" if compared and mismatches.empty else "  BAD"
+        print(f"  [{status}] {ticker}: {compared}주 비교, 불일치 {len(mismatches)}주")
+        if not mismatches.empty:
+            print(mismatches.round(4).to_string())
+
+def run_batch(tickers, out_dir, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT_SECONDS,
+              encoding=prompt_encoding.DEFAULT_ENCODING, budget=0, report=False):
+    """
+    여러 종목의 프롬프트를 만들고 gemini를 최대 concurrency개씩 동시에 실행해
+    종목별 리포트를 out_dir/<티커>.md 로 저장. 전체 소요 시간은 느린 몇 건 수준이 된다.
+    반환: {ticker: (상태, 소요 초, 리포트 경로 또는 오류)}
+    """
+    print(f"[AI Investment Committee] Batch: {len(tickers)} tickers, concurrency {concurrency}, timeout {timeout:.0f}s")
+    data, errors = fetch_batch_data(tickers)
+    outcomes = {t: ("FETCH_ERROR", 0.0, reason) for t, reason in errors.items()}
+    scan_metrics.skip(scan_metrics.SKIP_FETCH_ERROR, len(errors))
+    os.makedirs(out_dir, exist_ok=True)
+
+    def analyze(ticker):
+        started = time.time()
+        with scan_metrics.stage('prompt'):
+            prompt, sections = build_prompt(ticker, *data[ticker], encoding=encoding, budget=budget)
+        if report:
+            print(f"[{ticker}] 프롬프트 크기\n{prompt_encoding.size_report(sections)}")
+        try:
+            result, cached = gemini_cache.run_gemini(prompt, PROMPT_TEMPLATE_VERSION, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return "TIMEOUT", time.time() - started, f"{timeout:.0f}초 초과"
+        except Exception as e:
+            return "ERROR", time.time() - started, str(e)
+        if result.returncode != 0:
+            return "ERROR", time.time() - started, result.stderr.strip()[:200]
+        path = os.path.join(out_dir, f"{ticker}.md")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(result.stdout)
+        return ("CACHED" if cached else "OK"), time.time() - started, path
+
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+        futures = {pool.submit(analyze, ticker): ticker for ticker in data}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            outcomes[ticker] = future.result()
+            status, elapsed, detail = outcomes[ticker]
+            scan_metrics.ticker_latency(elapsed)
+            scan_metrics.count(status.lower())
+            print(f"  [{status:>7}] {ticker} ({elapsed:.1f}s) {detail}")
+    return {t: outcomes[t] for t in tickers if t in outcomes}
+
+def resolve_tickers(args):
+    """인자/파일/장부 상위 신호에서 분석할 티커 목록 (순서 유지, 중복 제거)"""
+    tickers = [t.upper() for t in args.tickers]
+    if args.file:
+        tickers.extend(load_watchlist(args.file))
+    if args.from_ledger:
+        with trade_ledger.open_ledger() as conn:
+            tickers.extend(trade_ledger.top_signals(conn, args.from_ledger)['Ticker'])
+    return list(dict.fromkeys(tickers))
+
+def analyze_one(ticker, args):
+    """단일 종목 리포트를 요청해 출력. 반환: {'ticker', 'report': 응답 또는 None, 'cached': bool}"""
+    outcome = {'ticker': ticker, 'report': None, 'cached': False}
+    try:
+        df_daily, df_weekly = get_stock_data(ticker)
+    except Exception as e:
+        print(f"Error fetching data: {e}")
+        return outcome
+
+    with scan_metrics.stage('prompt'):
+        prompt, sections = build_prompt(ticker, df_daily, df_weekly, args.encoding, args.prompt_budget)
+    if args.prompt_report:
+        print(prompt_encoding.size_report(sections))
 
     print("\n[AI Investment Committee] Requesting analysis from gemini-cli...")
     try:
-        # Call gemini-cli. Adjust the command depending on how gemini-cli is installed.
-        # Assuming the command is `gemini` and it takes input from a file or stdin.
-        # Here we pipe the file content to gemini
-        import shlex
-        escaped_prompt = shlex.quote(prompt)
-        result = subprocess.run(f"export PATH=$PATH:/usr/sbin:/usr/bin:/sbin:/bin && gemini -p {escaped_prompt}", shell=True, capture_output=True, text=True)
+        result, cached = gemini_cache.run_gemini(prompt, PROMPT_TEMPLATE_VERSION)
+        if cached:
+            print("[AI Investment Committee] Reusing cached response for identical data (--no-gemini-cache to refresh)")
         print("\n" + "="*50 + "\n")
         print(result.stdout)
         if result.stderr:
             print(f"Errors/Warnings:\n{result.stderr}")
         print("\n" + "="*50 + "\n")
+        if result.returncode == 0:
+            outcome.update(report=result.stdout, cached=cached)
     except Exception as e:
         print(f"Error calling gemini-cli: {e}")
-    finally:
-        # Clean up
-        if os.path.exists(prompt_file):
-            os.remove(prompt_file)
+    print(gemini_cache.report())
+    return outcome
+
+def analyze_many(tickers, args):
+    """배치 모드. 반환: {ticker: (상태, 소요 초, 리포트 경로 또는 오류)}"""
+    out_dir = args.out_dir or os.path.join(REPORT_DIR, datetime.date.today().isoformat())
+    started = time.time()
+    outcomes = run_batch(tickers, out_dir, args.concurrency, args.timeout,
+                         args.encoding, args.prompt_budget, args.prompt_report)
+    done = sum(1 for status, _, _ in outcomes.values() if status in ("OK", "CACHED"))
+    print(f"\n[AI Investment Committee] {done}/{len(tickers)} reports in {out_dir} ({time.time() - started:.1f}s)")
+    print(gemini_cache.report())
+    return outcomes
+
+def is_batch(args, tickers):
+    return len(tickers) > 1 or bool(args.file) or bool(args.from_ledger)
+
+def main():
+    args = parse_args()
+    market_data.configure_from_args(args)
+    gemini_cache.configure_from_args(args)
+    tickers = resolve_tickers(args)
+    if args.validate_weekly:
+        validate_weekly(tickers or ["APP"])
+        return
+    if is_batch(args, tickers):
+        if not tickers:
+            print("분석할 종목이 없습니다.")
+            return
+        with scan_metrics.profiled(args.profile):
+            analyze_many(tickers, args)
+        scan_metrics.finish(args, 'committee')
+        return
+
+    if tickers:
+        ticker = tickers[0]
+    else:
+        ticker_input = input("분석할 종목의 티커를 입력하세요 (기본값: APP): ").strip().upper()
+        ticker = ticker_input if ticker_input else "APP"
+    with scan_metrics.profiled(args.profile):
+        analyze_one(ticker, args)
+    scan_metrics.finish(args, 'committee')
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,251 @@
+"""
+simple_scanner 롱/숏 점수 규칙의 과거 성과를 전 종목·전 기간에 대해 한 번에 검증하는 백테스터.
+- indicator_panel 로 (봉 × 티커) 지표를 계산하고, 스캐너와 같은 scoring_rules 규칙을 불리언 배열로 평가
+- 신호가 난 날 종가에 진입, ATR 기반 SL/TP 중 먼저 닿는 봉에서 청산 (같은 봉이면 손절 우선)
+- 적중률, 기대수익(expectancy), 평균 보유 기간을 보고
+
+주의: 실 스캔은 매번 최근 1년 창에서 EMA를 새로 시작하지만 백테스트는 전체 이력으로 이어서
+계산하므로 EMA200 등이 조금 다를 수 있다. 규칙(조건/가중치/SL·TP 배수)은 동일하다.
+"""
+
+import argparse
+
+# numpy/pandas 는 쓰는 함수 안에서 import (--help 를 바로 출력하도록)
+import market_data
+import ohlcv_cache
+import scoring_rules
+from simple_scanner import (
+    ATR_PERIOD,
+    LEDGER_MIN_SCORE,
+    RSI_PERIOD,
+    TREND_FAST_EMA,
+    TREND_SLOW_EMA,
+    build_watchlists,
+)
+
+DEFAULT_PERIOD = "5y"
+DEFAULT_MAX_HOLD = 60      # 봉 수, 이 안에 SL/TP가 안 나오면 종가 청산
+DEFAULT_MIN_SCORE = LEDGER_MIN_SCORE  # 가상 매매 장부에 기록되는 강한 신호 기준과 동일
+
+OUTCOME_OPEN, OUTCOME_STOP, OUTCOME_TARGET, OUTCOME_TIME = 0, 1, 2, 3
+OUTCOME_LABELS = {
+    OUTCOME_OPEN: 'OPEN',
+    OUTCOME_STOP: 'SL',
+    OUTCOME_TARGET: 'TP',
+    OUTCOME_TIME: 'TIME',
+}
+
+
+def _prev(values):
+    import numpy as np
+
+    shifted = np.full_like(values, np.nan)
+    shifted[1:] = values[:-1]
+    return shifted
+
+
+def score_panel(fields, ind, rules):
+    """
+    scoring_rules 규칙을 모든 (봉, 티커)에 대해 한 번에 평가 (스캐너와 같은 RuleSet).
+    반환: RuleSet.evaluate 결과 - 'valid' 는 스캐너처럼 이력이 충분히 쌓인 봉만 True
+    """
+    import numpy as np
+
+    current = dict(fields)
+    current.update(ind)
+    previous = {name: _prev(current[name]) for name in rules.previous_fields}
+    result = rules.evaluate(current, previous)
+    bars_seen = np.cumsum(~np.isnan(fields['Close']), axis=0)
+    result['valid'] = result['valid'] & (bars_seen >= TREND_SLOW_EMA + 20)
+    return result
+
+
+def find_exits(open_, high, low, close, entry_rows, cols, is_long, stop, target, max_hold):
+    """
+    진입 봉 다음 봉부터 max_hold 봉 안에서 SL/TP에 처음 닿는 봉을 모든 거래에 대해 한 번에 탐색.
+    open_/high/low/close는 (T, N) 배열, 나머지는 거래별 (M,) 배열.
+    갭으로 가격을 건너뛰면 시가에 체결, 같은 봉에서 둘 다 닿으면 손절로 처리.
+    반환: (exit_rows, exit_prices, outcomes)
+    """
+    import numpy as np
+
+    n_rows = close.shape[0]
+    offsets = np.arange(1, max_hold + 1)
+    rows = entry_rows[:, None] + offsets[None, :]
+    in_range = rows < n_rows
+    rows = np.minimum(rows, n_rows - 1)
+    col_idx = cols[:, None]
+
+    bar_high = high[rows, col_idx]
+    bar_low = low[rows, col_idx]
+    bar_open = open_[rows, col_idx]
+    in_range &= ~np.isnan(close[rows, col_idx])
+
+    long_ = is_long[:, None]
+    with np.errstate(invalid='ignore'):
+        stop_hit = in_range & np.where(long_, bar_low <= stop[:, None], bar_high >= stop[:, None])
+        target_hit = in_range & np.where(long_, bar_high >= target[:, None], bar_low <= target[:, None])
+    any_hit = stop_hit | target_hit
+    has_hit = any_hit.any(axis=1)
+    first = any_hit.argmax(axis=1)
+
+    trade_idx = np.arange(len(entry_rows))
+    first_open = bar_open[trade_idx, first]
+    is_stop = stop_hit[trade_idx, first]
+    stop_fill = np.where(is_long, np.fmin(first_open, stop), np.fmax(first_open, stop))
+    target_fill = np.where(is_long, np.fmax(first_open, target), np.fmin(first_open, target))
+
+    last_offset = in_range.sum(axis=1) - 1
+    completed = last_offset == max_hold - 1
+
+    exit_rows = np.where(has_hit, rows[trade_idx, first], rows[trade_idx, np.maximum(last_offset, 0)])
+    exit_prices = np.where(
+        has_hit,
+        np.where(is_stop, stop_fill, target_fill),
+        close[exit_rows, cols],
+    )
+    outcomes = np.where(
+        has_hit,
+        np.where(is_stop, OUTCOME_STOP, OUTCOME_TARGET),
+        np.where(completed, OUTCOME_TIME, OUTCOME_OPEN),
+    )
+    no_bars = last_offset < 0
+    exit_rows = np.where(no_bars, entry_rows, exit_rows)
+    exit_prices = np.where(no_bars, np.nan, exit_prices)
+    return exit_rows, exit_prices, outcomes
+
+
+def run_backtest(frames, watchlist=None, max_hold=DEFAULT_MAX_HOLD, min_score=DEFAULT_MIN_SCORE, rules=None):
+    """
+    frames: {ticker: 일봉 DataFrame}, rules: scoring_rules.RuleSet (기본: 현재 설정된 규칙). 반환: 거래별 DataFrame
+    (진입/청산 날짜, 방향, 점수, 진입가, SL, TP, 청산가, 결과, 수익률%, 보유 봉 수)
+    """
+    import numpy as np
+    import pandas as pd
+
+    import indicator_panel
+
+    tickers, fields, _ = indicator_panel.build_panel(frames)
+    if not tickers:
+        return pd.DataFrame()
+    ind = indicator_panel.compute_indicators(
+        fields,
+        rsi_period=RSI_PERIOD,
+        fast_ema=TREND_FAST_EMA,
+        slow_ema=TREND_SLOW_EMA,
+        atr_period=ATR_PERIOD,
+    )
+    rules = rules or scoring_rules.get_rules()
+    close, atr = fields['Close'], ind['ATR14']
+
+    # 스캐너와 같은 방향 선택 (RuleSet.select)
+    side, score = rules.select(score_panel(fields, ind, rules))
+    selected = (side >= 0) & (score >= min_score)
+
+    entry_rows, cols = np.nonzero(selected)
+    if len(entry_rows) == 0:
+        return pd.DataFrame()
+    trade_side = side[entry_rows, cols]
+    is_long = np.array([s['direction'] > 0 for s in rules.sides])[trade_side]
+    entry = close[entry_rows, cols]
+    trade_atr = atr[entry_rows, cols]
+    stop, target = rules.exits(trade_side, entry, trade_atr)
+
+    exit_rows, exit_prices, outcomes = find_exits(
+        fields['Open'], fields['High'], fields['Low'], close,
+        entry_rows, cols, is_long, stop, target, max_hold,
+    )
+    returns = np.where(is_long, exit_prices / entry - 1, 1 - exit_prices / entry) * 100
+
+    # 오른쪽 정렬된 행 번호를 각 티커의 실제 날짜로 변환
+    dates = indicator_panel.build_dates(frames, tickers, close.shape[0])
+
+    trades = pd.DataFrame({
+        'ticker': [tickers[c] for c in cols],
+        'entry_date': dates[entry_rows, cols],
+        'exit_date': dates[exit_rows, cols],
+        'type': np.array([s['name'].upper() for s in rules.sides])[trade_side],
+        'score': score[entry_rows, cols],
+        'entry': entry,
+        'stop_loss': stop,
+        'take_profit': target,
+        'exit': exit_prices,
+        'outcome': [OUTCOME_LABELS[o] for o in outcomes],
+        'return_pct': returns,
+        'bars_held': exit_rows - entry_rows,
+    })
+    if watchlist:
+        trades.insert(1, 'name', trades['ticker'].map(watchlist))
+    return trades.sort_values(['entry_date', 'ticker'], kind='stable').reset_index(drop=True)
+
+
+def summarize(trades):
+    """방향별 거래 수, 적중률(TP/(TP+SL)), 승률, 기대수익, 평균 보유 봉 수"""
+    import numpy as np
+    import pandas as pd
+
+    rows = []
+    closed = trades[trades['outcome'] != 'OPEN']
+    for label, group in [('ALL', closed)] + list(closed.groupby('type')):
+        decided = group['outcome'].isin(['TP', 'SL'])
+        hits = (group['outcome'] == 'TP').sum()
+        rows.append({
+            'type': label,
+            'trades': len(group),
+            'hit_rate_pct': hits / decided.sum() * 100 if decided.any() else np.nan,
+            'win_rate_pct': (group['return_pct'] > 0).mean() * 100 if len(group) else np.nan,
+            'expectancy_pct': group['return_pct'].mean(),
+            'avg_bars_held': group['bars_held'].mean(),
+            'timeouts': (group['outcome'] == 'TIME').sum(),
+        })
+    return pd.DataFrame(rows).set_index('type')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Smart Stock Radar 점수 규칙 백테스트")
+    parser.add_argument('--period', default=DEFAULT_PERIOD, help="과거 데이터 기간 (예: 2y, 5y)")
+    parser.add_argument('--market', choices=('KR', 'US', 'ALL'), default='ALL')
+    parser.add_argument('--max-hold', type=int, default=DEFAULT_MAX_HOLD, help="최대 보유 봉 수")
+    parser.add_argument('--min-score', type=int, default=DEFAULT_MIN_SCORE, help="진입할 최소 점수")
+    parser.add_argument('--trades-csv', help="거래 내역을 저장할 CSV 경로")
+    scoring_rules.add_rules_args(parser)
+    market_data.add_provider_args(parser)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    market_data.configure_from_args(args)
+    scoring_rules.configure_from_args(args)
+
+    watchlist_kr, watchlist_us = market_data.get_provider().watchlists(build_watchlists)
+    markets = {'KR': watchlist_kr, 'US': watchlist_us}
+    selected = markets if args.market == 'ALL' else {args.market: markets[args.market]}
+
+    all_trades = []
+    for market, watchlist in selected.items():
+        frames, errors = ohlcv_cache.get_histories(watchlist.keys(), period=args.period)
+        for ticker, reason in errors.items():
+            print(f"⚠️ {ticker}: {reason}")
+        trades = run_backtest(frames, watchlist, args.max_hold, args.min_score)
+        if not trades.empty:
+            trades.insert(2, 'market', market)
+            all_trades.append(trades)
+
+    if not all_trades:
+        print("백테스트 기간 동안 조건을 만족한 신호가 없습니다.")
+        return
+    import pandas as pd
+
+    trades = pd.concat(all_trades, ignore_index=True)
+
+    print(f"📈 백테스트 ({args.period}, 최소 {args.min_score}점, 최대 보유 {args.max_hold}봉)")
+    print("-" * 70)
+    print(summarize(trades).round(2).to_string())
+    if args.trades_csv:
+        trades.to_csv(args.trades_csv, index=False, encoding='utf-8-sig')
+        print(f"\n거래 내역 저장: {args.trades_csv}")
+
+
+if __name__ == "__main__":
+    main()
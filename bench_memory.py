@@ -0,0 +1,111 @@
+"""
+스캔 최대 메모리(peak RSS) 벤치마크 + 회귀 검사.
+- 합성 시세(--provider synthetic)로 유니버스 크기를 키워 가며 simple_scanner 를 새 프로세스에서 실행
+- 기본(일괄) 모드와 --stream 모드의 최대 RSS 를 비교
+--stream 의 최대 RSS 가 가장 작은 유니버스 대비 GROWTH_BUDGET 배를 넘으면 종료 코드 1 (CI 등에서 회귀 검사로 사용).
+
+    python3 bench_memory.py                        # 표 출력 + 예산 검사
+    python3 bench_memory.py --sizes 500 3000       # 시장별 유니버스 크기 지정
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SIZES = (300, 1500, 4000)   # 시장별 종목 수 (KOSPI+KOSDAQ / Russell 3000 규모까지)
+MODES = (
+    ("일괄", []),
+    ("--stream", ['--stream']),
+)
+GROWTH_BUDGET = 1.25   # --stream 최대 RSS 가 가장 작은 유니버스 대비 늘어나도 되는 배수
+
+# 자식 프로세스: 스캐너 실행 후 자신의 최대 RSS(KB)를 마지막 줄에 출력
+_CHILD = """
+import resource, sys
+import simple_scanner
+sys.argv = ['simple_scanner.py'] + sys.argv[1:]
+simple_scanner.main()
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(peak // 1024 if sys.platform == 'darwin' else peak)   # macOS 는 바이트 단위
+"""
+
+
+def _env(workdir):
+    env = os.environ.copy()
+    env['PYTHONPATH'] = HERE + os.pathsep + env.get('PYTHONPATH', '')
+    env['SIMPLESTOCK_LEDGER_DB'] = os.path.join(workdir, "paper_trades.db")
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+    return env
+
+
+def peak_rss_kb(size, extra, seed=0):
+    """빈 작업 디렉터리(캐시/장부 없음)에서 스캔 1회를 실행한 최대 RSS (KB)"""
+    with tempfile.TemporaryDirectory() as workdir:
+        argv = [sys.executable, '-c', _CHILD, '--provider', 'synthetic',
+                '--universe-size', str(size), '--seed', str(seed)] + extra
+        out = subprocess.run(argv, env=_env(workdir), cwd=workdir, capture_output=True, text=True)
+    if out.returncode != 0:
+        tail = out.stderr.strip().splitlines()
+        raise RuntimeError(f"스캔 실패 (size={size} {' '.join(extra)}): {tail[-1] if tail else out.returncode}")
+    return int(out.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, seed=0):
+    """반환: {모드: {유니버스 크기: 최대 RSS KB}}"""
+    return {label: {size: peak_rss_kb(size, extra, seed) for size in sizes} for label, extra in MODES}
+
+
+def check_budgets(results, growth_budget=GROWTH_BUDGET):
+    """--stream 최대 RSS 증가 배수가 예산을 넘는 항목 (비어 있으면 통과)"""
+    failures = []
+    stream = results['--stream']
+    smallest = stream[min(stream)]
+    for size, peak in stream.items():
+        if peak > smallest * growth_budget:
+            failures.append(f"--stream {size}종목: {peak / 1024:.0f}MB > {smallest / 1024:.0f}MB x {growth_budget}")
+    return failures
+
+
+def print_report(results):
+    sizes = sorted(next(iter(results.values())))
+    print(f"{'시장별 종목 수':<16}" + "".join(f"{size:>12,}" for size in sizes))
+    for label, peaks in results.items():
+        print(f"{label:<16}" + "".join(f"{peaks[size] / 1024:>10.0f}MB" for size in sizes))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="스캔 최대 메모리 벤치마크 (일괄 vs --stream)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help=f"합성 유니버스의 시장별 종목 수 (기본: {' '.join(map(str, DEFAULT_SIZES))})")
+    parser.add_argument('--seed', type=int, default=0, help="합성 시세 시드")
+    parser.add_argument('--growth-budget', type=float, default=GROWTH_BUDGET,
+                        help=f"--stream 최대 RSS 증가 배수 상한 (기본: {GROWTH_BUDGET})")
+    parser.add_argument('--json', metavar='PATH', help="측정 결과를 JSON 으로 저장")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    results = run_benchmark(sorted(set(args.sizes)), args.seed)
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+
+    failures = check_budgets(results, args.growth_budget)
+    print("-" * 60)
+    if failures:
+        print("❌ 메모리 회귀:")
+        for failure in failures:
+            print(f"   - {failure}")
+        sys.exit(1)
+    print("✅ --stream 최대 메모리가 유니버스 크기와 무관하게 유지됩니다.")
+
+
+if __name__ == "__main__":
+    main()
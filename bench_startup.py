@@ -0,0 +1,184 @@
+"""
+CLI 시작 시간 벤치마크 + 회귀 검사.
+- 모듈별 import 시간: 새 인터프리터에서 `import 모듈` 만 실행한 시간 (빈 인터프리터 시작 시간 제외)
+- 첫 출력까지의 시간: --help, 사용법 출력, 장부 없음 안내처럼 실제 작업이 없는 빠른 경로
+- 무거운 모듈(numpy/pandas/yfinance 등)이 import 만으로 딸려 오는지 확인
+예산을 넘거나 무거운 모듈이 딸려 오면 종료 코드 1 (CI 등에서 회귀 검사로 사용).
+
+    python3 bench_startup.py                 # 표 출력 + 예산 검사
+    python3 bench_startup.py --detail        # 모듈마다 import 누적 시간 상위 항목(-X importtime)
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+ENTRY_MODULES = (
+    'simple_scanner',
+    'compare_stocks',
+    'ai_investment_committee_cli',
+    'portfolio_tracker',
+    'backtest',
+    'trade_ledger',
+    'watch',
+)
+# (이름, 스크립트 인자) - 실제 작업 없이 바로 출력하고 끝나는 경로
+QUICK_COMMANDS = (
+    ("simple_scanner --help", ['simple_scanner.py', '--help']),
+    ("compare_stocks (사용법)", ['compare_stocks.py']),
+    ("committee --help", ['ai_investment_committee_cli.py', '--help']),
+    ("portfolio_tracker (장부 없음)", ['portfolio_tracker.py']),
+    ("backtest --help", ['backtest.py', '--help']),
+    ("trade_ledger --help", ['trade_ledger.py', '--help']),
+    ("watch --help", ['watch.py', '--help']),
+)
+HEAVY_MODULES = ('numpy', 'pandas', 'yfinance', 'requests', 'bs4', 'pyarrow', 'lxml')
+
+DEFAULT_REPEAT = 5
+IMPORT_BUDGET_MS = 100        # 빈 인터프리터 대비 import 추가 시간 상한
+FIRST_OUTPUT_BUDGET_MS = 150  # 빈 인터프리터 대비 첫 출력까지 추가 시간 상한
+DETAIL_TOP = 8
+
+
+def _env(workdir):
+    env = os.environ.copy()
+    env['PYTHONPATH'] = HERE + os.pathsep + env.get('PYTHONPATH', '')
+    # 장부/캐시가 없는 빈 디렉터리에서 실행해 '장부 없음' 같은 빠른 경로를 재현
+    env['SIMPLESTOCK_LEDGER_DB'] = os.path.join(workdir, "paper_trades.db")
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+    return env
+
+
+def _best_of(repeat, run):
+    return min(run() for _ in range(repeat))
+
+
+def _run_ms(argv, env, cwd):
+    started = time.perf_counter()
+    subprocess.run(argv, env=env, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - started) * 1000
+
+
+def _first_output_ms(argv, env, cwd):
+    """프로세스 시작부터 stdout 첫 바이트까지 (출력이 없으면 종료까지)"""
+    started = time.perf_counter()
+    proc = subprocess.Popen(argv, env=env, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            stdin=subprocess.DEVNULL)
+    proc.stdout.read(1)
+    elapsed = (time.perf_counter() - started) * 1000
+    proc.stdout.read()
+    proc.wait()
+    return elapsed
+
+
+def heavy_imports(module, env, cwd):
+    """module 을 import 했을 때 같이 로드되는 무거운 모듈 목록"""
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, '-c', code], env=env, cwd=cwd, capture_output=True, text=True)
+    if out.returncode != 0:
+        return [f"import 실패: {out.stderr.strip().splitlines()[-1] if out.stderr.strip() else out.returncode}"]
+    return [m for m in out.stdout.strip().split(',') if m]
+
+
+def import_breakdown(module, env, cwd, top=DETAIL_TOP):
+    """-X importtime 결과에서 누적 시간이 큰 import 상위 top개 [(누적 ms, 이름)]"""
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                         env=env, cwd=cwd, capture_output=True, text=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def run_benchmark(repeat=DEFAULT_REPEAT, detail=False):
+    """반환: {'baseline_ms', 'imports': {모듈: {...}}, 'commands': {이름: {...}}}"""
+    with tempfile.TemporaryDirectory() as workdir:
+        env = _env(workdir)
+        baseline = _best_of(repeat, lambda: _run_ms([sys.executable, '-c', 'pass'], env, workdir))
+        results = {'baseline_ms': baseline, 'imports': {}, 'commands': {}}
+
+        for module in ENTRY_MODULES:
+            total = _best_of(repeat, lambda: _run_ms([sys.executable, '-c', f"import {module}"], env, workdir))
+            entry = {'total_ms': total, 'extra_ms': total - baseline, 'heavy': heavy_imports(module, env, workdir)}
+            if detail:
+                entry['breakdown'] = import_breakdown(module, env, workdir)
+            results['imports'][module] = entry
+
+        for label, args in QUICK_COMMANDS:
+            argv = [sys.executable, os.path.join(HERE, args[0])] + args[1:]
+            total = _best_of(repeat, lambda: _first_output_ms(argv, env, workdir))
+            results['commands'][label] = {'total_ms': total, 'extra_ms': total - baseline}
+    return results
+
+
+def check_budgets(results, import_budget=IMPORT_BUDGET_MS, output_budget=FIRST_OUTPUT_BUDGET_MS):
+    """예산 초과/무거운 import 목록 (비어 있으면 통과)"""
+    failures = []
+    for module, entry in results['imports'].items():
+        if entry['extra_ms'] > import_budget:
+            failures.append(f"import {module}: +{entry['extra_ms']:.0f}ms > {import_budget:.0f}ms")
+        if entry['heavy']:
+            failures.append(f"import {module}: 무거운 모듈 로드 ({', '.join(entry['heavy'])})")
+    for label, entry in results['commands'].items():
+        if entry['extra_ms'] > output_budget:
+            failures.append(f"{label}: 첫 출력 +{entry['extra_ms']:.0f}ms > {output_budget:.0f}ms")
+    return failures
+
+
+def print_report(results):
+    print(f"빈 인터프리터 시작: {results['baseline_ms']:.0f}ms (아래 '+' 는 이 시간을 뺀 값)")
+    print(f"\n{'모듈 import':<32} {'전체':>8} {'추가':>8}  무거운 모듈")
+    for module, entry in results['imports'].items():
+        heavy = ", ".join(entry['heavy']) or "-"
+        print(f"{module:<32} {entry['total_ms']:>6.0f}ms {entry['extra_ms']:>+6.0f}ms  {heavy}")
+        for cumulative, name in entry.get('breakdown', []):
+            print(f"    {cumulative:>8.1f}ms  {name}")
+    print(f"\n{'첫 출력까지':<32} {'전체':>8} {'추가':>8}")
+    for label, entry in results['commands'].items():
+        print(f"{label:<32} {entry['total_ms']:>6.0f}ms {entry['extra_ms']:>+6.0f}ms")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="CLI 시작 시간 벤치마크 (import 시간 / 첫 출력까지의 시간)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="측정 반복 횟수 (최솟값 사용)")
+    parser.add_argument('--import-budget-ms', type=float, default=IMPORT_BUDGET_MS,
+                        help=f"모듈 import 추가 시간 상한 (기본: {IMPORT_BUDGET_MS}ms)")
+    parser.add_argument('--output-budget-ms', type=float, default=FIRST_OUTPUT_BUDGET_MS,
+                        help=f"첫 출력까지 추가 시간 상한 (기본: {FIRST_OUTPUT_BUDGET_MS}ms)")
+    parser.add_argument('--detail', action='store_true', help="모듈별 import 누적 시간 상위 항목 출력")
+    parser.add_argument('--json', metavar='PATH', help="측정 결과를 JSON 으로 저장")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    results = run_benchmark(max(args.repeat, 1), args.detail)
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+
+    failures = check_budgets(results, args.import_budget_ms, args.output_budget_ms)
+    print("-" * 60)
+    if failures:
+        print("❌ 시작 시간 회귀:")
+        for failure in failures:
+            print(f"   - {failure}")
+        sys.exit(1)
+    print("✅ 모든 진입점이 시작 시간 예산 안에 있습니다.")
+
+
+if __name__ == "__main__":
+    main()
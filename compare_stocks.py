@@ -1,57 +1,37 @@
-import yfinance as yf
-import pandas as pd
-import subprocess
+import argparse
 import sys
-import math
-import os
+import time
+
+import gemini_cache
+import indicator_state
+import market_data
+import ohlcv_cache
+import prompt_encoding
+import scan_metrics
+
+RSI_PERIOD = 14
+BB_PERIOD = 20
+BB_STD_DEV = 2
+HISTORY_PERIOD = "6mo"
+PROMPT_TEMPLATE_VERSION = "compare-v2"  # 프롬프트 문구를 바꾸면 올려서 이전 응답 캐시를 무효화
+
 
 def calculate_indicators(prices):
+    import numpy as np
+
+    import indicators
+
+    prices = np.asarray(prices, dtype=np.float64)
     if len(prices) < 50: return None
-    # RSI
-    RSI_PERIOD = 14
-    gains, losses = [], []
-    for i in range(1, len(prices)):
-        delta = prices[i] - prices[i-1]
-        if delta > 0: gains.append(delta); losses.append(0)
-        else: gains.append(0); losses.append(abs(delta))
-    
-    avg_gain = sum(gains[:RSI_PERIOD]) / RSI_PERIOD
-    avg_loss = sum(losses[:RSI_PERIOD]) / RSI_PERIOD
-    
-    if avg_loss == 0:
-        rsi = 100
-    else:
-        rsi = 100 - (100 / (1 + (avg_gain / avg_loss)))
-    
-    for i in range(RSI_PERIOD, len(gains)):
-        avg_gain = (avg_gain * (RSI_PERIOD - 1) + gains[i]) / RSI_PERIOD
-        avg_loss = (avg_loss * (RSI_PERIOD - 1) + losses[i]) / RSI_PERIOD
-        if avg_loss == 0:
-            rsi = 100
-        else:
-            rsi = 100 - (100 / (1 + (avg_gain / avg_loss)))
+
+    # RSI (Wilder): 첫 RSI_PERIOD개 평균으로 시작해 alpha=1/RSI_PERIOD 로 평활
+    rsi = indicators.last_rsi_wilder(prices, RSI_PERIOD)
 
     # MACD
-    def ema(data, period):
-        k = 2 / (period + 1)
-        res = [data[0]]
-        for i in range(1, len(data)):
-            res.append(data[i] * k + res[-1] * (1-k))
-        return res
-    
-    ema_12 = ema(prices, 12)
-    ema_26 = ema(prices, 26)
-    macd_line = [a - b for a, b in zip(ema_12, ema_26)]
-    signal_line = ema(macd_line, 9)
-
-    # BB
-    BB_PERIOD = 20
-    BB_STD_DEV = 2
-    sma_20 = sum(prices[-BB_PERIOD:]) / BB_PERIOD
-    variance = sum([(x - sma_20) ** 2 for x in prices[-BB_PERIOD:]]) / BB_PERIOD
-    std_dev = math.sqrt(variance)
-    upper_band = sma_20 + (std_dev * BB_STD_DEV)
-    lower_band = sma_20 - (std_dev * BB_STD_DEV)
+    macd_line, signal_line = indicators.macd(prices)
+
+    # BB (모표준편차)
+    sma_20, _, upper_band, lower_band = indicators.last_bollinger(prices, BB_PERIOD, BB_STD_DEV, ddof=0)
 
     return {
         'price': prices[-1],
@@ -65,49 +45,124 @@ def calculate_indicators(prices):
         'sma20': sma_20
     }
 
-def get_stock_info(ticker):
-    try:
-        stock = yf.Ticker(ticker)
-        df = stock.history(period="6mo")
-        if df.empty:
-            return None
-        closes = df['Close'].tolist()
-        inds = calculate_indicators(closes)
-        if inds:
-            inds['ticker'] = ticker
-        return inds
-    except:
+def indicators_from_state(ticker, df):
+    """indicator_state를 새 봉만큼 갱신해서 calculate_indicators와 같은 형태로 반환"""
+    state, _ = indicator_state.sync_state(ticker, df)
+    if state.bar_count < 50:
         return None
+    last, prev = state.values(), state.previous_values()
+    return {
+        'price': last['Close'],
+        'rsi': last['RSI_Wilder'],
+        'macd': last['MACD'],
+        'signal': last['Signal_Line'],
+        'macd_prev': prev['MACD'],
+        'signal_prev': prev['Signal_Line'],
+        'upper': last['Upper_Band_Pop'],
+        'lower': last['Lower_Band_Pop'],
+        'sma20': last['MA20'],
+    }
 
-def main():
-    if len(sys.argv) < 4:
-        print("사용법: python3 compare_stocks.py TICKER1 TICKER2 TICKER3")
-        sys.exit(1)
-    
-    tickers = sys.argv[1:4]
-    print(f"[{tickers[0]}, {tickers[1]}, {tickers[2]}] 데이터 수집 및 분석 중...")
-    
+def summarize(ticker, df, incremental=False):
+    if df is None or df.empty:
+        return None
+    if incremental:
+        inds = indicators_from_state(ticker, df)
+    else:
+        inds = calculate_indicators(df['Close'].to_numpy())
+    if inds:
+        inds['ticker'] = ticker
+    return inds
+
+def get_stock_infos(tickers, incremental=False):
+    """
+    여러 종목의 이력을 한 번의 multi-symbol 다운로드(내부 병렬)로 받아 지표 계산.
+    반환: (입력 순서의 지표 목록, {ticker: 실패 사유})
+    """
+    with scan_metrics.stage('fetch'):
+        frames, errors = ohlcv_cache.get_histories(tickers, period=HISTORY_PERIOD)
     data = []
     for t in tickers:
-        info = get_stock_info(t)
+        if t not in frames:
+            scan_metrics.skip(scan_metrics.SKIP_FETCH_ERROR)
+        started = time.perf_counter()
+        try:
+            with scan_metrics.stage('indicators'):
+                info = summarize(t, frames.get(t), incremental)
+        except Exception as e:
+            scan_metrics.skip(scan_metrics.SKIP_ANALYSIS_ERROR)
+            errors[t] = str(e)
+            continue
+        finally:
+            scan_metrics.ticker_latency(time.perf_counter() - started)
         if info:
             data.append(info)
         else:
-            print(f"경고: {t} 의 데이터를 가져올 수 없습니다.")
-            
-    if len(data) < 2:
-        print("비교할 데이터가 부족합니다.")
-        return
+            if t in frames:
+                scan_metrics.skip(scan_metrics.SKIP_SHORT_HISTORY)
+            errors.setdefault(t, "지표 계산에 필요한 데이터 부족")
+    return data, errors
 
-    data_str = ""
+def rank_candidates(data):
+    """
+    위원회 프롬프트 전에 기술적 점수로 정렬 (simple_scanner 롱 점수 기준을 단순화).
+    점수가 같으면 RSI가 낮은 종목이 앞선다.
+    """
     for d in data:
-        data_str += f"- Ticker: {d['ticker']}\n"
-        data_str += f"  Price: {d['price']:.2f}\n"
-        data_str += f"  RSI (14): {d['rsi']:.2f}\n"
-        data_str += f"  MACD Line: {d['macd']:.2f}, Signal Line: {d['signal']:.2f} (Prev MACD: {d['macd_prev']:.2f}, Prev Signal: {d['signal_prev']:.2f})\n"
-        data_str += f"  Bollinger Bands: Lower {d['lower']:.2f}, Mid {d['sma20']:.2f}, Upper {d['upper']:.2f}\n\n"
+        score = 0
+        if d['rsi'] <= 30:
+            score += 30
+        elif d['rsi'] <= 40:
+            score += 10
+        elif d['rsi'] >= 70:
+            score -= 20
+        if d['macd_prev'] < d['signal_prev'] and d['macd'] > d['signal']:
+            score += 40
+        elif d['macd'] > d['signal']:
+            score += 10
+        if d['price'] <= d['lower'] * 1.03:
+            score += 30
+        elif d['price'] >= d['upper'] * 0.97:
+            score -= 10
+        d['rank_score'] = score
+    return sorted(data, key=lambda d: (-d['rank_score'], d['rsi']))
+
+# 압축 인코딩(csv 등)에서 종목별 지표 한 줄에 들어가는 열 (키, 헤더, 소수 자릿수)
+SUMMARY_COLUMNS = [
+    ('ticker', 'Ticker', None),
+    ('rank_score', 'Score', 0),
+    ('price', 'Price', 2),
+    ('rsi', 'RSI14', 1),
+    ('macd', 'MACD', 2),
+    ('signal', 'Signal', 2),
+    ('macd_prev', 'MACD_prev', 2),
+    ('signal_prev', 'Signal_prev', 2),
+    ('lower', 'BB_Lower', 2),
+    ('sma20', 'BB_Mid', 2),
+    ('upper', 'BB_Upper', 2),
+]
+
+def describe_candidate(d):
+    """table 인코딩: 예전과 같은 설명형 여러 줄"""
+    text = f"- Ticker: {d['ticker']} (기술적 점수 {d['rank_score']})\n"
+    text += f"  Price: {d['price']:.2f}\n"
+    text += f"  RSI (14): {d['rsi']:.2f}\n"
+    text += f"  MACD Line: {d['macd']:.2f}, Signal Line: {d['signal']:.2f} (Prev MACD: {d['macd_prev']:.2f}, Prev Signal: {d['signal_prev']:.2f})\n"
+    text += f"  Bollinger Bands: Lower {d['lower']:.2f}, Mid {d['sma20']:.2f}, Upper {d['upper']:.2f}\n\n"
+    return text
 
-    prompt = f"""
+def load_watchlist(path):
+    """한 줄에 하나(또는 쉼표 구분) 티커, '#' 이후는 주석"""
+    tickers = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            tickers.extend(t.strip().upper() for t in line.split(',') if t.strip())
+    return tickers
+
+def build_prompt(data_str, count):
+    """종목별 지표 문자열(data_str, count개 종목)을 넣은 위원회 비교 프롬프트"""
+    return f"""
 당신은 'AI 투자 위원회(AI Investment Committee)'의 최고 의장입니다.
 이 위원회는 서로 다른 투자 성향을 가진 두 명의 전문가(Expert)와 최종 결정을 내리는 의장(Moderator)으로 구성되어 있습니다.
 
@@ -125,7 +180,7 @@ def main():
 
 클라이언트가 다음 제시된 주식들 중 하나를 매수하려고 합니다. 제공된 기술적 지표를 바탕으로 두 전문가의 가상 토론을 거친 후, 최종적으로 가장 매수하기 좋은 종목 딱 1개를 선택하고 리포트를 작성하십시오.
 
-[분석 대상 종목의 기술적 데이터]
+[분석 대상 종목의 기술적 데이터 (기술적 점수 순)]
 {data_str}
 
 [분석 가이드라인]
@@ -147,26 +202,98 @@ def main():
 - **의장의 추천 사유**: (기술적 근거 3가지 이상 상세 설명)
 
 ### 📊 나머지 종목 분석
-- **[종목명2] 평가**: (현재 상태 및 Top Pick에서 밀린 이유)
-- **[종목명3] 평가**: (현재 상태 및 Top Pick에서 밀린 이유)
+(Top Pick 을 제외한 나머지 {count - 1}개 종목 모두를 기술적 점수 순으로, 종목마다 아래 형식의 한 줄로)
+- **[종목명] 평가**: (현재 상태 및 Top Pick에서 밀린 이유)
 
 ### 💡 최종 매매 전략 (Top Pick 기준)
 - **진입 전략**: (예: 현재가 부근 분할 매수, 볼린저 하단 지지 확인 후 매수 등)
 - **리스크 관리**: (어떤 지표가 무너지면 손절해야 하는지)
 """
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="여러 종목의 기술적 지표를 비교해 AI 투자 위원회 리포트를 생성",
+        usage="python3 compare_stocks.py TICKER1 TICKER2 [TICKER3 ...] [-f WATCHLIST] [--top N]",
+    )
+    parser.add_argument('tickers', nargs='*', help="비교할 티커 목록")
+    parser.add_argument('-f', '--file', help="티커 목록 파일 (한 줄에 하나)")
+    market_data.add_provider_args(parser)
+    gemini_cache.add_cache_args(parser)
+    prompt_encoding.add_encoding_args(parser)
+    parser.add_argument('--incremental', action='store_true',
+                        help="저장된 지표 상태를 새 봉만큼만 갱신 (전체 재계산은 이력 변경 시에만)")
+    parser.add_argument('--top', type=int, default=0, help="순위 상위 N개만 위원회에 전달 (0: 전체)")
+    scan_metrics.add_metrics_args(parser)
+    return parser.parse_args(argv)
+
+def compare(tickers, args):
+    """
+    tickers 의 지표를 비교해 위원회 리포트를 요청.
+    반환: {'candidates': 순위순 지표 목록, 'errors': {ticker: 사유}, 'report': 응답 또는 None, 'cached': bool}
+    """
+    print(f"[{', '.join(tickers)}] 데이터 수집 및 분석 중...")
+    outcome = {'candidates': [], 'errors': {}, 'report': None, 'cached': False}
+
+    data, errors = get_stock_infos(tickers, args.incremental)
+    outcome['errors'] = errors
+    for t, reason in errors.items():
+        print(f"경고: {t} 의 데이터를 가져올 수 없습니다. ({reason})")
+
+    if len(data) < 2:
+        print("비교할 데이터가 부족합니다.")
+        return outcome
+
+    data = rank_candidates(data)
+    print("기술적 점수 순위: " + ", ".join(f"{d['ticker']}({d['rank_score']})" for d in data))
+    if args.top:
+        data = data[:max(args.top, 2)]
+    outcome['candidates'] = data
+
+    # delta/summary 는 봉 데이터용이라 종목 지표는 csv 와 같은 한 줄 표기가 된다
+    template = build_prompt("", len(data))
+    budget = max(args.prompt_budget - prompt_encoding.estimate_tokens(template), 1) if args.prompt_budget else None
+    data_str, used = prompt_encoding.encode_records(
+        data, SUMMARY_COLUMNS, args.encoding, describe=describe_candidate, max_tokens=budget,
+    )
+    if used < len(data):
+        print(f"프롬프트 예산 때문에 하위 {len(data) - used}개 종목을 제외했습니다.")
+
+    prompt = build_prompt(data_str, used)
+    if args.prompt_report:
+        print(prompt_encoding.size_report({'지시문': template, f'종목 지표({args.encoding})': data_str}))
     try:
-        my_env = os.environ.copy()
-        my_env["PATH"] = my_env.get("PATH", "") + ":/usr/sbin:/sbin"
-        
-        result = subprocess.run(['gemini', '-p', prompt], capture_output=True, text=True, env=my_env)
+        result, cached = gemini_cache.run_gemini(prompt, PROMPT_TEMPLATE_VERSION)
         if result.returncode == 0:
+            if cached:
+                print("💾 같은 데이터로 받은 최근 응답을 재사용합니다 (--no-gemini-cache 로 새로 요청)")
             print("\n" + "="*50)
             print(result.stdout)
             print("="*50 + "\n")
+            outcome.update(report=result.stdout, cached=cached)
         else:
             print(f"gemini 실행 중 오류 발생:\n{result.stderr}")
     except Exception as e:
         print(f"오류가 발생했습니다: {e}")
+    print(gemini_cache.report())
+    return outcome
+
+def resolve_tickers(args):
+    tickers = [t.upper() for t in args.tickers]
+    if args.file:
+        tickers += load_watchlist(args.file)
+    return list(dict.fromkeys(tickers))
+
+def main():
+    args = parse_args()
+    market_data.configure_from_args(args)
+    gemini_cache.configure_from_args(args)
+    tickers = resolve_tickers(args)
+    if len(tickers) < 2:
+        print("사용법: python3 compare_stocks.py TICKER1 TICKER2 [TICKER3 ...] [-f WATCHLIST] [--top N]")
+        sys.exit(1)
+    with scan_metrics.profiled(args.profile):
+        compare(tickers, args)
+    scan_metrics.finish(args, 'compare_stocks')
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,160 @@
+"""
+gemini CLI 호출 + 응답 디스크 캐시.
+- 키: 프롬프트 템플릿 버전 + 완성된 프롬프트의 sha256 (입력 데이터가 같으면 같은 키)
+- 성공한 응답만 저장, TTL이 지난 항목과 전체 크기 한도를 넘는 오래된 항목은 저장 시 정리
+- --no-gemini-cache 로 캐시 조회를 건너뛰고 새 응답으로 덮어씀
+- 적중/미적중 횟수는 STATS 에 모아 report() 로 출력
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+
+import scan_metrics
+
+CACHE_DIR = os.environ.get("SIMPLESTOCK_GEMINI_CACHE_DIR", os.path.join(".cache", "gemini"))
+DEFAULT_TTL_SECONDS = 12 * 60 * 60     # 같은 거래일 재실행은 캐시로 응답
+MAX_CACHE_BYTES = 50 * 1024 * 1024     # 이보다 커지면 가장 오래 안 쓴 항목부터 삭제
+EXTRA_PATH = ":/usr/sbin:/usr/bin:/sbin:/bin"
+
+STATS = {'hit': 0, 'miss': 0, 'bypass': 0, 'stored': 0, 'evicted': 0}
+_stats_lock = threading.Lock()  # 배치 모드에서 여러 스레드가 동시에 호출
+
+_settings = {'enabled': True, 'ttl': DEFAULT_TTL_SECONDS}
+
+
+def _count(name):
+    with _stats_lock:
+        STATS[name] += 1
+
+
+def prompt_key(prompt, template_version):
+    digest = hashlib.sha256()
+    digest.update(template_version.encode('utf-8'))
+    digest.update(b"\0")
+    digest.update(prompt.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def lookup(key, ttl=None):
+    """TTL 안의 저장된 응답 반환, 없으면 None. 적중한 항목은 최근 사용으로 표시"""
+    ttl = _settings['ttl'] if ttl is None else ttl
+    path = _entry_path(key)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - entry.get('created', 0) > ttl:
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return entry
+
+
+def store(key, template_version, stdout, ttl=None):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _entry_path(key)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'created': time.time(), 'template': template_version, 'stdout': stdout}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    _count('stored')
+    evict(ttl)
+
+
+def evict(ttl=None, max_bytes=MAX_CACHE_BYTES):
+    """만료 항목 삭제 후, 남은 크기가 한도를 넘으면 마지막 사용 시각이 오래된 순으로 삭제"""
+    ttl = _settings['ttl'] if ttl is None else ttl
+    if not os.path.isdir(CACHE_DIR):
+        return
+    now = time.time()
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        # 생성 시각은 파일 안에 있지만 mtime(마지막 사용) >= 생성 시각이므로 mtime으로 먼저 거름
+        if now - stat.st_mtime > ttl:
+            _remove(path)
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        _remove(path)
+        total -= size
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        _count('evicted')
+    except OSError:
+        pass
+
+
+def run_gemini(prompt, template_version, use_cache=None, timeout=None):
+    """
+    gemini -p 로 프롬프트를 보내고 결과 반환. 같은 (템플릿 버전, 프롬프트)의 성공 응답이
+    캐시에 있으면 CLI를 부르지 않고 바로 돌려준다.
+    timeout 초과 시 subprocess.TimeoutExpired 가 그대로 올라간다.
+    반환: (subprocess.CompletedProcess, cached)
+    """
+    use_cache = _settings['enabled'] if use_cache is None else use_cache
+    key = prompt_key(prompt, template_version)
+    args = ['gemini', '-p', prompt]
+    if use_cache:
+        entry = lookup(key)
+        if entry is not None:
+            _count('hit')
+            return subprocess.CompletedProcess(args, 0, entry['stdout'], ""), True
+        _count('miss')
+    else:
+        _count('bypass')
+
+    env = os.environ.copy()
+    env["PATH"] = env.get("PATH", "") + EXTRA_PATH
+    with scan_metrics.stage('llm'):
+        completed = subprocess.run(args, capture_output=True, text=True, env=env, timeout=timeout)
+    if completed.returncode == 0 and completed.stdout.strip():
+        store(key, template_version, completed.stdout)
+    return completed, False
+
+
+def report():
+    """캐시 적중/미적중 요약 한 줄"""
+    return (
+        f"💾 gemini 응답 캐시: 적중 {STATS['hit']} / 미적중 {STATS['miss']}"
+        f" / 우회 {STATS['bypass']} (저장 {STATS['stored']}, 정리 {STATS['evicted']})"
+    )
+
+
+def add_cache_args(parser):
+    """argparse parser에 gemini 응답 캐시 옵션 추가"""
+    group = parser.add_argument_group("gemini 응답 캐시")
+    group.add_argument('--no-gemini-cache', action='store_true',
+                       help="캐시된 응답을 쓰지 않고 gemini를 다시 호출 (새 응답으로 캐시 갱신)")
+    group.add_argument('--gemini-cache-ttl', type=float, default=DEFAULT_TTL_SECONDS / 3600,
+                       help=f"캐시 유효 시간(시간 단위, 기본: {DEFAULT_TTL_SECONDS // 3600})")
+    return parser
+
+
+def configure_from_args(args):
+    _settings['enabled'] = not args.no_gemini_cache
+    _settings['ttl'] = args.gemini_cache_ttl * 3600
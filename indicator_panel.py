@@ -0,0 +1,83 @@
+"""
+유니버스 전체를 (봉 × 티커) 2차원 배열로 정렬해서 지표를 한 번에 계산하는 엔진.
+simple_scanner.calculate_indicators 와 같은 정의(SMA RSI, 표본 표준편차 BB 등)를 따르며
+계산 커널은 indicators 모듈의 (T, N) 배열 버전을 그대로 쓴다.
+
+정렬 방식: 각 티커의 마지막 봉을 마지막 행에 맞추는 '봉 기준 오른쪽 정렬'.
+KR/US 휴장일이 달라도 티커마다 자기 봉만 연속으로 들어가므로 티커별 계산과 값이 같고,
+이력이 짧은 티커는 위쪽 행이 NaN으로 채워진다.
+"""
+
+import numpy as np
+
+import indicators
+
+FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+# compact=True 일 때 float32 로 보관하는 필드 - 거래량은 비율(거래량/20일 평균)로만 쓰여 float32 정밀도로 충분.
+# 가격은 손절/목표가로 그대로 출력·기록되므로 float64 유지.
+COMPACT_FIELDS = ('Volume',)
+
+
+def build_panel(frames, compact=False):
+    """
+    {ticker: OHLCV DataFrame} -> (tickers, fields, lengths)
+    fields: {필드명: (T, N) float64 배열}, lengths: 티커별 실제 봉 수 (N,)
+    compact: COMPACT_FIELDS 는 float32 로 보관 (지표 커널은 float64 로 올려서 계산한다)
+    """
+    tickers = list(frames)
+    lengths = np.array([len(frames[t]) for t in tickers], dtype=np.int64)
+    n_rows = int(lengths.max()) if len(tickers) else 0
+
+    fields = {}
+    for field in FIELDS:
+        dtype = np.float32 if compact and field in COMPACT_FIELDS else np.float64
+        values = np.full((n_rows, len(tickers)), np.nan, dtype=dtype)
+        for j, ticker in enumerate(tickers):
+            column = frames[ticker][field].to_numpy(dtype=dtype)
+            if len(column):
+                values[n_rows - len(column):, j] = column
+        fields[field] = values
+    return tickers, fields, lengths
+
+
+def build_dates(frames, tickers, n_rows):
+    """build_panel 과 같은 오른쪽 정렬로 각 칸의 실제 날짜를 담은 (T, N) datetime64 배열 (시간대 제거)"""
+    dates = np.full((n_rows, len(tickers)), np.datetime64('NaT'), dtype='datetime64[ns]')
+    for j, ticker in enumerate(tickers):
+        index = frames[ticker].index
+        if getattr(index, 'tz', None) is not None:
+            index = index.tz_localize(None)
+        if len(index):
+            dates[n_rows - len(index):, j] = index.to_numpy(dtype='datetime64[ns]')
+    return dates
+
+
+def compute_indicators(fields, rsi_period=14, fast_ema=50, slow_ema=200, atr_period=14,
+                       high_window=252, high_min_periods=100):
+    """
+    RSI, MACD, Bollinger Bands, EMA, Volume MA, ATR, 52주 고가를 전 종목에 대해 한 번에 계산.
+    반환: {지표명: (T, N) 배열} - 키 이름은 simple_scanner.calculate_indicators 의 컬럼명과 같다.
+    """
+    close = fields['Close']
+    high = fields['High']
+    low = fields['Low']
+    volume = fields['Volume']
+
+    out = {}
+    out['RSI'] = indicators.rsi_sma(close, rsi_period)
+    out['MACD'], out['Signal_Line'] = indicators.macd(close)
+    out['MA20'], out['STD20'], out['Upper_Band'], out['Lower_Band'] = indicators.bollinger(close, 20, 2)
+    out['EMA50'] = indicators.ewm_mean(close, fast_ema)
+    out['EMA200'] = indicators.ewm_mean(close, slow_ema)
+    out['Volume_MA20'] = indicators.rolling_mean(volume, 20)
+    out['TR'] = indicators.true_range(high, low, close)
+    out['ATR14'] = indicators.rolling_mean(out['TR'], atr_period)
+    out['High_52W'] = indicators.rolling_max(high, high_window, high_min_periods)
+    return out
+
+
+def row_values(fields, panel, row):
+    """특정 행(-1: 마지막 봉, -2: 전일)의 OHLCV + 지표(compute_indicators 결과 panel) 값을 {이름: (N,) 배열}로 반환"""
+    values = {name: array[row] for name, array in fields.items()}
+    values.update({name: array[row] for name, array in panel.items()})
+    return values
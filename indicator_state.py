@@ -0,0 +1,333 @@
+"""
+티커별 지표 상태를 저장해 두고 새 봉 하나가 들어올 때마다 상수 시간에 갱신하는 모듈.
+재귀형 지표(EMA12/26/Signal, EMA50/200, Wilder RSI)는 직전 값만,
+구간형 지표(SMA RSI, 볼린저밴드, 거래량 MA, ATR)는 고정 길이 창만,
+52주 고가는 단조 감소 deque만 보관한다.
+
+주의: 상태는 처음 본 봉부터 계속 이어서 계산하므로, 매번 최근 1년 창으로 다시 시작하는
+pandas 계산과 EMA200 등 장기 EMA 값이 조금 다를 수 있다 (더 긴 이력 기준의 값).
+"""
+
+import json
+import os
+from collections import deque
+
+STATE_DIR = os.environ.get("SIMPLESTOCK_STATE_DIR", os.path.join(".cache", "indicator_state"))
+STATE_VERSION = 1
+RESTATEMENT_TOLERANCE = 1e-6
+
+RSI_PERIOD = 14
+BB_PERIOD = 20
+VOLUME_PERIOD = 20
+ATR_PERIOD = 14
+HIGH_WINDOW = 252
+HIGH_MIN_PERIODS = 100
+EMA_SPANS = (12, 26, 50, 200)
+SIGNAL_SPAN = 9
+
+_memory = {}  # {ticker: (파일 mtime_ns, IndicatorState)} - 같은 프로세스에서 JSON 재파싱 생략
+
+
+def _ema_step(prev, value, span):
+    if prev is None:
+        return value
+    alpha = 2 / (span + 1)
+    return alpha * value + (1 - alpha) * prev
+
+
+def _window_mean(window, size):
+    return sum(window) / size if len(window) == size else None
+
+
+def _window_std(window, size, ddof):
+    if len(window) < size:
+        return None
+    mean = sum(window) / size
+    return (sum((x - mean) ** 2 for x in window) / (size - ddof)) ** 0.5
+
+
+class IndicatorState:
+    """한 티커의 지표 계산 상태. to_dict/from_dict 로 JSON 직렬화"""
+
+    def __init__(self):
+        self.bar_count = 0
+        self.first_date = None        # 처음 반영한 봉 날짜 (더 긴 이력이 들어오면 다시 계산할지 판단)
+        self.last_date = None
+        self.last_bar = None          # {'Open', 'High', 'Low', 'Close', 'Volume'}
+        self.emas = {span: None for span in EMA_SPANS}
+        self.signal = None
+        self.closes = deque(maxlen=BB_PERIOD)
+        self.volumes = deque(maxlen=VOLUME_PERIOD)
+        self.gains = deque(maxlen=RSI_PERIOD)
+        self.losses = deque(maxlen=RSI_PERIOD)
+        self.true_ranges = deque(maxlen=ATR_PERIOD)
+        self.wilder_seed = []         # Wilder RSI 초기 평균용 (RSI_PERIOD개 모이면 비움)
+        self.wilder_gain = None
+        self.wilder_loss = None
+        self.highs = deque()          # (bar 번호, 고가) 단조 감소
+        self.before_last = None       # 마지막 봉 반영 직전 상태 (장중 봉 재반영 / 전일 값 조회용)
+
+    # --- 갱신 ---
+    def update(self, date, open_, high, low, close, volume):
+        """봉 하나 반영. 마지막 봉과 같은 날짜면(장중 봉 갱신) 직전 상태로 되돌린 뒤 다시 반영"""
+        date = str(date)
+        if date == self.last_date and self.before_last is not None:
+            self._restore(self.before_last)
+        self.before_last = self.to_dict(include_before_last=False)
+
+        prev_close = self.last_bar['Close'] if self.last_bar else None
+        index = self.bar_count
+
+        # RSI: SMA 방식(스캐너)은 첫 봉 변화량을 0으로, Wilder 방식(compare)은 둘째 봉부터 사용
+        delta = close - prev_close if prev_close is not None else 0.0
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        self.gains.append(gain)
+        self.losses.append(loss)
+        if prev_close is not None:
+            if self.wilder_gain is None:
+                self.wilder_seed.append((gain, loss))
+                if len(self.wilder_seed) == RSI_PERIOD:
+                    self.wilder_gain = sum(g for g, _ in self.wilder_seed) / RSI_PERIOD
+                    self.wilder_loss = sum(l for _, l in self.wilder_seed) / RSI_PERIOD
+                    self.wilder_seed = []
+            else:
+                self.wilder_gain = (self.wilder_gain * (RSI_PERIOD - 1) + gain) / RSI_PERIOD
+                self.wilder_loss = (self.wilder_loss * (RSI_PERIOD - 1) + loss) / RSI_PERIOD
+
+        for span in EMA_SPANS:
+            self.emas[span] = _ema_step(self.emas[span], close, span)
+        self.signal = _ema_step(self.signal, self.emas[12] - self.emas[26], SIGNAL_SPAN)
+
+        self.closes.append(close)
+        self.volumes.append(volume)
+
+        if prev_close is None:
+            true_range = abs(high - low)
+        else:
+            true_range = max(abs(high - low), abs(high - prev_close), abs(low - prev_close))
+        self.true_ranges.append(true_range)
+
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append((index, high))
+        while self.highs[0][0] <= index - HIGH_WINDOW:
+            self.highs.popleft()
+
+        if index == 0:
+            self.first_date = date
+        self.bar_count = index + 1
+        self.last_date = date
+        self.last_bar = {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}
+
+    # --- 조회 ---
+    def values(self):
+        """
+        현재(마지막 봉) 지표 값. 키 이름은 simple_scanner.calculate_indicators 컬럼명과 같고
+        compare_stocks 용 Wilder RSI / 모표준편차 볼린저밴드 값을 추가로 담는다.
+        """
+        if self.last_bar is None:
+            return None
+        out = dict(self.last_bar)
+
+        avg_gain = _window_mean(self.gains, RSI_PERIOD)
+        avg_loss = _window_mean(self.losses, RSI_PERIOD)
+        if avg_gain is None:
+            out['RSI'] = None
+        elif avg_loss == 0:
+            out['RSI'] = 100.0 if avg_gain > 0 else None
+        else:
+            out['RSI'] = 100 - (100 / (1 + avg_gain / avg_loss))
+
+        if self.wilder_gain is None:
+            out['RSI_Wilder'] = None
+        elif self.wilder_loss == 0:
+            out['RSI_Wilder'] = 100.0
+        else:
+            out['RSI_Wilder'] = 100 - (100 / (1 + self.wilder_gain / self.wilder_loss))
+
+        out['MACD'] = self.emas[12] - self.emas[26]
+        out['Signal_Line'] = self.signal
+        out['EMA50'] = self.emas[50]
+        out['EMA200'] = self.emas[200]
+
+        out['MA20'] = _window_mean(self.closes, BB_PERIOD)
+        for key, ddof in (('STD20', 1), ('STD20_Pop', 0)):
+            out[key] = _window_std(self.closes, BB_PERIOD, ddof)
+        if out['MA20'] is None:
+            out['Upper_Band'] = out['Lower_Band'] = None
+            out['Upper_Band_Pop'] = out['Lower_Band_Pop'] = None
+        else:
+            out['Upper_Band'] = out['MA20'] + out['STD20'] * 2
+            out['Lower_Band'] = out['MA20'] - out['STD20'] * 2
+            out['Upper_Band_Pop'] = out['MA20'] + out['STD20_Pop'] * 2
+            out['Lower_Band_Pop'] = out['MA20'] - out['STD20_Pop'] * 2
+
+        out['Volume_MA20'] = _window_mean(self.volumes, VOLUME_PERIOD)
+        out['TR'] = self.true_ranges[-1]
+        out['ATR14'] = _window_mean(self.true_ranges, ATR_PERIOD)
+        observed = min(self.bar_count, HIGH_WINDOW)
+        out['High_52W'] = self.highs[0][1] if observed >= HIGH_MIN_PERIODS else None
+        return out
+
+    def previous_values(self):
+        """마지막 봉 직전(전일) 지표 값"""
+        if self.before_last is None:
+            return None
+        return IndicatorState.from_dict(self.before_last).values()
+
+    def pending_bars(self, df):
+        """
+        df 중 아직 반영하지 않은 봉(마지막 반영 봉 포함)을 반환.
+        다음 경우에는 None -> 전체 재계산 필요
+        - 전일까지 반영한 종가가 df와 다름 (분할/배당 수정주가 등)
+        - df 가 상태보다 긴 이력 (예: compare_stocks 의 6mo 로 만든 상태에 스캐너의 1y 이력)
+        """
+        import pandas as pd
+
+        if self.before_last is None or self.before_last['last_bar'] is None:
+            return None
+        try:
+            checkpoint = pd.Timestamp(self.before_last['last_date'])
+            last = pd.Timestamp(self.last_date)
+            if checkpoint not in df.index or last not in df.index:
+                return None
+            if len(df) > self.bar_count and (
+                # 첫 봉 날짜를 기록하기 전에 만든 상태는 봉 수만으로 판단
+                self.first_date is None or df.index[0] < pd.Timestamp(self.first_date)
+            ):
+                return None
+        except (TypeError, ValueError):
+            return None
+        expected = self.before_last['last_bar']['Close']
+        actual = float(df.loc[checkpoint, 'Close'])
+        if abs(actual - expected) > RESTATEMENT_TOLERANCE * max(abs(expected), 1.0):
+            return None
+        return df[df.index >= last]
+
+    # --- 직렬화 ---
+    def to_dict(self, include_before_last=True):
+        return {
+            'version': STATE_VERSION,
+            'bar_count': self.bar_count,
+            'first_date': self.first_date,
+            'last_date': self.last_date,
+            'last_bar': self.last_bar,
+            'emas': {str(span): value for span, value in self.emas.items()},
+            'signal': self.signal,
+            'closes': list(self.closes),
+            'volumes': list(self.volumes),
+            'gains': list(self.gains),
+            'losses': list(self.losses),
+            'true_ranges': list(self.true_ranges),
+            'wilder_seed': [list(pair) for pair in self.wilder_seed],
+            'wilder_gain': self.wilder_gain,
+            'wilder_loss': self.wilder_loss,
+            'highs': [list(pair) for pair in self.highs],
+            'before_last': self.before_last if include_before_last else None,
+        }
+
+    def _restore(self, data):
+        self.bar_count = data['bar_count']
+        self.first_date = data.get('first_date')
+        self.last_date = data['last_date']
+        self.last_bar = data['last_bar']
+        self.emas = {int(span): value for span, value in data['emas'].items()}
+        self.signal = data['signal']
+        self.closes = deque(data['closes'], maxlen=BB_PERIOD)
+        self.volumes = deque(data['volumes'], maxlen=VOLUME_PERIOD)
+        self.gains = deque(data['gains'], maxlen=RSI_PERIOD)
+        self.losses = deque(data['losses'], maxlen=RSI_PERIOD)
+        self.true_ranges = deque(data['true_ranges'], maxlen=ATR_PERIOD)
+        self.wilder_seed = [tuple(pair) for pair in data['wilder_seed']]
+        self.wilder_gain = data['wilder_gain']
+        self.wilder_loss = data['wilder_loss']
+        self.highs = deque(tuple(pair) for pair in data['highs'])
+        self.before_last = data.get('before_last')
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        state._restore(data)
+        return state
+
+
+def _state_path(ticker):
+    return os.path.join(STATE_DIR, f"{ticker}.json")
+
+
+def load_state(ticker):
+    path = _state_path(ticker)
+    if not os.path.exists(path):
+        return None
+    # 직전에 save_state 한 객체가 파일과 같으면 그대로 넘겨줌 (꺼내 간 쪽이 갱신 후 다시 저장)
+    remembered = _memory.pop(ticker, None)
+    if remembered is not None and remembered[0] == os.stat(path).st_mtime_ns:
+        return remembered[1]
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('version') != STATE_VERSION:
+        return None
+    return IndicatorState.from_dict(data)
+
+
+def forget(tickers):
+    """tickers 의 상태 객체를 프로세스 메모리에서 내려놓음 (파일은 그대로)"""
+    for ticker in tickers:
+        _memory.pop(ticker, None)
+
+
+def save_state(ticker, state):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    path = _state_path(ticker)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state.to_dict(), f)
+    os.replace(tmp_path, path)
+    remember(ticker, state)
+
+
+def remember(ticker, state):
+    """state 가 저장된 파일과 같은 내용일 때, 다음 load_state 가 파일을 다시 읽지 않도록 기억"""
+    _memory[ticker] = (os.stat(_state_path(ticker)).st_mtime_ns, state)
+
+
+def feed(state, df):
+    """df의 봉들을 순서대로 상태에 반영"""
+    columns = [df[c].to_numpy(dtype=float) for c in ('Open', 'High', 'Low', 'Close', 'Volume')]
+    for date, open_, high, low, close, volume in zip(df.index, *columns):
+        state.update(date, float(open_), float(high), float(low), float(close), float(volume))
+    return state
+
+
+def is_unchanged(state, pending):
+    """pending 이 이미 반영한 마지막 봉 하나뿐이고 값도 같으면 True (다시 반영/저장할 필요 없음)"""
+    if len(pending) != 1 or state.last_bar is None or str(pending.index[0]) != state.last_date:
+        return False
+    row = pending.iloc[0]
+    return all(float(row[column]) == state.last_bar[column] for column in ('Open', 'High', 'Low', 'Close', 'Volume'))
+
+
+def sync_state(ticker, df, save=True):
+    """
+    저장된 상태를 df(최신 일봉)와 맞춘다.
+    - 새 봉만 있으면 그 봉들만 O(1)씩 반영
+    - 과거 가격이 바뀌었거나 상태가 없으면 df 전체로 다시 계산
+    반환: (state, rebuilt)
+    """
+    state = load_state(ticker)
+    pending = state.pending_bars(df) if state is not None else None
+    rebuilt = pending is None
+    if rebuilt:
+        state = feed(IndicatorState(), df)
+    elif is_unchanged(state, pending):
+        remember(ticker, state)
+        return state, False
+    else:
+        feed(state, pending)
+    if save:
+        save_state(ticker, state)
+    return state, rebuilt
@@ -0,0 +1,299 @@
+"""
+세 스크립트가 함께 쓰는 기술적 지표 계산 모듈.
+- 전체 시계열 커널: (T,) 또는 (T, N) 배열을 받아 같은 모양의 시계열 반환 (N: 티커 축)
+  indicator_panel(스캐너 유니버스), simple_scanner(종목별), compare_stocks 가 사용
+- 마지막 값 커널(last_*): 1차원 배열에서 마지막 봉의 값만 계산 (전체 시계열을 만들지 않음)
+  ai_investment_committee_cli 가 사용
+
+각 스크립트의 기존 정의를 그대로 유지한다 (서로 다른 정의는 이름으로 구분).
+- RSI: rsi_sma(스캐너, 단순평균) / rsi_wilder(compare, 첫 평균으로 시작하는 Wilder) /
+       rsi_ewm(ta 패키지, 첫 봉부터 alpha=1/n 지수평활)
+- 볼린저밴드 표준편차: ddof=1(스캐너, 표본) / ddof=0(compare, 모표준편차)
+- pandas rolling/ewm, ta 패키지 결과와 부동소수 오차(1e-10) 안에서 같다.
+"""
+
+import numpy as np
+
+EWM_MATRIX_MAX_LEN = 512  # 이 길이 이하의 1차원 EMA는 가중치 행렬 곱 한 번으로 계산
+
+
+# --- 기본 커널 ---
+def shift(values, periods=1):
+    shifted = np.full_like(values, np.nan)
+    if periods < len(values):
+        shifted[periods:] = values[:len(values) - periods]
+    return shifted
+
+
+def _rolling_count(valid, window):
+    counts = np.cumsum(valid, axis=0)
+    counts[window:] = counts[window:] - counts[:-window]
+    return counts
+
+
+def _rolling_sum(values, window):
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    sums[window:] = sums[window:] - sums[:-window]
+    sums[_rolling_count(valid, window) < window] = np.nan
+    return sums
+
+
+def _column_center(values):
+    # 누적합의 자릿수 손실을 줄이기 위해 티커별 평균을 빼고 계산
+    with np.errstate(invalid='ignore'):
+        valid = ~np.isnan(values)
+        counts = valid.sum(axis=0)
+        totals = np.where(valid, values, 0.0).sum(axis=0)
+        return np.where(counts > 0, totals / np.maximum(counts, 1), 0.0)
+
+
+def rolling_mean(values, window):
+    """pandas rolling(window).mean() 과 같은 의미 (window 안에 NaN이 있으면 NaN)"""
+    center = _column_center(values)
+    return _rolling_sum(values - center, window) / window + center
+
+
+def rolling_std(values, window, ddof=1):
+    """pandas rolling(window).std(ddof) 과 같은 의미"""
+    deviations = values - _column_center(values)
+    s1 = _rolling_sum(deviations, window)
+    s2 = _rolling_sum(deviations * deviations, window)
+    variance = (s2 - s1 * s1 / window) / (window - ddof)
+    return np.sqrt(np.clip(variance, 0.0, None))
+
+
+def rolling_max(values, window, min_periods=None):
+    """
+    pandas rolling(window, min_periods).max() 과 같은 의미.
+    2의 거듭제곱 구간 최대값을 겹쳐서 log2(window)번의 배열 연산으로 계산.
+    """
+    if min_periods is None:
+        min_periods = window
+    result = values.copy()
+    span = 1
+    while span * 2 <= window:
+        result = np.fmax(result, shift(result, span))
+        span *= 2
+    if span < window:
+        result = np.fmax(result, shift(result, window - span))
+    result[_rolling_count(~np.isnan(values), window) < min_periods] = np.nan
+    return result
+
+
+def rolling_min(values, window, min_periods=None):
+    """pandas rolling(window, min_periods).min() 과 같은 의미"""
+    return -rolling_max(-values, window, min_periods)
+
+
+def _ewm_matrix(values, alpha):
+    # ema_t = (1-a)^t * x_0 + sum_i a * (1-a)^(t-i) * x_i 를 가중치 행렬 곱 한 번으로 계산
+    lags = np.subtract.outer(np.arange(len(values)), np.arange(len(values)))
+    weights = np.where(lags >= 0, alpha * (1 - alpha) ** np.clip(lags, 0, None), 0.0)
+    weights[:, 0] = (1 - alpha) ** np.arange(len(values))
+    return weights @ values
+
+
+def ewm_mean(values, span=None, alpha=None):
+    """
+    pandas ewm(span 또는 alpha, adjust=False).mean() 과 같은 의미 (첫 값으로 시작).
+    짧은 1차원 시계열은 행렬 곱, 그 외에는 시간축만 순회하고 티커 축은 벡터 연산.
+    """
+    if alpha is None:
+        alpha = 2 / (span + 1)
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1 and len(values) <= EWM_MATRIX_MAX_LEN and not np.isnan(values).any():
+        return _ewm_matrix(values, alpha)
+    out = np.empty_like(values)
+    prev = np.full(values.shape[1:], np.nan)
+    for t in range(values.shape[0]):
+        x = values[t]
+        blended = alpha * x + (1 - alpha) * prev
+        prev = np.where(np.isnan(prev), x, np.where(np.isnan(x), prev, blended))
+        out[t] = prev
+    return out
+
+
+# --- 전체 시계열 지표 ---
+def rsi_sma(close, period=14):
+    """스캐너 RSI: 상승/하락폭의 단순이동평균 (첫 봉 변화량은 0으로 취급)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        has_close = ~np.isnan(close)
+        delta = close - shift(close, 1)
+        gain = np.where(has_close, np.where(delta > 0, delta, 0.0), np.nan)
+        loss = np.where(has_close, np.where(delta < 0, -delta, 0.0), np.nan)
+        rs = rolling_mean(gain, period) / rolling_mean(loss, period)
+        return 100 - (100 / (1 + rs))
+
+
+def _wilder_averages(close, period):
+    # 첫 period개 변화량의 평균으로 시작해 alpha=1/period 로 평활 (1차원, index period부터 유효)
+    deltas = np.diff(close)
+    gains = np.where(deltas > 0, deltas, 0.0)
+    losses = np.where(deltas > 0, 0.0, np.abs(deltas))
+    alpha = 1 / period
+    avg_gain = ewm_mean(np.concatenate(([gains[:period].mean()], gains[period:])), alpha=alpha)
+    avg_loss = ewm_mean(np.concatenate(([losses[:period].mean()], losses[period:])), alpha=alpha)
+    return avg_gain, avg_loss
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(avg_loss == 0, 100.0, 100 - (100 / (1 + avg_gain / avg_loss)))
+
+
+def rsi_wilder(close, period=14):
+    """compare_stocks RSI (1차원): 첫 period개 평균으로 시작하는 Wilder 평활"""
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(len(close), np.nan)
+    if len(close) > period:
+        out[period:] = _rsi_from_averages(*_wilder_averages(close, period))
+    return out
+
+
+def _ewm_directions(close):
+    # ta: diff 의 첫 NaN 은 where 에서 0.0 으로 바뀌므로 첫 봉부터 평활에 포함된다
+    with np.errstate(invalid='ignore'):
+        delta = close - shift(close, 1)
+        return np.where(delta > 0, delta, 0.0), np.where(delta < 0, -delta, 0.0)
+
+
+def rsi_ewm(close, period=14):
+    """ta.momentum.RSIIndicator 와 같은 RSI (첫 봉부터 alpha=1/period 지수평활, min_periods=period)"""
+    close = np.asarray(close, dtype=np.float64)
+    up, down = _ewm_directions(close)
+    rsi = _rsi_from_averages(ewm_mean(up, alpha=1 / period), ewm_mean(down, alpha=1 / period))
+    rsi[:period - 1] = np.nan
+    return rsi
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """반환: (MACD 선, 시그널 선)"""
+    line = ewm_mean(close, fast) - ewm_mean(close, slow)
+    return line, ewm_mean(line, signal)
+
+
+def bollinger(close, period=20, num_std=2, ddof=1):
+    """반환: (중심선, 표준편차, 상단, 하단)"""
+    mid = rolling_mean(close, period)
+    std = rolling_std(close, period, ddof)
+    return mid, std, mid + std * num_std, mid - std * num_std
+
+
+def true_range(high, low, close):
+    """첫 봉은 고가-저가 (전일 종가가 없으면 그 항목은 무시)"""
+    prev_close = shift(close, 1)
+    with np.errstate(invalid='ignore'):
+        tr = np.fmax(np.abs(high - low), np.abs(high - prev_close))
+        return np.fmax(tr, np.abs(low - prev_close))
+
+
+def atr(high, low, close, period=14):
+    """True Range 의 단순이동평균"""
+    return rolling_mean(true_range(high, low, close), period)
+
+
+def stochastic(high, low, close, window=14, smooth=3):
+    """ta.momentum.StochasticOscillator 와 같은 (%K, %D)"""
+    lowest = rolling_min(low, window)
+    highest = rolling_max(high, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = 100 * (close - lowest) / (highest - lowest)
+    return k, rolling_mean(k, smooth)
+
+
+def ichimoku(high, low, window1=9, window2=26, window3=52):
+    """ta.trend.IchimokuIndicator(visual=False) 와 같은 전환선/기준선/선행스팬 A·B"""
+    conversion = 0.5 * (rolling_max(high, window1) + rolling_min(low, window1))
+    base = 0.5 * (rolling_max(high, window2) + rolling_min(low, window2))
+    span_b = 0.5 * (rolling_max(high, window3, 1) + rolling_min(low, window3, 1))  # ta: min_periods=0
+    return {
+        'conversion': conversion,
+        'base': base,
+        'span_a': 0.5 * (conversion + base),
+        'span_b': span_b,
+    }
+
+
+# --- 마지막 값 커널 (1차원) ---
+def last_sma(values, window):
+    """마지막 window개 평균 (부족하거나 NaN이 있으면 NaN)"""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < window:
+        return np.nan
+    return values[-window:].mean()
+
+
+def _last_ewm(values, alpha):
+    # 전체 시계열 없이 마지막 EMA 값만: 각 값의 최종 가중치와의 내적
+    n = len(values)
+    weights = alpha * (1 - alpha) ** np.arange(n - 1, -1, -1, dtype=np.float64)
+    weights[0] = (1 - alpha) ** (n - 1)
+    return weights @ values
+
+
+def last_rsi_ewm(close, period=14):
+    """rsi_ewm(close, period)[-1]"""
+    close = np.asarray(close, dtype=np.float64)
+    if len(close) < period:
+        return np.nan
+    up, down = _ewm_directions(close)
+    return float(_rsi_from_averages(_last_ewm(up, 1 / period), _last_ewm(down, 1 / period)))
+
+
+def last_rsi_wilder(close, period=14):
+    """rsi_wilder(close, period)[-1]"""
+    close = np.asarray(close, dtype=np.float64)
+    if len(close) <= period:
+        return np.nan
+    deltas = np.diff(close)
+    gains = np.where(deltas > 0, deltas, 0.0)
+    losses = np.where(deltas > 0, 0.0, np.abs(deltas))
+    alpha = 1 / period
+    avg_gain = _last_ewm(np.concatenate(([gains[:period].mean()], gains[period:])), alpha)
+    avg_loss = _last_ewm(np.concatenate(([losses[:period].mean()], losses[period:])), alpha)
+    return float(_rsi_from_averages(avg_gain, avg_loss))
+
+
+def last_bollinger(close, period=20, num_std=2, ddof=1):
+    """반환: (중심선, 표준편차, 상단, 하단)의 마지막 값"""
+    close = np.asarray(close, dtype=np.float64)
+    if len(close) < period:
+        return (np.nan,) * 4
+    window = close[-period:]
+    mid = window.mean()
+    std = window.std(ddof=ddof)
+    return mid, std, mid + std * num_std, mid - std * num_std
+
+
+def last_stochastic(high, low, close, window=14, smooth=3):
+    """stochastic(...)의 마지막 (%K, %D). 마지막 smooth개 %K 만 계산"""
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    if len(close) < window:
+        return np.nan, np.nan
+    count = min(smooth, len(close) - window + 1)
+    span = window + count - 1
+    highest = np.lib.stride_tricks.sliding_window_view(high[-span:], window).max(axis=1)
+    lowest = np.lib.stride_tricks.sliding_window_view(low[-span:], window).min(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = 100 * (close[-count:] - lowest) / (highest - lowest)
+    return k[-1], (k.mean() if count == smooth else np.nan)
+
+
+def last_ichimoku(high, low, window1=9, window2=26, window3=52):
+    """ichimoku(...)의 마지막 값 dict"""
+    high, low = np.asarray(high, dtype=np.float64), np.asarray(low, dtype=np.float64)
+
+    def midpoint(window, min_periods):
+        if len(high) < min_periods:
+            return np.nan
+        return 0.5 * (np.nanmax(high[-window:]) + np.nanmin(low[-window:]))
+
+    conversion = midpoint(window1, window1)
+    base = midpoint(window2, window2)
+    return {
+        'conversion': conversion,
+        'base': base,
+        'span_a': 0.5 * (conversion + base),
+        'span_b': midpoint(window3, 1),
+    }
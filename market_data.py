@@ -0,0 +1,383 @@
+"""
+시세 데이터 공급자(provider) 인터페이스.
+- live: yfinance 실시간 조회
+- record: live로 조회하면서 응답을 디스크에 기록
+- replay: 기록된 응답만으로 재생 (네트워크 없이 같은 스캔을 그대로 재현)
+- synthetic: 임의 크기 유니버스의 가상 OHLCV 생성 (부하/프로파일링용)
+
+모든 스크립트는 get_provider()를 통해서만 시세를 조회하고,
+CLI에서는 add_provider_args / configure_from_args 로 공급자를 고른다.
+record/replay/synthetic 모드에서는 결과가 실행 시점에 따라 달라지지 않도록
+ohlcv_cache 의 디스크 캐시를 거치지 않는다 (provider.cacheable == False).
+"""
+
+import functools
+import hashlib
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+# numpy/pandas/yfinance 는 import 만으로 수백 ms~1초가 걸려서 실제로 쓰는 함수 안에서 import 한다
+# (--help, 사용법 출력 같은 빠른 경로는 표준 라이브러리만으로 끝나도록)
+
+PROVIDER_NAMES = ('live', 'record', 'replay', 'synthetic')
+DEFAULT_RECORD_DIR = os.path.join(".cache", "recordings", "default")
+SYNTHETIC_BARS_PER_YEAR = 252
+SYNTHETIC_MEMORY_TICKERS = 512  # 생성한 이력을 보관하는 최근 티커 수 (대형 유니버스에서도 메모리 일정)
+
+PERIOD_DAYS = {
+    '1d': 1,
+    '5d': 5,
+    '1mo': 31,
+    '3mo': 92,
+    '6mo': 183,
+    '1y': 366,
+    '2y': 731,
+    '5y': 1827,
+}
+
+
+EMPTY_RESPONSE = "응답에 데이터 없음"  # 조회는 성공했지만 빈 프레임이 온 경우의 실패 사유
+
+
+class ReplayMissError(Exception):
+    """replay 모드에서 기록되지 않은 요청을 받았을 때"""
+
+
+def split_download(raw, tickers):
+    """
+    yf.download(group_by='ticker') 결과를 티커별 DataFrame으로 분리.
+    반환: (frames, errors) - 빈 프레임으로 온 티커의 사유는 EMPTY_RESPONSE
+    """
+    import pandas as pd
+
+    frames = {}
+    errors = {}
+    for ticker in tickers:
+        reason = EMPTY_RESPONSE
+        if isinstance(raw.columns, pd.MultiIndex):
+            if ticker not in raw.columns.get_level_values(0):
+                errors[ticker] = reason
+                continue
+            df = raw[ticker]
+        else:
+            df = raw
+        # 다른 종목과 묶여 받으면서 생긴 빈 행(휴장일 등) 제거
+        df = df.dropna(subset=['Open', 'High', 'Low', 'Close'], how='all')
+        if df.empty:
+            errors[ticker] = reason
+            continue
+        df = df.copy()
+        df.columns.name = None
+        frames[ticker] = df
+    return frames, errors
+
+
+def _is_throttle_reason(reason):
+    import ohlcv_cache  # ohlcv_cache 가 이 모듈을 import 하므로 순환을 피해 함수 안에서
+
+    return ohlcv_cache.is_throttle_error(reason)
+
+
+class LiveProvider:
+    """yfinance로 실시간 조회"""
+    name = 'live'
+    cacheable = True
+
+    def download(self, tickers, **kwargs):
+        """여러 티커 일괄 조회. 반환: (frames, errors)"""
+        import yfinance as yf
+
+        tickers = list(tickers)
+        try:
+            raw = yf.download(
+                tickers,
+                group_by='ticker',
+                auto_adjust=True,
+                actions=True,
+                threads=True,
+                progress=False,
+                **kwargs,
+            )
+        except Exception as e:
+            return {}, {ticker: f"다운로드 실패: {e}" for ticker in tickers}
+        frames, errors = split_download(raw, tickers)
+        # yf.download 는 종목별 실패 사유를 호출마다 따로 두고 로그로만 남긴다.
+        # 빠진 종목만 단건으로 다시 조회해 실제 사유(상장폐지, 잘못된 심볼, 타임아웃, 요청 제한)를 얻는다.
+        throttled = None
+        for ticker in list(errors):
+            if throttled:
+                # 요청 제한 중에는 더 조회하지 않고 같은 사유로 보고 (호출한 쪽이 백오프 후 재시도)
+                errors[ticker] = throttled
+                continue
+            df, reason = self._probe(ticker, kwargs)
+            if df is None:
+                errors[ticker] = reason
+                if _is_throttle_reason(reason):
+                    throttled = reason
+            else:
+                frames[ticker] = df
+                del errors[ticker]
+        return frames, errors
+
+    def _probe(self, ticker, kwargs):
+        """
+        일괄 조회에서 빠진 티커 단건 재조회. 반환: (df, None) 또는 (None, 실패 사유)
+        예외는 "예외이름: 메시지", 예외 없이 빈 응답이면 yfinance 가 남긴 사유(없으면 EMPTY_RESPONSE).
+        """
+        import yfinance as yf
+
+        tkr = yf.Ticker(ticker)
+        try:
+            raw = tkr.history(auto_adjust=True, actions=True, **kwargs)
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}"
+        if raw is not None and not raw.empty:
+            frames, _ = split_download(raw, [ticker])
+            if ticker in frames:
+                return frames[ticker], None
+        # 상장폐지/시간대 없음 같은 실패는 예외 대신 PriceHistory 에 남는다
+        reason = getattr(getattr(tkr, '_price_history', None), '_last_error', None)
+        return None, reason or EMPTY_RESPONSE
+
+    def history(self, ticker, **kwargs):
+        """단일 티커 조회 (yf.Ticker.history 와 같은 인자)"""
+        import yfinance as yf
+
+        return yf.Ticker(ticker).history(**kwargs)
+
+    def watchlists(self, build):
+        return build()
+
+
+def _request_key(kind, ticker, kwargs):
+    payload = json.dumps([kind, ticker, kwargs], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class RecordProvider:
+    """live로 조회하면서 모든 응답(실패 포함)을 directory에 기록"""
+    name = 'record'
+    cacheable = False
+
+    def __init__(self, directory=DEFAULT_RECORD_DIR, inner=None):
+        self.directory = directory
+        self.inner = inner or LiveProvider()
+        os.makedirs(directory, exist_ok=True)
+
+    def _save(self, key, value):
+        import pandas as pd
+
+        path = os.path.join(self.directory, f"{key}.pkl")
+        pd.to_pickle(value, path)
+
+    def download(self, tickers, **kwargs):
+        tickers = list(tickers)
+        frames, errors = self.inner.download(tickers, **kwargs)
+        for ticker in tickers:
+            self._save(_request_key('download', ticker, kwargs), (frames.get(ticker), errors.get(ticker)))
+        return frames, errors
+
+    def history(self, ticker, **kwargs):
+        df = self.inner.history(ticker, **kwargs)
+        self._save(_request_key('history', ticker, kwargs), (df, None))
+        return df
+
+    def watchlists(self, build):
+        watchlist_kr, watchlist_us = self.inner.watchlists(build)
+        with open(os.path.join(self.directory, "watchlists.json"), 'w', encoding='utf-8') as f:
+            json.dump({'kr': watchlist_kr, 'us': watchlist_us}, f, ensure_ascii=False)
+        return watchlist_kr, watchlist_us
+
+
+class ReplayProvider:
+    """RecordProvider가 남긴 기록만으로 응답 (네트워크 사용 안 함)"""
+    name = 'replay'
+    cacheable = False
+
+    def __init__(self, directory=DEFAULT_RECORD_DIR):
+        if not os.path.isdir(directory):
+            raise ReplayMissError(f"기록 디렉터리가 없습니다: {directory}")
+        self.directory = directory
+
+    def _load(self, key, label):
+        import pandas as pd
+
+        path = os.path.join(self.directory, f"{key}.pkl")
+        if not os.path.exists(path):
+            raise ReplayMissError(f"기록되지 않은 요청: {label}")
+        return pd.read_pickle(path)
+
+    def download(self, tickers, **kwargs):
+        frames = {}
+        errors = {}
+        for ticker in tickers:
+            try:
+                df, error = self._load(_request_key('download', ticker, kwargs), f"{ticker} {kwargs}")
+            except ReplayMissError as e:
+                errors[ticker] = str(e)
+                continue
+            if df is not None:
+                frames[ticker] = df
+            else:
+                errors[ticker] = error
+        return frames, errors
+
+    def history(self, ticker, **kwargs):
+        df, _ = self._load(_request_key('history', ticker, kwargs), f"{ticker} {kwargs}")
+        return df
+
+    def watchlists(self, build):
+        path = os.path.join(self.directory, "watchlists.json")
+        if not os.path.exists(path):
+            raise ReplayMissError(f"기록된 유니버스가 없습니다: {path}")
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data['kr'], data['us']
+
+
+@functools.lru_cache(maxsize=8)
+def _business_days(end, n_bars):
+    import pandas as pd
+
+    return pd.bdate_range(end=end, periods=n_bars)
+
+
+def generate_ohlcv(ticker, n_bars, seed=0, end=None):
+    """
+    티커 이름과 seed로 결정되는 가상 일봉(추세가 천천히 바뀌는 기하 브라운 운동) 생성.
+    같은 (ticker, seed, n_bars)면 항상 같은 가격이 나온다.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(zlib.crc32(ticker.encode('utf-8')) + seed * 1_000_003)
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.now().normalize()
+    index = _business_days(end, n_bars)
+
+    drift = rng.normal(0.0003, 0.001, n_bars).cumsum() / np.arange(1, n_bars + 1)
+    returns = drift + rng.normal(0, rng.uniform(0.01, 0.03), n_bars)
+    close = rng.uniform(5, 500) * np.exp(np.cumsum(returns))
+    open_ = close * (1 + rng.normal(0, 0.005, n_bars))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, n_bars))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, n_bars))
+    volume = rng.lognormal(13, 0.5, n_bars).round()
+
+    return pd.DataFrame(
+        {
+            'Open': open_,
+            'High': high,
+            'Low': low,
+            'Close': close,
+            'Volume': volume,
+            'Dividends': 0.0,
+            'Stock Splits': 0.0,
+        },
+        index=index,
+    )
+
+
+def synthetic_watchlists(size):
+    """KR/US 각각 size개의 가상 티커 유니버스"""
+    watchlist_kr = {f"{i:06d}.KS": f"가상종목{i}" for i in range(size)}
+    watchlist_us = {f"SYN{i:04d}": f"Synthetic {i}" for i in range(size)}
+    return watchlist_kr, watchlist_us
+
+
+class SyntheticProvider:
+    """가상 OHLCV 공급자 - 임의 크기 유니버스로 네트워크 없이 스캔/프로파일링"""
+    name = 'synthetic'
+    cacheable = False
+
+    def __init__(self, seed=0, universe_size=100, history_bars=5 * SYNTHETIC_BARS_PER_YEAR):
+        self.seed = seed
+        self.universe_size = universe_size
+        self.history_bars = history_bars
+        self._full = OrderedDict()   # 최근에 쓴 티커 순 - 같은 (ticker, seed)는 다시 만들어도 같은 가격
+        self._full_lock = threading.Lock()  # 조회 스레드(파이프라인 fetch, --per-ticker 실행기)가 함께 사용
+
+    def _bars_for(self, period=None, start=None, **_):
+        if period in PERIOD_DAYS:
+            return max(2, int(PERIOD_DAYS[period] * SYNTHETIC_BARS_PER_YEAR / 365))
+        return self.history_bars
+
+    def _frame(self, ticker, period=None, start=None, interval='1d', **kwargs):
+        # 기간과 무관하게 같은 티커는 같은 가격이 되도록 전체 이력을 한 번 만들고 뒤에서 자름
+        with self._full_lock:
+            full = self._full.get(ticker)
+            if full is not None:
+                self._full.move_to_end(ticker)
+        if full is None:
+            # 생성은 잠금 밖에서 (다른 스레드가 먼저 넣었으면 같은 값이므로 그쪽을 사용)
+            generated = generate_ohlcv(ticker, self.history_bars, self.seed)
+            with self._full_lock:
+                full = self._full.setdefault(ticker, generated)
+                if len(self._full) > SYNTHETIC_MEMORY_TICKERS:
+                    self._full.popitem(last=False)
+        df = full.tail(self._bars_for(period))
+        if start is not None:
+            import pandas as pd
+
+            df = df[df.index >= pd.Timestamp(start)]
+        if interval == '1wk':
+            df = df.resample('W-MON', label='left', closed='left').agg({
+                'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last',
+                'Volume': 'sum', 'Dividends': 'sum', 'Stock Splits': 'sum',
+            }).dropna(subset=['Close'])
+        return df
+
+    def download(self, tickers, **kwargs):
+        return {ticker: self._frame(ticker, **kwargs) for ticker in tickers}, {}
+
+    def history(self, ticker, **kwargs):
+        return self._frame(ticker, **kwargs)
+
+    def watchlists(self, build):
+        return synthetic_watchlists(self.universe_size)
+
+
+_provider = None
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        _provider = LiveProvider()
+    return _provider
+
+
+def set_provider(provider):
+    global _provider
+    _provider = provider
+
+
+def create_provider(name, data_dir=None, seed=0, universe_size=100):
+    if name == 'live':
+        return LiveProvider()
+    if name == 'record':
+        return RecordProvider(data_dir or DEFAULT_RECORD_DIR)
+    if name == 'replay':
+        return ReplayProvider(data_dir or DEFAULT_RECORD_DIR)
+    if name == 'synthetic':
+        return SyntheticProvider(seed=seed, universe_size=universe_size)
+    raise ValueError(f"알 수 없는 provider: {name}")
+
+
+def add_provider_args(parser):
+    """argparse parser에 공급자 선택 옵션 추가"""
+    group = parser.add_argument_group("시세 데이터 공급자")
+    group.add_argument('--provider', choices=PROVIDER_NAMES, default='live',
+                       help="live(기본) / record(조회+기록) / replay(기록 재생) / synthetic(가상 데이터)")
+    group.add_argument('--data-dir', default=None,
+                       help=f"record/replay 기록 디렉터리 (기본: {DEFAULT_RECORD_DIR})")
+    group.add_argument('--seed', type=int, default=0, help="synthetic 가격 생성 seed")
+    group.add_argument('--universe-size', type=int, default=100, help="synthetic 시장별 종목 수")
+    return parser
+
+
+def configure_from_args(args):
+    provider = create_provider(args.provider, args.data_dir, args.seed, args.universe_size)
+    set_provider(provider)
+    return provider
@@ -0,0 +1,369 @@
+"""
+티커별 일봉(OHLCV) 디스크 캐시. 모든 스크립트가 get_histories / get_history 로 시세를 받는다.
+- 저장 위치: CACHE_DIR/<KR|US>/<ticker>.parquet (pyarrow 가 없으면 .pkl)
+  + CACHE_DIR/index.json ({ticker: {'covered_from', 'updated'}} - 캐시가 덮는 시작일과 마지막 갱신 시각)
+- 캐시가 없거나 요청 기간보다 짧으면 BASE_PERIOD 이상을 전체로 받아 저장
+- 있으면 마지막 캐시 봉 직전 OVERLAP_BARS 봉부터만 받아 이어 붙임 (FRESH_SECONDS 안이면 조회 생략)
+- 겹친 구간 종가가 RESTATEMENT_TOLERANCE 넘게 다르거나 새 봉에 배당/분할이 있으면
+  과거 수정주가가 바뀐 것으로 보고 전체 이력을 다시 받아 덮어씀
+record/replay/synthetic 공급자(cacheable == False)는 캐시를 거치지 않는다.
+"""
+
+import importlib.util
+import json
+import os
+import re
+import threading
+import time
+
+import market_data
+
+# --- 설정 (Config) ---
+CACHE_DIR = os.environ.get("SIMPLESTOCK_CACHE_DIR", os.path.join(".cache", "ohlcv"))
+BASE_PERIOD = "2y"            # 캐시가 없을 때 처음 받아두는 기간 (모든 스크립트 공용)
+OVERLAP_BARS = 5              # 증분 다운로드 시 겹쳐 받는 봉 수 (수정주가 검증용)
+RESTATEMENT_TOLERANCE = 1e-4  # 겹치는 구간 종가의 허용 상대오차
+FRESH_SECONDS = 15 * 60       # 이 시간 안에 갱신된 캐시는 네트워크 조회 생략
+DEFAULT_CHUNK_SIZE = 50
+
+PERIOD_DAYS = market_data.PERIOD_DAYS
+
+# 요청 제한 판단: 예외 이름/메시지, 또는 HTTP 상태 표기의 429 만 (티커 코드·URL 에 든 숫자 429 는 제외)
+THROTTLE_PATTERN = re.compile(
+    r"YFRateLimitError|Too Many Requests|\brate[ -]limit"
+    r"|\b(?:HTTP(?: Error)?|status(?: code)?|response)[\s:=]*429\b|\b429 Client Error",
+    re.IGNORECASE,
+)
+
+# pyarrow 는 import 가 무거워서 설치 여부만 확인 (pandas 는 쓰는 함수 안에서 import)
+CACHE_FORMAT = "parquet" if importlib.util.find_spec("pyarrow") is not None else "pickle"
+
+_index_lock = threading.Lock()
+
+# 같은 프로세스에서 반복 조회할 때(상주 워커 등) 디스크를 다시 읽지 않도록 파일 mtime 기준으로 보관
+_frame_memory = {}   # {ticker: (mtime_ns, DataFrame)}
+_index_memory = {}   # {'mtime_ns': ..., 'index': {...}}
+
+
+class RateLimitError(Exception):
+    """데이터 소스가 요청을 제한(HTTP 429 등)했을 때 발생"""
+
+
+def is_throttle_error(error):
+    """예외 또는 실패 사유 문자열이 요청 제한(throttling)에 해당하는지 판단"""
+    if isinstance(error, RateLimitError):
+        return True
+    if isinstance(error, BaseException):
+        text = f"{type(error).__name__}: {error}"
+    else:
+        text = str(error)
+    return THROTTLE_PATTERN.search(text) is not None
+
+
+def _market_of(ticker):
+    return 'KR' if ticker.endswith(('.KS', '.KQ')) else 'US'
+
+
+def _cache_path(ticker):
+    ext = "parquet" if CACHE_FORMAT == "parquet" else "pkl"
+    return os.path.join(CACHE_DIR, _market_of(ticker), f"{ticker}.{ext}")
+
+
+def _index_path():
+    return os.path.join(CACHE_DIR, "index.json")
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _load_index():
+    path = _index_path()
+    mtime = _mtime_ns(path)
+    if mtime is None:
+        return {}
+    if _index_memory.get('mtime_ns') == mtime:
+        return dict(_index_memory['index'])
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    _index_memory.update(mtime_ns=mtime, index=index)
+    return dict(index)
+
+
+def _update_index(entries):
+    with _index_lock:
+        index = _load_index()
+        index.update(entries)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = _index_path() + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, _index_path())
+        _index_memory.update(mtime_ns=_mtime_ns(_index_path()), index=index)
+
+
+def _read_frame(ticker):
+    import pandas as pd
+
+    path = _cache_path(ticker)
+    mtime = _mtime_ns(path)
+    if mtime is None:
+        return None
+    remembered = _frame_memory.get(ticker)
+    if remembered is not None and remembered[0] == mtime:
+        return remembered[1]
+    try:
+        if CACHE_FORMAT == "parquet":
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_pickle(path)
+    except Exception:
+        return None
+    _frame_memory[ticker] = (mtime, df)
+    return df
+
+
+def forget(tickers):
+    """tickers 의 프레임을 프로세스 메모리에서 내려놓음 (디스크 캐시는 그대로)"""
+    for ticker in tickers:
+        _frame_memory.pop(ticker, None)
+
+
+def _write_frame(ticker, df):
+    path = _cache_path(ticker)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    if CACHE_FORMAT == "parquet":
+        df.to_parquet(tmp_path)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+    _frame_memory[ticker] = (_mtime_ns(path), df)
+
+
+def _period_start(period):
+    import pandas as pd
+
+    return pd.Timestamp.now().normalize() - pd.Timedelta(days=PERIOD_DAYS[period])
+
+
+def _longer_period(a, b):
+    return a if PERIOD_DAYS[a] >= PERIOD_DAYS[b] else b
+
+
+def trim_to_period(df, period):
+    """캐시된 전체 이력에서 요청 기간(period)에 해당하는 구간만 잘라서 반환"""
+    import pandas as pd
+
+    if df is None or df.empty or period not in PERIOD_DAYS:
+        return df
+    cutoff = pd.Timestamp.now(tz=df.index.tz) - pd.Timedelta(days=PERIOD_DAYS[period])
+    return df[df.index >= cutoff.normalize()]
+
+
+def download(tickers, **kwargs):
+    """
+    현재 시세 공급자(market_data)로 여러 티커를 한 번에 받아 티커별 DataFrame으로 분리.
+    반환: (frames, errors) - frames는 {ticker: df}, errors는 {ticker: 실패 사유}
+    """
+    return market_data.get_provider().download(list(tickers), **kwargs)
+
+
+def _is_restated(cached, fresh):
+    """
+    겹쳐 받은 구간의 종가가 캐시와 다르거나 새 봉에 배당/분할 이벤트가 있으면
+    과거 수정주가가 바뀐 것으로 보고 True 반환.
+    캐시의 마지막 봉은 장중 미완성 봉일 수 있으므로 비교에서 제외한다.
+    """
+    import pandas as pd
+
+    last_cached = cached.index[-1]
+    common = cached.index[:-1].intersection(fresh.index)
+    if len(common) == 0:
+        return True
+
+    old_close = cached.loc[common, 'Close']
+    new_close = fresh.loc[common, 'Close']
+    rel_diff = ((old_close - new_close).abs() / old_close.abs()).max()
+    if pd.isna(rel_diff) or rel_diff > RESTATEMENT_TOLERANCE:
+        return True
+
+    new_bars = fresh[fresh.index > last_cached]
+    for col in ('Dividends', 'Stock Splits'):
+        if col in new_bars.columns and (new_bars[col].fillna(0) != 0).any():
+            return True
+    return False
+
+
+def _merge(cached, fresh):
+    import pandas as pd
+
+    merged = pd.concat([cached[cached.index < fresh.index[0]], fresh])
+    return merged[~merged.index.duplicated(keep='last')].sort_index()
+
+
+def get_histories(tickers, period="1y", chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    여러 티커의 일봉을 캐시 우선으로 조회.
+    - 캐시가 없거나 기간이 부족하면 전체 이력을 받아 저장
+    - 캐시가 있으면 마지막 캐시 봉 이후(겹침 OVERLAP_BARS 포함)만 받아 이어 붙임
+    - 배당/분할로 과거 가격이 바뀌었으면 전체 이력을 다시 받아 덮어씀
+    반환: (frames, errors)
+    """
+    import pandas as pd
+
+    tickers = list(dict.fromkeys(tickers))
+    if period not in PERIOD_DAYS or not market_data.get_provider().cacheable:
+        # record/replay/synthetic 은 실행 시점과 무관하게 같은 요청이 나가도록 캐시를 거치지 않음
+        return _fetch_full(tickers, period, chunk_size, store=False)
+
+    index = _load_index()
+    now = time.time()
+    required_start = _period_start(period)
+
+    frames = {}
+    full_needed = []
+    delta_needed = {}
+
+    for ticker in tickers:
+        meta = index.get(ticker)
+        cached = _read_frame(ticker)
+        if cached is None or cached.empty or meta is None:
+            full_needed.append(ticker)
+            continue
+        if pd.Timestamp(meta['covered_from']) > required_start + pd.Timedelta(days=3):
+            full_needed.append(ticker)
+            continue
+        if now - meta.get('updated', 0) < FRESH_SECONDS:
+            frames[ticker] = cached
+            continue
+        delta_needed[ticker] = cached
+
+    errors = {}
+
+    # 1. 증분 다운로드: 마지막 캐시 봉 직전 OVERLAP_BARS부터 받아 이어 붙이기
+    delta_tickers = list(delta_needed)
+    restated = []
+    updated_meta = {}
+    for start in range(0, len(delta_tickers), chunk_size):
+        chunk = delta_tickers[start:start + chunk_size]
+        since = min(
+            delta_needed[t].index[-min(OVERLAP_BARS, len(delta_needed[t]))] for t in chunk
+        )
+        fresh_frames, chunk_errors = download(chunk, start=since.strftime('%Y-%m-%d'))
+        for ticker in chunk:
+            cached = delta_needed[ticker]
+            fresh = fresh_frames.get(ticker)
+            if fresh is None:
+                # 증분 조회 실패 시 기존 캐시라도 사용하고 실패 사유는 보고
+                frames[ticker] = cached
+                errors[ticker] = f"증분 갱신 실패(캐시 사용): {chunk_errors.get(ticker, '알 수 없음')}"
+                continue
+            if _is_restated(cached, fresh):
+                restated.append(ticker)
+                continue
+            merged = _merge(cached, fresh)
+            _write_frame(ticker, merged)
+            updated_meta[ticker] = {
+                'covered_from': index[ticker]['covered_from'],
+                'updated': now,
+            }
+            frames[ticker] = merged
+    if updated_meta:
+        _update_index(updated_meta)
+
+    # 2. 전체 다운로드: 신규 티커, 기간 부족, 수정주가 변경
+    full_frames, full_errors = _fetch_full(
+        full_needed + restated,
+        _longer_period(period, BASE_PERIOD),
+        chunk_size,
+        store=True,
+    )
+    frames.update(full_frames)
+    errors.update(full_errors)
+    for ticker in restated:
+        if ticker not in full_frames:
+            frames[ticker] = delta_needed[ticker]
+            errors[ticker] = f"수정주가 재수집 실패(캐시 사용): {full_errors.get(ticker, '알 수 없음')}"
+
+    result = {t: trim_to_period(frames[t], period) for t in tickers if t in frames}
+    return result, {t: errors[t] for t in tickers if t in errors}
+
+
+def _fetch_full(tickers, period, chunk_size, store):
+    frames = {}
+    errors = {}
+    for start in range(0, len(tickers), chunk_size):
+        chunk = tickers[start:start + chunk_size]
+        chunk_frames, chunk_errors = download(chunk, period=period)
+        frames.update(chunk_frames)
+        errors.update(chunk_errors)
+
+    if store and frames and period in PERIOD_DAYS:
+        covered_from = _period_start(period).strftime('%Y-%m-%d')
+        now = time.time()
+        for ticker, df in frames.items():
+            _write_frame(ticker, df)
+        _update_index({t: {'covered_from': covered_from, 'updated': now} for t in frames})
+    return frames, errors
+
+
+def to_weekly(df):
+    """
+    일봉을 주봉으로 변환 (yfinance interval='1wk' 와 같은 규칙).
+    실제 거래일만 월~일 한 주로 묶고 날짜는 그 주 월요일(휴장이어도)로 표기하므로
+    휴장일이 다른 KR/US 모두 거래소 달력에 맞는다. 거래일이 없는 주는 생기지 않는다.
+    """
+    import pandas as pd
+
+    if df is None or df.empty:
+        return df
+    days = df.index.normalize()
+    week_start = days - pd.to_timedelta(days.dayofweek, unit='D')
+    aggregations = {
+        'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum',
+        'Dividends': 'sum', 'Stock Splits': 'sum',
+    }
+    weekly = df.groupby(week_start).agg({k: v for k, v in aggregations.items() if k in df.columns})
+    weekly.index.name = df.index.name
+    return weekly
+
+
+def validate_weekly(daily, reference, tolerance=RESTATEMENT_TOLERANCE):
+    """
+    to_weekly(daily) 를 데이터 소스가 준 주봉(reference)과 비교.
+    진행 중인 마지막 주는 제외하고 겹치는 주의 OHLC 상대오차를 본다.
+    반환: (비교한 주 수, 허용오차를 넘은 주의 DataFrame)
+    """
+    import pandas as pd
+
+    local = to_weekly(daily)
+    common = local.index[:-1].intersection(reference.index)
+    if len(common) == 0:
+        return 0, pd.DataFrame()
+    columns = ['Open', 'High', 'Low', 'Close']
+    ours = local.loc[common, columns]
+    theirs = reference.loc[common, columns]
+    rel_diff = ((ours - theirs).abs() / theirs.abs()).max(axis=1)
+    bad = rel_diff > tolerance
+    mismatches = pd.concat([ours[bad].add_suffix('_local'), theirs[bad].add_suffix('_source')], axis=1)
+    return len(common), mismatches
+
+
+def get_history(ticker, period="1y"):
+    """
+    단일 티커 일봉 조회 (캐시 사용). 데이터가 없으면 빈 DataFrame 반환.
+    요청 제한으로 실패한 경우에는 재시도할 수 있도록 RateLimitError 발생.
+    """
+    import pandas as pd
+
+    frames, errors = get_histories([ticker], period=period, chunk_size=1)
+    if ticker not in frames and is_throttle_error(errors.get(ticker, "")):
+        raise RateLimitError(errors[ticker])
+    return frames.get(ticker, pd.DataFrame())
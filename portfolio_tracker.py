@@ -1,83 +1,216 @@
-import yfinance as yf
-import pandas as pd
-import csv
+import argparse
 import os
 from datetime import datetime
 
+# numpy/pandas 와 청산 계산(backtest, indicator_panel)은 장부가 있을 때만 import
+import market_data
+import ohlcv_cache
+import quotes
+import trade_ledger
+
+EXIT_LABELS = {
+    trade_ledger.STATUS_STOP: "🛑 손절(SL)",
+    trade_ledger.STATUS_TARGET: "🎯 익절(TP)",
+}
+
+
+def _history_period(since):
+    """since(가장 오래된 진입일)부터의 일봉을 담는 가장 짧은 조회 기간"""
+    import pandas as pd
+
+    days = (pd.Timestamp.now().normalize() - pd.Timestamp(since)).days + 7
+    for period, period_days in sorted(ohlcv_cache.PERIOD_DAYS.items(), key=lambda x: x[1]):
+        if period_days >= days:
+            return period
+    return max(ohlcv_cache.PERIOD_DAYS, key=ohlcv_cache.PERIOD_DAYS.get)
+
+
+def starts_after_entry(trades, frames):
+    """frames 일봉이 진입일보다 늦게 시작하는 거래 (진입 직후 경로를 알 수 없음). 반환: trades 순서의 bool 배열"""
+    import pandas as pd
+
+    first_bars = {}
+    for ticker, df in frames.items():
+        if len(df):
+            first = df.index[:1]
+            if getattr(first, 'tz', None) is not None:
+                first = first.tz_localize(None)
+            first_bars[ticker] = first[0]
+    first_dates = pd.to_datetime(trades['Ticker'].map(first_bars))
+    return (first_dates > pd.to_datetime(trades['Date'])).to_numpy()
+
+
+def find_trade_exits(trades, frames, from_first_bar=False):
+    """
+    진입일 다음 봉부터 마지막 봉까지 고가/저가가 SL/TP에 처음 닿은 봉을 모든 거래에 대해 한 번에 탐색
+    (backtest.find_exits 와 같은 규칙: 갭은 시가 체결, 같은 봉에서 둘 다 닿으면 손절).
+    진입일이 frames 첫 봉보다 앞선 거래는 그 사이 경로를 모르므로 건너뛴다.
+    from_first_bar=True 면 그런 거래도 frames 첫 봉부터 탐색 (최근 며칠만 받아 새 봉을 확인하는 watch 용).
+    반환: 청산된 거래만 담은 DataFrame (Id, Status, Exit_Date, Exit_Price, Realized_Pct)
+    """
+    import numpy as np
+    import pandas as pd
+
+    import backtest
+    import indicator_panel
+
+    columns = ['Id', 'Status', 'Exit_Date', 'Exit_Price', 'Realized_Pct']
+    trades = trades[trades['Ticker'].isin(list(frames))]
+    if not from_first_bar:
+        trades = trades[~starts_after_entry(trades, frames)]
+    if trades.empty:
+        return pd.DataFrame(columns=columns)
+
+    tickers, fields, lengths = indicator_panel.build_panel(frames)
+    n_rows = fields['Close'].shape[0]
+    dates = indicator_panel.build_dates(frames, tickers, n_rows)
+    cols = trades['Ticker'].map({t: j for j, t in enumerate(tickers)}).to_numpy()
+
+    # 진입일 봉의 행 번호 = (앞쪽 빈 행 수) + (진입일 이하 봉 수) - 1
+    # (진입일 이하 봉이 없으면 첫 봉 바로 앞 행 -> 첫 봉부터 탐색, from_first_bar 인 경우만 남아 있음)
+    entry_dates = pd.to_datetime(trades['Date']).to_numpy(dtype='datetime64[ns]')
+    on_or_before = (dates[:, cols] <= entry_dates[None, :]).sum(axis=0)
+    entry_rows = (n_rows - lengths[cols]) + on_or_before - 1
+
+    is_long = ~trades['Type'].str.contains("SHORT").to_numpy()
+    entry = trades['Entry_Price'].to_numpy(dtype=float)
+    exit_rows, exit_prices, outcomes = backtest.find_exits(
+        fields['Open'], fields['High'], fields['Low'], fields['Close'],
+        entry_rows, cols, is_long,
+        trades['SL'].to_numpy(dtype=float), trades['TP'].to_numpy(dtype=float),
+        max_hold=n_rows,
+    )
+
+    hit = (outcomes == backtest.OUTCOME_STOP) | (outcomes == backtest.OUTCOME_TARGET)
+    realized = np.where(is_long, exit_prices / entry - 1, 1 - exit_prices / entry) * 100
+    return pd.DataFrame({
+        'Id': trades['Id'].to_numpy()[hit],
+        'Status': np.where(outcomes[hit] == backtest.OUTCOME_STOP,
+                           trade_ledger.STATUS_STOP, trade_ledger.STATUS_TARGET),
+        'Exit_Date': pd.DatetimeIndex(dates[exit_rows, cols][hit]).strftime('%Y-%m-%d'),
+        'Exit_Price': exit_prices[hit].round(2),
+        'Realized_Pct': realized[hit].round(2),
+    }, columns=columns)
+
+
+def record_exits(conn, trades, frames, from_first_bar=False):
+    """frames 일봉으로 trades 의 SL/TP 도달을 확인해 장부에 청산 기록. 반환: 새로 청산된 거래"""
+    exits = find_trade_exits(trades, frames, from_first_bar)
+    trade_ledger.close_trades(conn, exits.itertuples(index=False, name=None))
+    return trades.drop(columns=exits.columns.drop('Id')).merge(exits, on='Id')
+
+
+def settle_exits(conn, trades):
+    """진행중 거래의 SL/TP 도달 여부를 진입일부터의 일봉 경로로 확인해 장부에 청산 기록. 반환: 새로 청산된 거래"""
+    if trades.empty:
+        return trades
+    frames, errors = ohlcv_cache.get_histories(
+        trades['Ticker'].unique(), period=_history_period(trades['Date'].min())
+    )
+    for ticker, reason in errors.items():
+        print(f"⚠️ {ticker} 일봉 조회 실패(청산 확인 생략): {reason}")
+    for row in trades[starts_after_entry(trades, frames)].itertuples(index=False):
+        print(f"⚠️ {row.Ticker} 진입일({row.Date})이 받은 일봉({frames[row.Ticker].index[0]:%Y-%m-%d})보다 앞서"
+              f" 청산 확인 생략 (진행중 유지)")
+    return record_exits(conn, trades, frames)
+
+
 def check_portfolio():
-    trade_log_file = 'paper_trades.csv'
-    
-    if not os.path.exists(trade_log_file):
-        print("📭 아직 가상 매매 기록(paper_trades.csv)이 없습니다.")
-        return
+    """
+    장부의 진행중 포지션을 점검해 출력.
+    반환: (이번에 청산된 거래 DataFrame, 진행중 포지션 DataFrame) - 장부가 없으면 None
+    """
+    if not os.path.exists(trade_ledger.LEDGER_DB) and not os.path.exists(trade_ledger.LEGACY_CSV):
+        print(f"📭 아직 가상 매매 기록({trade_ledger.LEDGER_DB})이 없습니다.")
+        return None
+    import numpy as np
 
-    df = pd.read_csv(trade_log_file)
-    if df.empty:
-        print("📭 가상 매매 기록이 비어있습니다.")
-        return
+    with trade_ledger.open_ledger() as conn:
+        df = trade_ledger.open_trades(conn)
+        newly_closed = settle_exits(conn, df)
+        realized = trade_ledger.closed_trades(conn)['Realized_Pct']
+    df = df[~df['Id'].isin(newly_closed['Id'])].copy()
 
     print(f"📈 **가상 포트폴리오 수익률 중간 점검 (Paper Trading)**")
     print(f"기준일시: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("-" * 70)
 
-    total_profit_pct = 0
-    active_trades = 0
-
-    for index, row in df.iterrows():
-        ticker = row['Ticker']
-        entry_price = float(row['Entry_Price'])
-        trade_type = row['Type']
-        sl = float(row['SL'])
-        tp = float(row['TP'])
-        
-        # 현재가 조회
-        try:
-            stock = yf.Ticker(ticker)
-            current_price = stock.history(period="1d")['Close'].iloc[-1]
-        except Exception as e:
-            print(f"⚠️ {ticker} 현재가 조회 실패: {e}")
-            continue
-            
-        # 롱 / 숏에 따른 수익률 계산
-        if "SHORT" in trade_type:
-            # 숏은 가격이 내려가야 수익
-            profit_pct = ((entry_price - current_price) / entry_price) * 100
-        else:
-            # 롱은 가격이 올라가야 수익
-            profit_pct = ((current_price - entry_price) / entry_price) * 100
-
-        total_profit_pct += profit_pct
-        active_trades += 1
-        
-        currency = "₩" if row['Market'] == 'KR' else "$"
-        
-        # 청산 조건 확인
-        status = "🟢 진행중"
-        if "LONG" in trade_type:
-            if current_price <= sl:
-                status = "🛑 손절(SL) 도달"
-            elif current_price >= tp:
-                status = "🎯 익절(TP) 도달"
-        else: # SHORT
-            if current_price >= sl:
-                status = "🛑 숏 스퀴즈 손절(SL)"
-            elif current_price <= tp:
-                status = "🎯 숏 커버링 익절(TP)"
-
-        icon = "🚀" if "LONG" in trade_type else "🩸"
-        sign = "+" if profit_pct > 0 else ""
-        
-        print(f"{icon} [{row['Date']}] {row['Name']} ({ticker}) - {trade_type}")
-        print(f"   진입가: {currency}{entry_price:,.2f}  ->  현재가: {currency}{current_price:,.2f} ({status})")
-        print(f"   수익률: {sign}{profit_pct:.2f}% (SL: {currency}{sl:,.2f} / TP: {currency}{tp:,.2f})")
-        print(f"   진입근거: {row['Reasons']}")
+    # 이번 점검에서 SL/TP 도달이 확인된 거래 (장부에 청산 기록되어 다음부터는 평가하지 않음)
+    for row in newly_closed.itertuples(index=False):
+        currency = "₩" if row.Market == 'KR' else "$"
+        sign = "+" if row.Realized_Pct > 0 else ""
+        print(f"🔒 [{row.Date} -> {row.Exit_Date}] {row.Name} ({row.Ticker}) - {row.Type} {EXIT_LABELS[row.Status]} 청산")
+        print(f"   진입가: {currency}{float(row.Entry_Price):,.2f}  ->  청산가: {currency}{row.Exit_Price:,.2f} (실현 {sign}{row.Realized_Pct:.2f}%)")
+        print("")
+
+    if df.empty:
+        print("📭 진행중인 가상 매매 포지션이 없습니다.")
+
+    # 서로 다른 티커만 한 번에 조회 (같은 티커가 여러 날 기록돼도 1회)
+    prices, errors = quotes.get_last_prices(df['Ticker'].unique())
+    for ticker, reason in errors.items():
+        print(f"⚠️ {ticker} 현재가 조회 실패: {reason}")
+
+    df['Current_Price'] = df['Ticker'].map(prices)
+    df = df[df['Current_Price'].notna()].copy()
+
+    entry_price = df['Entry_Price'].astype(float)
+    current_price = df['Current_Price'].astype(float)
+    sl = df['SL'].astype(float)
+    tp = df['TP'].astype(float)
+    is_short = df['Type'].str.contains("SHORT")
+    is_long = df['Type'].str.contains("LONG")
+
+    # 롱 / 숏에 따른 수익률 계산 (숏은 가격이 내려가야 수익)
+    df['Profit_Pct'] = np.where(
+        is_short,
+        (entry_price - current_price) / entry_price * 100,
+        (current_price - entry_price) / entry_price * 100,
+    )
+
+    # 청산 조건 확인
+    df['Status'] = np.select(
+        [
+            is_long & (current_price <= sl),
+            is_long & (current_price >= tp),
+            ~is_long & (current_price >= sl),
+            ~is_long & (current_price <= tp),
+        ],
+        ["🛑 손절(SL) 도달", "🎯 익절(TP) 도달", "🛑 숏 스퀴즈 손절(SL)", "🎯 숏 커버링 익절(TP)"],
+        default="🟢 진행중",
+    )
+
+    for row in df.itertuples(index=False):
+        currency = "₩" if row.Market == 'KR' else "$"
+        icon = "🚀" if "LONG" in row.Type else "🩸"
+        sign = "+" if row.Profit_Pct > 0 else ""
+
+        print(f"{icon} [{row.Date}] {row.Name} ({row.Ticker}) - {row.Type}")
+        print(f"   진입가: {currency}{float(row.Entry_Price):,.2f}  ->  현재가: {currency}{row.Current_Price:,.2f} ({row.Status})")
+        print(f"   수익률: {sign}{row.Profit_Pct:.2f}% (SL: {currency}{float(row.SL):,.2f} / TP: {currency}{float(row.TP):,.2f})")
+        print(f"   진입근거: {row.Reasons}")
         print("")
 
     print("-" * 70)
-    if active_trades > 0:
-        avg_profit = total_profit_pct / active_trades
+    if len(df) > 0:
+        avg_profit = df['Profit_Pct'].mean()
         sign = "+" if avg_profit > 0 else ""
         print(f"💰 **포트폴리오 평균 수익률: {sign}{avg_profit:.2f}%**")
+    if len(realized) > 0:
+        avg_realized = realized.mean()
+        sign = "+" if avg_realized > 0 else ""
+        print(f"🔒 **청산 완료 {len(realized)}건 평균 실현 수익률: {sign}{avg_realized:.2f}%**")
+    return newly_closed, df
 
-if __name__ == "__main__":
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="가상 매매(Paper Trading) 포트폴리오 수익률 점검")
+    market_data.add_provider_args(parser)
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    market_data.configure_from_args(args)
     check_portfolio()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+LLM 프롬프트에 넣는 시세/지표 데이터의 압축 인코딩과 프롬프트 크기 관리.
+- table: 예전 방식 (DataFrame.to_string 고정폭 표 / 설명형 문장)
+- csv: 가격은 자릿수에 맞춰 반올림, 거래량은 K/M 단위, 공백 없는 CSV
+- delta: 첫 봉만 실제 가격, 이후 봉은 직전 종가 대비 변화량 (숫자가 짧아짐)
+- summary: 최근 SUMMARY_RECENT_BARS 봉은 csv 그대로, 그 이전은 SUMMARY_BLOCK 봉씩 묶은 요약봉
+입력 길이가 LLM 응답 시간을 좌우하므로, 예산(추정 토큰)을 넘으면 가장 오래된 봉부터 잘라낸다.
+"""
+
+ENCODINGS = ('table', 'csv', 'delta', 'summary')
+DEFAULT_ENCODING = 'csv'
+SUMMARY_RECENT_BARS = 20
+SUMMARY_BLOCK = 5
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def estimate_tokens(text):
+    """대략적인 토큰 수: ASCII는 4글자당 1토큰, 한글 등 그 외 문자는 글자당 1토큰으로 계산"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def price_decimals(values):
+    """가격 크기에 맞는 소수 자릿수 (원화처럼 큰 가격은 정수, 1 미만 동전주는 4자리)"""
+    import pandas as pd
+
+    values = pd.Series(values).dropna().abs()
+    if values.empty:
+        return 2
+    typical = values.median()
+    if typical >= 1000:
+        return 0
+    if typical >= 1:
+        return 2
+    return 4
+
+
+def volume_unit(volumes):
+    """거래량 크기에 맞는 (배율, 단위 표기)"""
+    import pandas as pd
+
+    volumes = pd.Series(volumes).dropna()
+    typical = volumes.median() if not volumes.empty else 0
+    if typical >= 10_000_000:
+        return 1_000_000, 'M'
+    if typical >= 10_000:
+        return 1_000, 'K'
+    return 1, ''
+
+
+def _fmt(value, decimals):
+    import pandas as pd
+
+    if pd.isna(value):
+        return ''
+    text = f"{value:.{decimals}f}"
+    if decimals and '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return text if text != '-0' else '0'
+
+
+def _bars_csv(bars, decimals, scale, unit):
+    import pandas as pd
+
+    lines = [f"Date,O,H,L,C,V({unit or '주'})"]
+    for date, o, h, l, c, v in zip(bars.index, *(bars[col] for col in BAR_COLUMNS)):
+        lines.append(",".join([
+            pd.Timestamp(date).strftime('%Y-%m-%d'),
+            _fmt(o, decimals), _fmt(h, decimals), _fmt(l, decimals), _fmt(c, decimals),
+            _fmt(v / scale, 1 if scale > 1 else 0),
+        ]))
+    return "\n".join(lines)
+
+
+def _bars_delta(bars, decimals, scale, unit):
+    import pandas as pd
+
+    lines = [f"# 첫 행은 실제 가격, 이후 O/H/L/C는 직전 행 종가 대비 변화량. V({unit or '주'})"]
+    lines.append("Date,O,H,L,C,V")
+    prev_close = None
+    for date, o, h, l, c, v in zip(bars.index, *(bars[col] for col in BAR_COLUMNS)):
+        date = pd.Timestamp(date)
+        if prev_close is None:
+            label = date.strftime('%Y-%m-%d')
+            prices = (o, h, l, c)
+        else:
+            label = date.strftime('%m-%d')
+            prices = (o - prev_close, h - prev_close, l - prev_close, c - prev_close)
+        lines.append(",".join([label] + [_fmt(p, decimals) for p in prices] + [_fmt(v / scale, 1 if scale > 1 else 0)]))
+        if not pd.isna(c):
+            prev_close = c
+    return "\n".join(lines)
+
+
+def _bars_summary(bars, decimals, scale, unit):
+    import numpy as np
+
+    recent = bars.tail(SUMMARY_RECENT_BARS)
+    older = bars.iloc[:len(bars) - len(recent)]
+    parts = []
+    if not older.empty:
+        # 가장 최근 쪽 경계가 맞도록 뒤에서부터 SUMMARY_BLOCK 봉씩 묶음 (가장 오래된 구간만 짧을 수 있음)
+        block_id = (len(older) - 1 - np.arange(len(older))) // SUMMARY_BLOCK
+        summary = older.groupby(block_id, sort=False).agg(
+            Open=('Open', 'first'), High=('High', 'max'), Low=('Low', 'min'),
+            Close=('Close', 'last'), Volume=('Volume', 'sum'),
+        )
+        summary.index = older.index.to_series().groupby(block_id, sort=False).first().to_numpy()
+        parts.append(f"# 이전 {len(older)}봉: {SUMMARY_BLOCK}봉 요약 (Date는 구간 첫 날, V는 구간 합계)")
+        parts.append(_bars_csv(summary, decimals, scale, unit))
+    parts.append(f"# 최근 {len(recent)}봉: 일봉")
+    parts.append(_bars_csv(recent, decimals, scale, unit))
+    return "\n".join(parts)
+
+
+def encode_bars(df, encoding=DEFAULT_ENCODING):
+    """OHLCV DataFrame을 지정한 방식의 문자열로 변환"""
+    bars = df[BAR_COLUMNS]
+    if encoding == 'table':
+        return bars.to_string()
+    decimals = price_decimals(bars['Close'])
+    scale, unit = volume_unit(bars['Volume'])
+    if encoding == 'csv':
+        return _bars_csv(bars, decimals, scale, unit)
+    if encoding == 'delta':
+        return _bars_delta(bars, decimals, scale, unit)
+    if encoding == 'summary':
+        return _bars_summary(bars, decimals, scale, unit)
+    raise ValueError(f"알 수 없는 인코딩: {encoding}")
+
+
+def fit_bars(df, encoding=DEFAULT_ENCODING, max_tokens=None, min_bars=SUMMARY_RECENT_BARS):
+    """
+    encode_bars 결과가 max_tokens(추정) 안에 들어오도록 가장 오래된 봉부터 잘라냄.
+    최소 min_bars 봉은 남긴다. 반환: (문자열, 사용한 봉 수)
+    """
+    text = encode_bars(df, encoding)
+    if not max_tokens or estimate_tokens(text) <= max_tokens or len(df) <= min_bars:
+        return text, len(df)
+    low, high = min(min_bars, len(df)), len(df) - 1   # low는 항상 채택 가능한 봉 수
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(encode_bars(df.tail(mid), encoding)) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return encode_bars(df.tail(low), encoding), low
+
+
+def encode_records(records, columns, encoding=DEFAULT_ENCODING, describe=None, max_tokens=None):
+    """
+    dict 목록(종목별 지표 등)을 문자열로 변환.
+    columns: [(키, CSV 헤더, 소수 자릿수 - 문자열 값이면 None)]. table 방식은 describe(record)가 만든 설명형 문장을 이어 붙임.
+    max_tokens를 넘으면 뒤쪽(우선순위 낮은) 레코드부터 뺀다. 반환: (문자열, 사용한 레코드 수)
+    """
+    def render(rows):
+        if encoding == 'table' and describe is not None:
+            return "".join(describe(r) for r in rows)
+        lines = [",".join(header for _, header, _ in columns)]
+        for r in rows:
+            lines.append(",".join(
+                str(r[key]) if decimals is None else _fmt(float(r[key]), decimals)
+                for key, _, decimals in columns
+            ))
+        return "\n".join(lines) + "\n"
+
+    count = len(records)
+    text = render(records)
+    while max_tokens and count > 2 and estimate_tokens(text) > max_tokens:
+        count -= 1
+        text = render(records[:count])
+    return text, count
+
+
+def size_report(sections):
+    """{섹션명: 문자열} -> 섹션별 글자 수 / 추정 토큰 표"""
+    rows = [(name, len(text), estimate_tokens(text)) for name, text in sections.items()]
+    width = max([len(name) for name, _, _ in rows] + [5])
+    lines = [f"{'섹션':<{width}}  {'글자':>8}  {'토큰(추정)':>10}"]
+    for name, chars, tokens in rows:
+        lines.append(f"{name:<{width}}  {chars:>8,}  {tokens:>10,}")
+    lines.append(f"{'합계':<{width}}  {sum(r[1] for r in rows):>8,}  {sum(r[2] for r in rows):>10,}")
+    return "\n".join(lines)
+
+
+def add_encoding_args(parser):
+    """argparse parser에 프롬프트 인코딩/예산 옵션 추가"""
+    group = parser.add_argument_group("프롬프트 데이터 인코딩")
+    group.add_argument('--encoding', choices=ENCODINGS, default=DEFAULT_ENCODING,
+                       help=f"데이터 표기 방식 (기본: {DEFAULT_ENCODING}, table은 예전 고정폭 표)")
+    group.add_argument('--prompt-budget', type=int, default=0, metavar='TOKENS',
+                       help="프롬프트 전체 추정 토큰 상한 (넘으면 오래된 봉부터 제외, 0: 제한 없음)")
+    group.add_argument('--prompt-report', action='store_true', help="섹션별 프롬프트 크기 출력")
+    return parser
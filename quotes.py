@@ -0,0 +1,106 @@
+"""
+여러 티커의 최신 가격을 한 번의 일괄 요청으로 조회하는 모듈 (짧은 TTL 캐시 포함).
+같은 티커가 여러 번 요청돼도 한 번만 조회하므로 조회 시간은 거래 건수가 아니라
+서로 다른 티커 수에 비례한다.
+"""
+
+import json
+import os
+import time
+
+import market_data
+
+QUOTE_CACHE_FILE = os.path.join(".cache", "quotes.json")
+QUOTE_TTL_SECONDS = 60
+QUOTE_PERIOD = "5d"        # 휴장일이 끼어도 마지막 종가가 나오도록 며칠치 요청
+CHUNK_SIZE = 100
+
+
+def _load_cache():
+    if not os.path.exists(QUOTE_CACHE_FILE):
+        return {}
+    try:
+        with open(QUOTE_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache):
+    os.makedirs(os.path.dirname(QUOTE_CACHE_FILE), exist_ok=True)
+    tmp_path = QUOTE_CACHE_FILE + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, QUOTE_CACHE_FILE)
+
+
+def fetch_recent_frames(tickers, chunk_size=CHUNK_SIZE):
+    """
+    티커별 최근 며칠(QUOTE_PERIOD) 일봉을 일괄 조회 (종가 없는 봉은 제외).
+    반환: (frames, errors) - frames는 {ticker: df}
+    """
+    tickers = list(dict.fromkeys(tickers))
+    provider = market_data.get_provider()
+    frames = {}
+    errors = {}
+    for start in range(0, len(tickers), chunk_size):
+        chunk = tickers[start:start + chunk_size]
+        chunk_frames, chunk_errors = provider.download(chunk, period=QUOTE_PERIOD)
+        errors.update(chunk_errors)
+        for ticker, df in chunk_frames.items():
+            df = df.dropna(subset=['Close'])
+            if df.empty:
+                errors[ticker] = "최근 종가 없음"
+                continue
+            frames[ticker] = df
+    return frames, errors
+
+
+def fetch_last_bars(tickers, chunk_size=CHUNK_SIZE):
+    """
+    티커별 마지막 일봉(OHLCV dict)을 일괄 조회.
+    반환: (bars, errors) - bars는 {ticker: {'Date', 'Open', 'High', 'Low', 'Close', 'Volume'}}
+    """
+    frames, errors = fetch_recent_frames(tickers, chunk_size)
+    bars = {}
+    for ticker, df in frames.items():
+        last = df.iloc[-1]
+        bars[ticker] = {
+            'Date': str(df.index[-1]),
+            'Open': float(last['Open']),
+            'High': float(last['High']),
+            'Low': float(last['Low']),
+            'Close': float(last['Close']),
+            'Volume': float(last['Volume']),
+        }
+    return bars, errors
+
+
+def get_last_prices(tickers, ttl=QUOTE_TTL_SECONDS):
+    """
+    중복을 제거한 티커들의 최신 종가를 반환. ttl 초 안에 조회한 가격은 캐시에서 재사용.
+    반환: (prices, errors) - prices는 {ticker: 가격}
+    """
+    tickers = list(dict.fromkeys(tickers))
+    use_cache = market_data.get_provider().cacheable and ttl > 0
+    cache = _load_cache() if use_cache else {}
+    now = time.time()
+
+    prices = {}
+    missing = []
+    for ticker in tickers:
+        entry = cache.get(ticker)
+        if entry and now - entry['at'] < ttl:
+            prices[ticker] = entry['price']
+        else:
+            missing.append(ticker)
+
+    errors = {}
+    if missing:
+        bars, errors = fetch_last_bars(missing)
+        for ticker, bar in bars.items():
+            prices[ticker] = bar['Close']
+            cache[ticker] = {'price': bar['Close'], 'at': now}
+        if use_cache and bars:
+            _save_cache(cache)
+    return prices, errors
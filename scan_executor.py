@@ -0,0 +1,86 @@
+"""
+analyze_stock 같은 종목 단위 작업을 제한된 스레드 풀에서 병렬 실행하는 실행기.
+- 토큰 버킷으로 초당 요청 수를 제한
+- 데이터 소스가 요청을 제한하면 지수 백오프 후 재시도하고, 버킷 속도를 절반으로 줄였다가
+  성공이 이어지면 설정 속도까지 천천히 회복 (AIMD)
+- 결과는 완료 순서와 무관하게 입력 순서대로 돌려주므로 순차 실행과 같다
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ohlcv_cache import is_throttle_error
+
+DEFAULT_WORKERS = 8
+DEFAULT_RATE = 4.0        # 초당 요청 수
+MIN_RATE = 0.2
+MAX_RETRIES = 4
+BACKOFF_BASE = 2.0        # 초, 재시도마다 2배
+BACKOFF_MAX = 60.0
+
+
+class TokenBucket:
+    """초당 rate개씩 토큰이 쌓이고(최대 capacity개) acquire()는 토큰 하나를 얻을 때까지 대기"""
+
+    def __init__(self, rate, capacity=None):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def throttle(self):
+        """요청 제한 감지 시 속도를 절반으로"""
+        with self.lock:
+            self.rate = max(MIN_RATE, self.rate / 2)
+
+    def recover(self):
+        """성공 시 설정 속도의 10%씩 회복"""
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+
+def run_scan(fn, items, max_workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+             max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE):
+    """
+    items의 각 원소(튜플)를 fn(*item)으로 실행.
+    반환: (results, errors) - results는 입력 순서의 결과 리스트(실패는 None),
+          errors는 {입력 인덱스: 실패 사유}
+    """
+    items = list(items)
+    bucket = TokenBucket(rate)
+    results = [None] * len(items)
+    errors = {}
+
+    def run_one(index):
+        item = items[index]
+        for attempt in range(max_retries + 1):
+            bucket.acquire()
+            try:
+                results[index] = fn(*item)
+                bucket.recover()
+                return
+            except Exception as e:
+                if not is_throttle_error(e) or attempt == max_retries:
+                    errors[index] = f"{type(e).__name__}: {e}"
+                    return
+                bucket.throttle()
+                time.sleep(min(BACKOFF_MAX, backoff_base * (2 ** attempt)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(run_one, range(len(items))))
+    return results, errors
@@ -0,0 +1,192 @@
+"""
+스캔/위원회 실행 계측.
+- stage(name): 단계별 벽시계 시간 누적 (universe, fetch, indicators, scoring, ledger, llm 등)
+  여러 스레드에서 같은 단계를 동시에 재면 합산되므로 전체 실행 시간보다 클 수 있다.
+- ticker_latency(seconds): 종목 하나를 처리하는 데 걸린 시간 -> p50/p90/p99/max
+- skip(reason): 종목이 신호 없이 빠진 이유 (이력 부족, 지표 NaN, 조회 실패 ...)
+- write(path): JSON 메트릭 파일, profiled(path): cProfile 덤프 (--metrics / --profile)
+프로세스 풀에서 계산한 종목은 자식 프로세스의 계측값을 결과와 함께 돌려받아 merge() 한다.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+
+SKIP_FETCH_ERROR = 'fetch_error'          # 시세 조회 실패 / 데이터 없음
+SKIP_SHORT_HISTORY = 'short_history'      # 지표 계산에 필요한 봉 수 부족
+SKIP_NAN_INDICATORS = 'nan_indicators'    # 마지막 봉의 지표가 NaN
+SKIP_NO_SIGNAL = 'no_signal'              # 점수 기준 미달
+SKIP_ANALYSIS_ERROR = 'analysis_error'    # 계산 중 예외
+SKIP_PREFILTERED = 'prefiltered'          # 1단계 필터(지표 상태 + 최근 시세)에서 제외
+
+PERCENTILES = (50, 90, 99)
+
+_lock = threading.Lock()
+_state = {}
+
+
+def reset():
+    with _lock:
+        _state.clear()
+        _state.update(started=time.time(), stages={}, latencies=[], skips={}, counts={})
+
+
+reset()
+
+
+def add_stage(name, seconds):
+    with _lock:
+        total, calls = _state['stages'].get(name, (0.0, 0))
+        _state['stages'][name] = (total + seconds, calls + 1)
+
+
+@contextlib.contextmanager
+def stage(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_stage(name, time.perf_counter() - started)
+
+
+def ticker_latency(seconds):
+    with _lock:
+        _state['latencies'].append(seconds)
+
+
+def skip(reason, n=1):
+    _add('skips', reason, n)
+
+
+def count(name, n=1):
+    _add('counts', name, n)
+
+
+def _add(kind, key, n):
+    if n:
+        with _lock:
+            _state[kind][key] = _state[kind].get(key, 0) + n
+
+
+def export():
+    """merge() 로 다른 프로세스에 넘길 수 있는 원시 계측값"""
+    with _lock:
+        return {
+            'stages': dict(_state['stages']),
+            'latencies': list(_state['latencies']),
+            'skips': dict(_state['skips']),
+            'counts': dict(_state['counts']),
+        }
+
+
+def merge(raw):
+    for name, (seconds, calls) in raw['stages'].items():
+        with _lock:
+            total, previous = _state['stages'].get(name, (0.0, 0))
+            _state['stages'][name] = (total + seconds, previous + calls)
+    with _lock:
+        _state['latencies'].extend(raw['latencies'])
+    for reason, n in raw['skips'].items():
+        skip(reason, n)
+    for name, n in raw['counts'].items():
+        count(name, n)
+
+
+def measured_call(fn, *args):
+    """
+    프로세스 풀 작업용: 자식 프로세스의 계측값을 비우고 fn(*args) 실행.
+    반환: (결과, export()) - 부모에서 merge() 한다.
+    """
+    reset()
+    return fn(*args), export()
+
+
+def percentiles(values):
+    """nearest-rank 백분위수 (ms)"""
+    if not values:
+        return {'count': 0}
+    ordered = sorted(values)
+    summary = {'count': len(ordered)}
+    for p in PERCENTILES:
+        rank = max(1, -(-p * len(ordered) // 100))   # ceil(p/100 * n)
+        summary[f'p{p}_ms'] = round(ordered[rank - 1] * 1000, 3)
+    summary['max_ms'] = round(ordered[-1] * 1000, 3)
+    summary['mean_ms'] = round(sum(ordered) / len(ordered) * 1000, 3)
+    return summary
+
+
+def snapshot():
+    raw = export()
+    return {
+        'elapsed_s': round(time.time() - _state['started'], 3),
+        'stages': {
+            name: {'seconds': round(seconds, 4), 'calls': calls}
+            for name, (seconds, calls) in raw['stages'].items()
+        },
+        'ticker_latency': percentiles(raw['latencies']),
+        'skips': raw['skips'],
+        'counts': raw['counts'],
+    }
+
+
+def report():
+    """단계별 시간 / 종목 지연 / 제외 사유 요약 몇 줄"""
+    snap = snapshot()
+    stages = " / ".join(f"{name} {v['seconds']:.2f}s" for name, v in snap['stages'].items()) or "-"
+    latency = snap['ticker_latency']
+    lines = [f"⏱️ 단계별 시간: {stages} (전체 {snap['elapsed_s']:.2f}s)"]
+    if latency['count']:
+        lines.append(
+            f"   종목별 처리 {latency['count']}건: p50 {latency['p50_ms']:.1f}ms"
+            f" / p90 {latency['p90_ms']:.1f}ms / p99 {latency['p99_ms']:.1f}ms / max {latency['max_ms']:.1f}ms"
+        )
+    if snap['skips']:
+        lines.append("   제외 사유: " + ", ".join(f"{k} {v}" for k, v in sorted(snap['skips'].items())))
+    return "\n".join(lines)
+
+
+def write(path, command=None):
+    snap = snapshot()
+    if command:
+        snap['command'] = command
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(snap, f, ensure_ascii=False, indent=1)
+
+
+@contextlib.contextmanager
+def profiled(path=None):
+    """path 가 있으면 블록 실행을 cProfile 로 기록해 path 에 저장 (pstats / snakeviz 로 열람)"""
+    if not path:
+        yield
+        return
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"🔬 cProfile 결과 저장: {path} (python3 -m pstats {path})")
+
+
+def add_metrics_args(parser):
+    """argparse parser에 계측 옵션 추가"""
+    group = parser.add_argument_group("계측")
+    group.add_argument('--metrics', metavar='PATH', help="단계별 시간/종목 지연/제외 사유를 JSON 으로 저장")
+    group.add_argument('--profile', metavar='PATH', help="cProfile 결과를 PATH 에 저장")
+    return parser
+
+
+def finish(args, command=None):
+    """실행 끝에 요약 출력 + --metrics 파일 저장"""
+    print(report())
+    if args.metrics:
+        write(args.metrics, command)
+        print(f"📊 메트릭 저장: {args.metrics}")
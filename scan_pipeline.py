@@ -0,0 +1,117 @@
+"""
+fetch -> compute -> collect 단계를 겹쳐서 돌리는 스캔 파이프라인.
+- fetch: 스레드들이 chunk 단위로 이력을 받아 크기 제한 큐에 넣음 (큐가 차면 대기 = backpressure)
+- compute: 큐에서 꺼낸 종목을 프로세스 풀에 넘겨 지표 계산 + 점수화 (동시 작업 수 제한)
+- collect: 완료된 결과를 입력 순서 자리에 모아 반환
+Ctrl+C 시 대기 중인 작업을 취소하고 fetch 스레드를 멈춘 뒤 KeyboardInterrupt를 다시 올린다.
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+DEFAULT_CHUNK_SIZE = 20
+DEFAULT_FETCH_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 4        # 계산을 기다리는 chunk 최대 개수
+IN_FLIGHT_PER_WORKER = 2      # 프로세스당 동시에 맡겨둘 종목 수
+
+_DONE = object()
+
+
+def _put(q, item, stop):
+    """stop이 설정되면 포기하는 blocking put"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.2)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def run_pipeline(items, fetch_batch, compute, chunk_size=DEFAULT_CHUNK_SIZE,
+                 fetch_workers=DEFAULT_FETCH_WORKERS, compute_workers=None,
+                 queue_size=DEFAULT_QUEUE_SIZE, on_result=None, initializer=None, initargs=()):
+    """
+    items: [(ticker, ...)] - 각 원소는 compute에 넘길 인자 (df는 마지막 인자로 추가됨)
+    fetch_batch(tickers) -> (frames, errors)
+    compute(*item, df) -> 결과 (프로세스 풀에서 실행되므로 모듈 최상위 함수여야 함)
+    on_result(item, result): 결과가 나올 때마다 호출 (선택)
+    initializer(*initargs): 계산 프로세스마다 시작할 때 한 번 실행 (선택) - spawn 방식(macOS/Windows 기본)
+        에서는 부모의 모듈 상태가 복사되지 않으므로 compute 가 쓰는 설정은 여기서 넘긴다
+    반환: (results, errors) - results는 items 순서의 결과 리스트(미완료/실패는 None),
+          errors는 {ticker: 실패 사유}
+    """
+    items = list(items)
+    compute_workers = compute_workers or os.cpu_count() or 1
+    max_in_flight = compute_workers * IN_FLIGHT_PER_WORKER
+    chunks = [list(range(i, min(i + chunk_size, len(items)))) for i in range(0, len(items), chunk_size)]
+
+    fetched = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    results = [None] * len(items)
+    errors = {}
+
+    def fetch_chunk(indices):
+        if stop.is_set():
+            return
+        tickers = [items[i][0] for i in indices]
+        try:
+            frames, fetch_errors = fetch_batch(tickers)
+        except Exception as e:
+            frames, fetch_errors = {}, {t: f"다운로드 실패: {e}" for t in tickers}
+        _put(fetched, (indices, frames, fetch_errors), stop)
+
+    def run_fetchers():
+        with ThreadPoolExecutor(max_workers=fetch_workers) as pool:
+            list(pool.map(fetch_chunk, chunks))
+        _put(fetched, _DONE, stop)
+
+    def collect(done, futures):
+        for future in done:
+            index = futures.pop(future)
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                errors[items[index][0]] = f"{type(e).__name__}: {e}"
+                continue
+            if on_result:
+                on_result(items[index], results[index])
+
+    fetch_thread = threading.Thread(target=run_fetchers, daemon=True)
+    fetch_thread.start()
+
+    futures = {}
+    procs = ProcessPoolExecutor(max_workers=compute_workers, initializer=initializer, initargs=initargs)
+    try:
+        while True:
+            message = fetched.get()
+            if message is _DONE:
+                break
+            indices, frames, fetch_errors = message
+            errors.update(fetch_errors)
+            for index in indices:
+                ticker = items[index][0]
+                if ticker not in frames:
+                    continue
+                while len(futures) >= max_in_flight:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    collect(done, futures)
+                futures[procs.submit(compute, *items[index], frames[ticker])] = index
+        done, _ = wait(futures)
+        collect(done, futures)
+    except BaseException:
+        stop.set()
+        for future in futures:
+            future.cancel()
+        procs.shutdown(wait=False, cancel_futures=True)
+        while True:  # 대기 중인 fetch 스레드가 put에서 풀려나도록 비움
+            try:
+                fetched.get_nowait()
+            except queue.Empty:
+                break
+        raise
+    procs.shutdown()
+    fetch_thread.join()
+    return results, errors
@@ -0,0 +1,350 @@
+"""
+롱/숏 점수 규칙을 설정(dict / JSON)으로 정의하고, 전 종목을 한 번에 평가하는 배열 연산으로 컴파일.
+- 스캐너(simple_scanner)와 백테스트(backtest)가 같은 RuleSet 을 쓰므로 전략 변경은 설정 수정만으로 끝난다.
+- 입력은 {지표 이름: 배열} - 유니버스 마지막 봉이면 (N,), 백테스트면 (T, N). 모양만 같으면 된다.
+
+설정 형식 (DEFAULT_RULES 참고, `python3 scoring_rules.py > rules.json` 으로 기본값을 파일로 받을 수 있음)
+  required: 마지막 봉에서 NaN 이면 점수를 매기지 않는 지표
+  sides: 순서대로 선택 우선순위. 방향마다
+    label / direction(1 롱, -1 숏) / min_score / stop_atr / target_atr (진입가 ± 배수 × ATR, 0 미만은 0)
+    when: 이 조건을 모두 만족할 때만 아래 규칙을 평가 (추세 필터 등)
+    rules: [{if: [조건...], score: 가중치, reason: 사유 문자열, group: 이름}]
+      - 같은 group 안에서는 먼저 맞은 규칙 하나만 적용 (if/elif 사슬)
+      - reason 은 str.format 으로 지표 값({RSI:.1f})과 ratio(첫 '지표 vs 지표' 조건의 좌변/우변)를 채운다
+  조건: [좌변, 연산자, 우변] 또는 [좌변, 연산자, 우변 지표, 배수]
+        좌변/우변은 지표 이름 (뒤에 @prev 를 붙이면 전일 값), 우변은 숫자도 가능
+선택: 방향 점수가 min_score 이상이고 뒤 순서 방향들의 점수보다 크거나 같으면 그 방향 (앞 방향 우선)
+"""
+
+import argparse
+import json
+import operator
+
+RSI_THRESHOLD_LOW = 30   # 과매도 (매수 고려)
+RSI_THRESHOLD_HIGH = 70  # 과매수 (매도 고려)
+VOLUME_SPIKE_MULTIPLIER = 1.5
+PREV_SUFFIX = '@prev'
+
+OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+DEFAULT_RULES = {
+    'required': ['RSI', 'EMA50', 'EMA200', 'Volume_MA20', 'ATR14'],
+    'sides': [
+        {
+            'name': 'long',
+            'label': 'LONG (매수)',
+            'direction': 1,
+            'min_score': 40,
+            'stop_atr': 1.5,
+            'target_atr': 2,
+            # 상승추세 필터 (정배열)
+            'when': [['Close', '>', 'EMA200'], ['EMA50', '>', 'EMA200']],
+            'rules': [
+                {'group': 'rsi', 'if': [['RSI', '<=', RSI_THRESHOLD_LOW]], 'score': 30,
+                 'reason': "RSI 과매도({RSI:.1f})"},
+                {'group': 'rsi', 'if': [['RSI', '<=', 40]], 'score': 10, 'reason': "RSI 저점({RSI:.1f})"},
+                {'group': 'macd', 'if': [['MACD@prev', '<', 'Signal_Line@prev'], ['MACD', '>', 'Signal_Line']],
+                 'score': 40, 'reason': "MACD 골든크로스(상승전환)"},
+                {'group': 'macd', 'if': [['MACD', '>', 'Signal_Line']], 'score': 10},  # 정배열 유지 중
+                {'if': [['Close', '<=', 'Lower_Band', 1.03]], 'score': 30, 'reason': "볼린저밴드 하단 근접(반등기대)"},
+                {'if': [['Volume', '>=', 'Volume_MA20', VOLUME_SPIKE_MULTIPLIER]], 'score': 15,
+                 'reason': "거래량 급증({ratio:.1f}x)"},
+                {'if': [['RSI', '>=', RSI_THRESHOLD_HIGH]], 'score': -20, 'reason': "RSI 과매수(주의)"},
+                {'if': [['Close', '>=', 'Upper_Band', 0.97]], 'score': -10, 'reason': "볼린저밴드 상단 근접(저항)"},
+            ],
+        },
+        {
+            # 윌리엄 오닐 기법: 고점 대비 15% 이상 하락 & 50일선 아래 & 50일선 4% 이내로 거래량 없이 반등
+            'name': 'short',
+            'label': 'SHORT (공매도)',
+            'direction': -1,
+            'min_score': 50,
+            'stop_atr': 1.5,
+            'target_atr': 3,
+            'when': [['Close', '<', 'High_52W', 0.85], ['Close', '<', 'EMA50'], ['Close', '>=', 'EMA50', 0.96]],
+            'rules': [
+                {'if': [], 'score': 40, 'reason': "50일선 저항/가짜 반등(O'Neil Short)"},
+                {'if': [['Volume', '<', 'Volume_MA20', 0.8]], 'score': 20, 'reason': "거래량 부진({ratio:.1f}x)"},
+                {'if': [['EMA50', '<', 'EMA200']], 'score': 10, 'reason': "역배열(Death Cross 상태)"},
+            ],
+        },
+    ],
+}
+
+
+def _field(name):
+    """'MACD@prev' -> ('MACD', True)"""
+    if name.endswith(PREV_SUFFIX):
+        return name[:-len(PREV_SUFFIX)], True
+    return name, False
+
+
+def _referenced(conditions):
+    """컴파일된 조건들이 참조하는 (마지막 봉 지표, 전일 지표) 이름 집합"""
+    current, previous = set(), set()
+    for left, left_prev, _, right, right_prev, _ in conditions:
+        (previous if left_prev else current).add(left)
+        if right_prev is not None:
+            (previous if right_prev else current).add(right)
+    return current, previous
+
+
+def _best_score(rules):
+    """규칙을 최대한 맞았을 때의 점수 (group 마다 가장 큰 가중치 하나, 감점 규칙은 제외)"""
+    best = 0
+    groups = {}
+    for rule in rules:
+        if rule['group'] is None:
+            best += max(rule['score'], 0)
+        else:
+            groups[rule['group']] = max(groups.get(rule['group'], 0), rule['score'])
+    return best + sum(groups.values())
+
+
+def _compile_condition(condition):
+    """[좌변, 연산자, 우변(, 배수)] -> (좌변, 전일 여부, 연산 함수, 우변, 우변 전일 여부, 배수) - 우변이 숫자면 우변 전일 여부는 None"""
+    if not isinstance(condition, (list, tuple)) or len(condition) not in (3, 4):
+        raise ValueError(f"조건 형식 오류 (좌변, 연산자, 우변[, 배수]): {condition}")
+    left, op, right = condition[:3]
+    factor = condition[3] if len(condition) == 4 else 1
+    if op not in OPERATORS:
+        raise ValueError(f"알 수 없는 연산자 {op!r}: {condition}")
+    if not isinstance(left, str):
+        raise ValueError(f"좌변은 지표 이름이어야 합니다: {condition}")
+    left, left_prev = _field(left)
+    if isinstance(right, str):
+        right, right_prev = _field(right)
+    elif isinstance(right, (int, float)) and len(condition) == 3:
+        right_prev = None
+    else:
+        raise ValueError(f"우변은 지표 이름 또는 숫자여야 합니다 (배수는 지표일 때만): {condition}")
+    return left, left_prev, OPERATORS[op], right, right_prev, factor
+
+
+class RuleSet:
+    """설정을 검증·컴파일해 둔 점수 규칙. evaluate() 한 번이 모든 종목(또는 모든 봉)을 계산한다."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.required = list(spec.get('required', []))
+        self.sides = []
+        for side in spec['sides']:
+            rules = []
+            for rule in side.get('rules', []):
+                conditions = [_compile_condition(c) for c in rule.get('if', [])]
+                ratio = next(((c[0], c[1], c[3], c[4]) for c in conditions if c[4] is not None), None)
+                rules.append({
+                    'group': rule.get('group'),
+                    'if': conditions,
+                    'score': rule['score'],
+                    'reason': rule.get('reason'),
+                    'ratio': ratio,
+                })
+            self.sides.append({
+                'name': side['name'],
+                'label': side.get('label', side['name']),
+                'direction': 1 if side.get('direction', 1) >= 0 else -1,
+                'min_score': side.get('min_score', 0),
+                'stop_atr': side['stop_atr'],
+                'target_atr': side['target_atr'],
+                'when': [_compile_condition(c) for c in side.get('when', [])],
+                'rules': rules,
+                'best_score': _best_score(rules),
+            })
+        if not self.sides:
+            raise ValueError("sides 가 비어 있습니다")
+        weights = [rule['score'] for side in self.sides for rule in side['rules']]
+        self.score_type = int if all(isinstance(w, int) for w in weights) else float
+
+        gates = [c for side in self.sides for c in side['when']]
+        current, previous = _referenced(gates + [c for side in self.sides for r in side['rules'] for c in r['if']])
+        self.fields = sorted(current | set(self.required))  # 마지막 봉에서 필요한 지표
+        self.previous_fields = sorted(previous)             # 전일 값이 필요한 지표
+        current, previous = _referenced(gates)
+        self.gate_fields = sorted(current)                  # reachable() 에 필요한 지표
+        self.gate_previous_fields = sorted(previous)
+
+    def _condition(self, compiled, current, previous):
+        left, left_prev, op, right, right_prev, factor = compiled
+        lhs = (previous if left_prev else current)[left]
+        if right_prev is None:
+            rhs = right
+        else:
+            rhs = (previous if right_prev else current)[right]
+            if factor != 1:
+                rhs = rhs * factor
+        return op(lhs, rhs)
+
+    def _all(self, conditions, current, previous, shape):
+        import numpy as np
+
+        mask = np.ones(shape, dtype=bool)
+        for compiled in conditions:
+            mask &= self._condition(compiled, current, previous)
+        return mask
+
+    def evaluate(self, current, previous):
+        """
+        current/previous: {지표 이름: 같은 모양의 배열} (previous 는 previous_fields 만 있으면 됨)
+        반환: {'valid': bool 배열, 방향 이름: {'score': 점수 배열, 'hits': [규칙별 bool 배열]}}
+        """
+        import numpy as np
+
+        shape = np.shape(current[self.fields[0]])
+        result = {}
+        with np.errstate(invalid='ignore'):
+            valid = np.ones(shape, dtype=bool)
+            for name in self.required:
+                valid &= ~np.isnan(current[name])
+            result['valid'] = valid
+
+            for side in self.sides:
+                gate = self._all(side['when'], current, previous, shape)
+                score = np.zeros(shape, dtype=self.score_type)
+                taken = {}
+                hits = []
+                for rule in side['rules']:
+                    hit = gate & self._all(rule['if'], current, previous, shape)
+                    group = rule['group']
+                    if group is not None:
+                        taken.setdefault(group, np.zeros(shape, dtype=bool))
+                        hit &= ~taken[group]
+                        taken[group] |= hit
+                    score = score + np.where(hit, rule['score'], 0).astype(self.score_type)
+                    hits.append(hit)
+                result[side['name']] = {'score': score, 'hits': hits}
+        return result
+
+    def _relaxed(self, compiled, current, previous, margin):
+        """조건을 우변의 margin 비율만큼 느슨하게 평가 (값이 NaN 이면 판단 불가 -> 통과)"""
+        import numpy as np
+
+        left, left_prev, op, right, right_prev, factor = compiled
+        lhs = np.asarray((previous if left_prev else current)[left], dtype=float)
+        if right_prev is None:
+            rhs = np.asarray(right, dtype=float)
+        else:
+            rhs = np.asarray((previous if right_prev else current)[right], dtype=float) * factor
+        slack = margin * np.abs(rhs)
+        if op in (operator.lt, operator.le):
+            passed = op(lhs, rhs + slack)
+        elif op in (operator.gt, operator.ge):
+            passed = op(lhs, rhs - slack)
+        else:
+            passed = op(lhs, rhs)
+        return passed | np.isnan(lhs) | np.isnan(rhs)
+
+    def reachable(self, current, previous, margin=0.0):
+        """
+        오늘 신호가 날 수 있는 종목 mask - 방향별 when 조건(추세/셋업 필터)만 margin 만큼 느슨하게 평가.
+        규칙 점수를 모두 받아도 min_score 에 못 미치는 방향은 처음부터 제외한다.
+        current/previous 는 gate_fields / gate_previous_fields 만 있으면 된다.
+        """
+        import numpy as np
+
+        shape = np.shape(next(iter(current.values()))) if current else ()
+        reachable = np.zeros(shape, dtype=bool)
+        with np.errstate(invalid='ignore'):
+            for side in self.sides:
+                if side['best_score'] < side['min_score']:
+                    continue
+                mask = np.ones(shape, dtype=bool)
+                for compiled in side['when']:
+                    mask &= self._relaxed(compiled, current, previous, margin)
+                reachable |= mask
+        return reachable
+
+    def select(self, result):
+        """
+        방향 선택. 반환: (방향 번호 배열 - 신호 없으면 -1, 선택된 방향의 점수 배열)
+        """
+        import numpy as np
+
+        scores = [result[side['name']]['score'] for side in self.sides]
+        chosen = np.full(np.shape(scores[0]), -1)
+        for i, side in enumerate(self.sides):
+            pick = result['valid'] & (chosen < 0) & (scores[i] >= side['min_score'])
+            for later in scores[i + 1:]:
+                pick &= scores[i] >= later
+            chosen[pick] = i
+        score = np.zeros(np.shape(scores[0]), dtype=self.score_type)
+        for i, side_score in enumerate(scores):
+            score = np.where(chosen == i, side_score, score)
+        return chosen, score
+
+    def exits(self, side_index, price, atr):
+        """진입가/ATR 기준 (손절가, 목표가). side_index 는 방향 번호 배열 또는 정수"""
+        import numpy as np
+
+        direction = np.array([side['direction'] for side in self.sides])[side_index]
+        stop_atr = np.array([side['stop_atr'] for side in self.sides])[side_index]
+        target_atr = np.array([side['target_atr'] for side in self.sides])[side_index]
+        stop = np.maximum(price - direction * stop_atr * atr, 0)
+        target = np.maximum(price + direction * target_atr * atr, 0)
+        return stop, target
+
+    def reasons(self, result, side_index, j, current):
+        """j 번째 종목이 side_index 방향에서 맞은 규칙의 사유 문자열 목록"""
+        side = self.sides[side_index]
+        hits = result[side['name']]['hits']
+        values = {name: current[name][j] for name in self.fields}
+        reasons = []
+        for rule, hit in zip(side['rules'], hits):
+            if not hit[j] or not rule['reason']:
+                continue
+            ratio = None
+            if rule['ratio'] is not None:
+                left, _, right, _ = rule['ratio']
+                ratio = values[left] / values[right]
+            reasons.append(rule['reason'].format(ratio=ratio, **values))
+        return reasons
+
+
+_active = {'rules': None}
+
+
+def load_rules(path):
+    """JSON 규칙 파일 -> RuleSet"""
+    with open(path, encoding='utf-8') as f:
+        return RuleSet(json.load(f))
+
+
+def get_rules():
+    if _active['rules'] is None:
+        _active['rules'] = RuleSet(DEFAULT_RULES)
+    return _active['rules']
+
+
+def set_rules(rules):
+    _active['rules'] = rules
+
+
+def add_rules_args(parser):
+    """argparse parser에 점수 규칙 파일 옵션 추가"""
+    group = parser.add_argument_group("점수 규칙")
+    group.add_argument('--rules', metavar='PATH', default=None,
+                       help="점수 규칙 JSON 파일 (기본: 내장 규칙, `python3 scoring_rules.py` 로 출력)")
+    return parser
+
+
+def configure_from_args(args):
+    rules = load_rules(args.rules) if args.rules else RuleSet(DEFAULT_RULES)
+    set_rules(rules)
+    return rules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="기본 점수 규칙을 JSON 으로 출력 (--rules 파일의 출발점)")
+    parser.parse_args()
+    print(json.dumps(DEFAULT_RULES, ensure_ascii=False, indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,40 @@
-import yfinance as yf
-import pandas as pd
+import argparse
 import datetime
-import re
-import requests
-from bs4 import BeautifulSoup
-import csv
+import importlib.util
+import json
 import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# pandas/requests/bs4 와 지표 계산 모듈(numpy)은 쓰는 함수 안에서 import
+# (--help 나 캐시된 유니버스 조회처럼 가벼운 경로에서 import 비용을 내지 않도록)
+import indicator_state
+import market_data
+import ohlcv_cache
+import scan_executor
+import scan_metrics
+import scan_pipeline
+import scoring_rules
+import trade_ledger
 
 # --- 설정 (Config) ---
-RSI_THRESHOLD_LOW = 30   # 과매도 (매수 고려)
-RSI_THRESHOLD_HIGH = 70  # 과매수 (매도 고려)
+# 롱/숏 점수 조건·가중치·SL/TP 배수는 scoring_rules (--rules JSON 으로 교체 가능)
 RSI_PERIOD = 14
 TREND_FAST_EMA = 50
 TREND_SLOW_EMA = 200
-VOLUME_SPIKE_MULTIPLIER = 1.5
 ATR_PERIOD = 14
+SIGNAL_FIELDS = ('Close', 'RSI', 'ATR14')  # 신호에 담는 값 (가격, RSI, 손절/목표 계산용 ATR)
+HISTORY_PERIOD = "1y"
+DOWNLOAD_CHUNK_SIZE = 50  # yf.download 한 번에 묶어서 받을 티커 수
+STREAM_CHUNK_SIZE = 200   # --stream 에서 한 번에 받아 분석하고 메모리에서 내려놓는 티커 수
+UNIVERSE_TTL_SECONDS = 12 * 60 * 60  # Top100 구성 종목 캐시 유효 시간
+UNIVERSE_CACHE_FILE = os.path.join(".cache", "universe.json")
+PAGE_VALIDATOR_FILE = os.path.join(".cache", "universe_pages.json")
+KR_PAGE_WORKERS = 4  # 네이버 시총 페이지 동시 요청 수
+LEDGER_MIN_SCORE = 60  # 이 점수 이상이면 가상 매매 장부에 기록
+PREFILTER_MARGIN = 0.02  # 1단계 필터 조건 여유 (상태의 장기 EMA는 전체 이력 기준이라 1년 창 계산과 조금 다름)
 
 FALLBACK_US = {
     'AAPL': 'Apple',
@@ -43,26 +63,114 @@ FALLBACK_KR = {
 }
 
 
-def fetch_us_top100():
+def _make_session():
+    import requests
+
+    session = requests.Session()
+    session.headers.update({"User-Agent": "Mozilla/5.0"})
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=KR_PAGE_WORKERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_http = {}
+_http_lock = threading.Lock()
+_universe_memory = {}  # TTL 안의 Top100 구성 종목 (프로세스 메모리)
+
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") is not None else "html.parser"
+
+
+def http_session():
+    """keep-alive 연결을 스캔 내내 재사용 (처음 필요할 때 한 번 생성)"""
+    with _http_lock:
+        if 'session' not in _http:
+            _http['session'] = _make_session()
+        return _http['session']
+
+
+def _load_json(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def fetch_parsed(url, parse, validators):
+    """
+    ETag/Last-Modified 조건부 요청으로 페이지를 받아 parse(html) 결과를 반환.
+    304(변경 없음)면 지난번 파싱 결과를 그대로 재사용. validators는 {url: {...}} 캐시 dict
+    """
+    cached = validators.get(url)
+    headers = {}
+    if cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+    response = http_session().get(url, headers=headers, timeout=10)
+    if response.status_code == 304 and cached:
+        return cached['parsed']
+    response.raise_for_status()
+
+    parsed = parse(response.text)
+    if response.headers.get('ETag') or response.headers.get('Last-Modified'):
+        validators[url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'parsed': parsed,
+        }
+    return parsed
+
+
+def _parse_us_rows(html):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, HTML_PARSER)
+    rows = []
+    for row in soup.select("table.table tbody tr"):
+        tds = row.select("td")
+        if len(tds) < 3:
+            continue
+        rows.append([tds[2].get_text(strip=True).replace(".", "-"), tds[1].get_text(strip=True)])
+    return rows
+
+
+def _parse_kr_rows(html):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, HTML_PARSER)
+    rows = []
+    for link in soup.select("a.tltle"):
+        match = re.search(r"code=(\d{6})", link.get("href", ""))
+        if match:
+            rows.append([f"{match.group(1)}.KS", link.get_text(strip=True)])
+    return rows
+
+
+def fetch_us_top100(validators=None):
     """
     미국 시가총액 상위 100개 (S&P500 시총 순 정렬 기준) 티커를 수집.
     """
     url = "https://www.slickcharts.com/sp500"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    response = requests.get(url, headers=headers, timeout=10)
-    response.raise_for_status()
-    soup = BeautifulSoup(response.text, "html.parser")
-    rows = soup.select("table.table tbody tr")
+    rows = fetch_parsed(url, _parse_us_rows, validators if validators is not None else {})
     if not rows:
         return None
 
     result = {}
-    for row in rows:
-        tds = row.select("td")
-        if len(tds) < 3:
-            continue
-        name = tds[1].get_text(strip=True)
-        ticker = tds[2].get_text(strip=True).replace(".", "-")
+    for ticker, name in rows:
         if ticker:
             result[ticker] = name
         if len(result) >= 100:
@@ -71,256 +179,491 @@ def fetch_us_top100():
     return result if len(result) >= 100 else None
 
 
-def fetch_kr_top100():
+def fetch_kr_top100(validators=None):
     """
     한국 시가총액 상위 100개 (네이버 금융 KOSPI 시총 순) 티커를 수집.
+    KR_PAGE_WORKERS개 페이지씩 동시에 받아 페이지 순서대로 합친다.
     """
-    headers = {"User-Agent": "Mozilla/5.0"}
+    if validators is None:
+        validators = {}
     result = {}
 
     excluded_keywords = ("ETF", "ETN", "스팩", "SPAC")
 
-    for page in range(1, 21):
+    def fetch_page(page):
         url = f"https://finance.naver.com/sise/sise_market_sum.naver?sosok=0&page={page}"
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, "html.parser")
-        links = soup.select("a.tltle")
-        for link in links:
-            name = link.get_text(strip=True)
-            if any(keyword in name for keyword in excluded_keywords):
-                continue
-            href = link.get("href", "")
-            match = re.search(r"code=(\d{6})", href)
-            if not match:
-                continue
-
-            ticker = f"{match.group(1)}.KS"
-            result[ticker] = name
-            if len(result) >= 100:
-                return result
+        return fetch_parsed(url, _parse_kr_rows, validators)
+
+    pages = list(range(1, 21))
+    with ThreadPoolExecutor(max_workers=KR_PAGE_WORKERS) as pool:
+        for start in range(0, len(pages), KR_PAGE_WORKERS):
+            for rows in pool.map(fetch_page, pages[start:start + KR_PAGE_WORKERS]):
+                for ticker, name in rows:
+                    if any(keyword in name for keyword in excluded_keywords):
+                        continue
+                    result[ticker] = name
+                    if len(result) >= 100:
+                        return result
 
     return result if len(result) >= 100 else None
 
 
-def build_watchlists():
+def build_watchlists(refresh=False):
     """
     동적 Top100 watchlist를 구성하고, 실패 시 fallback 사용.
+    수집에 성공한 목록은 UNIVERSE_TTL_SECONDS 동안 캐시해서 재사용.
+    """
+    now = time.time()
+    if not refresh and now < _universe_memory.get('expires', 0):
+        # 상주 워커처럼 같은 프로세스에서 반복 호출하면 파일도 다시 읽지 않음
+        return _universe_memory['lists']
+    cache = {} if refresh else _load_json(UNIVERSE_CACHE_FILE)
+
+    def is_fresh(market):
+        entry = cache.get(market)
+        return bool(entry) and now - entry.get('fetched_at', 0) < UNIVERSE_TTL_SECONDS
+
+    if is_fresh('kr') and is_fresh('us'):
+        _universe_memory['expires'] = min(cache[m]['fetched_at'] for m in ('kr', 'us')) + UNIVERSE_TTL_SECONDS
+        _universe_memory['lists'] = (cache['kr']['tickers'], cache['us']['tickers'])
+        return _universe_memory['lists']
+
+    validators = _load_json(PAGE_VALIDATOR_FILE)
+    fetchers = {'us': fetch_us_top100, 'kr': fetch_kr_top100}
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = {
+            market: pool.submit(fetch, validators)
+            for market, fetch in fetchers.items() if not is_fresh(market)
+        }
+        for market, future in futures.items():
+            try:
+                dynamic = future.result()
+            except Exception as e:
+                print(f"⚠️ {market.upper()} 유니버스 수집 실패(fallback 사용): {e}")
+                dynamic = None
+            if dynamic:
+                cache[market] = {'fetched_at': now, 'tickers': dynamic}
+
+    _save_json(PAGE_VALIDATOR_FILE, validators)
+    _save_json(UNIVERSE_CACHE_FILE, {k: v for k, v in cache.items() if k in fetchers})
+
+    watchlist_us = (cache['us']['tickers'] if 'us' in cache else None) or FALLBACK_US.copy()
+    watchlist_kr = (cache['kr']['tickers'] if 'kr' in cache else None) or FALLBACK_KR.copy()
+    return watchlist_kr, watchlist_us
+
+def fetch_histories(tickers, period=HISTORY_PERIOD, chunk_size=DOWNLOAD_CHUNK_SIZE):
     """
-    watchlist_us = FALLBACK_US.copy()
-    watchlist_kr = FALLBACK_KR.copy()
+    여러 티커의 OHLCV를 로컬 캐시 + chunk 단위 multi-symbol 다운로드로 받아 티커별 DataFrame으로 분리.
+    반환: (frames, errors) - frames는 {ticker: df}, errors는 {ticker: 실패 사유}
+    """
+    with scan_metrics.stage('fetch'):
+        return ohlcv_cache.get_histories(tickers, period=period, chunk_size=chunk_size)
 
-    try:
-        dynamic_us = fetch_us_top100()
-        if dynamic_us:
-            watchlist_us = dynamic_us
-    except Exception:
-        pass
 
-    try:
-        dynamic_kr = fetch_kr_top100()
-        if dynamic_kr:
-            watchlist_kr = dynamic_kr
-    except Exception:
-        pass
+def report_fetch_errors(errors):
+    """다운로드 단계에서 실패한 티커와 사유를 출력"""
+    if not errors:
+        return
+    print(f"⚠️ 데이터 수집 실패 {len(errors)}건:")
+    for ticker, reason in errors.items():
+        print(f"   - {ticker}: {reason}")
 
-    return watchlist_kr, watchlist_us
 
 def calculate_indicators(df):
     """
     RSI, MACD, Bollinger Bands, EMA, Volume MA, ATR 계산
     """
+    import indicators
+
     if df.empty or len(df) < TREND_SLOW_EMA + 20:
         return None
 
-    # 1. RSI (Relative Strength Index)
-    delta = df['Close'].diff(1)
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
+    close = df['Close'].to_numpy(dtype=float)
+    high = df['High'].to_numpy(dtype=float)
+    low = df['Low'].to_numpy(dtype=float)
 
-    avg_gain = gain.rolling(window=RSI_PERIOD).mean()
-    avg_loss = loss.rolling(window=RSI_PERIOD).mean()
-
-    rs = avg_gain / avg_loss
-    df['RSI'] = 100 - (100 / (1 + rs))
+    # 1. RSI (Relative Strength Index) - 단순평균 RSI
+    df['RSI'] = indicators.rsi_sma(close, RSI_PERIOD)
 
     # 2. MACD (Moving Average Convergence Divergence)
     # EMA(12) - EMA(26)
-    ema12 = df['Close'].ewm(span=12, adjust=False).mean()
-    ema26 = df['Close'].ewm(span=26, adjust=False).mean()
-    df['MACD'] = ema12 - ema26
-    df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
+    df['MACD'], df['Signal_Line'] = indicators.macd(close)
 
     # 3. Bollinger Bands (20일 이동평균, 표준편차 2배)
-    df['MA20'] = df['Close'].rolling(window=20).mean()
-    df['STD20'] = df['Close'].rolling(window=20).std()
-    df['Upper_Band'] = df['MA20'] + (df['STD20'] * 2)
-    df['Lower_Band'] = df['MA20'] - (df['STD20'] * 2)
+    df['MA20'], df['STD20'], df['Upper_Band'], df['Lower_Band'] = indicators.bollinger(close, 20, 2)
 
     # 4. Trend filter / Volume filter
-    df['EMA50'] = df['Close'].ewm(span=TREND_FAST_EMA, adjust=False).mean()
-    df['EMA200'] = df['Close'].ewm(span=TREND_SLOW_EMA, adjust=False).mean()
-    df['Volume_MA20'] = df['Volume'].rolling(window=20).mean()
+    df['EMA50'] = indicators.ewm_mean(close, TREND_FAST_EMA)
+    df['EMA200'] = indicators.ewm_mean(close, TREND_SLOW_EMA)
+    df['Volume_MA20'] = indicators.rolling_mean(df['Volume'].to_numpy(dtype=float), 20)
 
     # 5. ATR(14): 변동성 기반 리스크 관리
-    prev_close = df['Close'].shift(1)
-    tr_components = pd.concat(
-        [
-            (df['High'] - df['Low']).abs(),
-            (df['High'] - prev_close).abs(),
-            (df['Low'] - prev_close).abs(),
-        ],
-        axis=1,
-    )
-    df['TR'] = tr_components.max(axis=1)
-    df['ATR14'] = df['TR'].rolling(window=ATR_PERIOD).mean()
+    df['TR'] = indicators.true_range(high, low, close)
+    df['ATR14'] = indicators.rolling_mean(df['TR'].to_numpy(), ATR_PERIOD)
 
     return df
 
-def analyze_stock(ticker, name, market):
-    """개별 종목 분석 및 신호 포착"""
-    try:
-        stock = yf.Ticker(ticker)
-        df = stock.history(period="1y")
+def _stack(rows, names):
+    """dict 행 목록 -> {이름: 값 목록} (행이 없거나 값이 None 이면 NaN)"""
+    return {name: [float('nan') if row is None or row.get(name) is None else row[name] for row in rows] for name in names}
+
+def score_rows(tickers, names, market, current, previous):
+    """
+    여러 종목의 마지막 봉/전일 봉 지표를 scoring_rules 규칙으로 한 번에 점수화.
+    current/previous: {지표 이름: (N,) 배열}, tickers/names: 길이 N 목록. 반환: 신호 목록 (입력 순서)
+    """
+    import numpy as np
+
+    if not tickers:
+        return []
+    rules = scoring_rules.get_rules()
+    current = {name: np.asarray(current[name], dtype=float) for name in set(rules.fields) | set(SIGNAL_FIELDS)}
+    previous = {name: np.asarray(previous[name], dtype=float) for name in rules.previous_fields}
+    result = rules.evaluate(current, previous)
+    chosen, score = rules.select(result)
+    stop, target = rules.exits(np.maximum(chosen, 0), current['Close'], current['ATR14'])
+    scan_metrics.skip(scan_metrics.SKIP_NAN_INDICATORS, int((~result['valid']).sum()))
+    scan_metrics.skip(scan_metrics.SKIP_NO_SIGNAL, int((result['valid'] & (chosen < 0)).sum()))
 
-        df = calculate_indicators(df)
+    signals = []
+    for j in np.flatnonzero(chosen >= 0):
+        side = chosen[j]
+        signals.append({
+            'ticker': tickers[j],
+            'name': names[j],
+            'market': market,
+            'price': current['Close'][j],
+            'score': score[j].item(),
+            'reasons': rules.reasons(result, side, j, current),
+            'rsi': current['RSI'][j],
+            'atr': current['ATR14'][j],
+            'type': rules.sides[side]['label'],
+            'stop_loss': stop[j],
+            'take_profit_1': target[j],
+        })
+    return signals
+
+def score_setup(ticker, name, market, last_row, prev_row, high_52w):
+    """
+    종목 하나의 마지막 봉/전일 봉 지표 값으로 롱·숏 점수를 매겨 신호를 반환 (신호 없으면 None)
+    last_row, prev_row는 컬럼명으로 값을 꺼낼 수 있는 pandas Series 또는 dict
+    """
+    rules = scoring_rules.get_rules()
+    current = {column: [last_row[column]] for column in set(rules.fields) | set(SIGNAL_FIELDS) if column != 'High_52W'}
+    current['High_52W'] = [high_52w]
+    previous = {column: [prev_row[column]] for column in rules.previous_fields}
+    signals = score_rows([ticker], [name], market, current, previous)
+    return signals[0] if signals else None
+
+def prefilter(watchlist, margin=PREFILTER_MARGIN):
+    """
+    1단계: 저장된 지표 상태 + 최근 며칠 시세 일괄 조회만으로 오늘 신호가 날 수 없는 종목을 걸러냄.
+    상태에 새 봉만 반영(증분)한 뒤 scoring_rules 의 when 조건(정배열 / O'Neil 셋업)을 margin 만큼
+    느슨하게 평가한다. 상태가 없거나 최근 시세와 이어지지 않는 종목은 판단하지 않고 통과시킨다.
+    반환: (통과한 watchlist, 상태를 새로 만들어야 하는 티커 목록)
+    """
+    import quotes
+
+    rules = scoring_rules.get_rules()
+    states = {}
+    for ticker in watchlist:
+        state = indicator_state.load_state(ticker)
+        if state is not None and state.bar_count >= TREND_SLOW_EMA + 20:
+            states[ticker] = state
+    recent, _ = quotes.fetch_recent_frames(states)
+
+    judged, last_rows, prev_rows = [], [], []
+    for ticker, state in states.items():
+        pending = state.pending_bars(recent[ticker]) if ticker in recent else None
+        if pending is None:
+            continue
+        if not indicator_state.is_unchanged(state, pending):
+            indicator_state.feed(state, pending)
+            indicator_state.save_state(ticker, state)
+        else:
+            indicator_state.remember(ticker, state)
+        judged.append(ticker)
+        last_rows.append(state.values())
+        prev_rows.append(state.previous_values() if rules.gate_previous_fields else None)
+
+    reachable = rules.reachable(
+        _stack(last_rows, set(rules.gate_fields) | {'Close'}),
+        _stack(prev_rows, rules.gate_previous_fields),
+        margin,
+    )
+    dropped = {ticker for ticker, ok in zip(judged, reachable) if not ok}
+    survivors = {ticker: name for ticker, name in watchlist.items() if ticker not in dropped}
+    stale = [ticker for ticker in survivors if ticker not in judged]
+    scan_metrics.skip(scan_metrics.SKIP_PREFILTERED, len(dropped))
+    print(f"   1단계 필터: {len(watchlist)}개 중 {len(survivors)}개 통과 (상태로 판단 {len(judged)}개)")
+    return survivors, stale
+
+def seed_states(frames, tickers):
+    """다음 실행의 prefilter 가 쓸 수 있도록 tickers 의 지표 상태를 받아 둔 이력으로 맞춤"""
+    with scan_metrics.stage('indicators'):
+        for ticker in tickers:
+            if ticker in frames:
+                indicator_state.sync_state(ticker, frames[ticker])
+
+def analyze_stock(ticker, name, market, df=None):
+    """개별 종목 분석 및 신호 포착 (df가 없으면 직접 다운로드)"""
+    started = time.perf_counter()
+    try:
         if df is None:
+            with scan_metrics.stage('fetch'):
+                df = ohlcv_cache.get_history(ticker, period=HISTORY_PERIOD)
+        if df.empty:
+            scan_metrics.skip(scan_metrics.SKIP_FETCH_ERROR)
             return None
 
-        # 마지막 데이터 확인
-        last_row = df.iloc[-1]
-        prev_row = df.iloc[-2] # 전일 데이터 (크로스 확인용)
-
-        last_rsi = last_row['RSI']
-        last_macd = last_row['MACD']
-        last_signal = last_row['Signal_Line']
-        last_price = last_row['Close']
-        lower_band = last_row['Lower_Band']
-        upper_band = last_row['Upper_Band']
-        ema50 = last_row['EMA50']
-        ema200 = last_row['EMA200']
-        last_volume = last_row['Volume']
-        volume_ma20 = last_row['Volume_MA20']
-        atr14 = last_row['ATR14']
-
-        if pd.isna(last_rsi) or pd.isna(ema50) or pd.isna(ema200) or pd.isna(volume_ma20) or pd.isna(atr14):
+        with scan_metrics.stage('indicators'):
+            df = calculate_indicators(df)
+        if df is None:
+            scan_metrics.skip(scan_metrics.SKIP_SHORT_HISTORY)
             return None
 
-        high_52w = df['High'].rolling(window=252, min_periods=100).max().iloc[-1]
-
-        score = 0
-        short_score = 0
-        reasons = []
-        short_reasons = []
-
-        # --- 1. 롱(Buy) 포지션 스캔 ---
-        # 상승추세 필터 (정배열)
-        if last_price > ema200 and ema50 > ema200:
-            if last_rsi <= RSI_THRESHOLD_LOW:
-                score += 30
-                reasons.append(f"RSI 과매도({last_rsi:.1f})")
-            elif last_rsi <= 40:
-                score += 10
-                reasons.append(f"RSI 저점({last_rsi:.1f})")
-
-            if prev_row['MACD'] < prev_row['Signal_Line'] and last_macd > last_signal:
-                score += 40
-                reasons.append("MACD 골든크로스(상승전환)")
-            elif last_macd > last_signal:
-                score += 10 # 정배열 유지 중
-
-            if last_price <= lower_band * 1.03:
-                score += 30
-                reasons.append("볼린저밴드 하단 근접(반등기대)")
-
-            if last_volume >= volume_ma20 * VOLUME_SPIKE_MULTIPLIER:
-                score += 15
-                reasons.append(f"거래량 급증({last_volume / volume_ma20:.1f}x)")
-            
-            if last_rsi >= RSI_THRESHOLD_HIGH:
-                score -= 20
-                reasons.append("RSI 과매수(주의)")
-            
-            if last_price >= upper_band * 0.97:
-                 score -= 10
-                 reasons.append("볼린저밴드 상단 근접(저항)")
-
-        # --- 2. 숏(Short) 포지션 스캔 (윌리엄 오닐 기법) ---
-        # 조건: 고점 대비 15% 이상 하락 & 50일선 아래 & 50일선으로 거래량 없이 반등(Pullback)
-        is_former_leader = (last_price < high_52w * 0.85)
-        is_below_50 = last_price < ema50
-        is_pullback_to_50 = (last_price >= ema50 * 0.96) # 50일선 4% 이내로 근접
-        is_low_volume = last_volume < volume_ma20 * 0.8 # 거래량 부진 (가짜 반등)
-
-        if is_former_leader and is_below_50 and is_pullback_to_50:
-            short_score += 40
-            short_reasons.append("50일선 저항/가짜 반등(O'Neil Short)")
-            if is_low_volume:
-                short_score += 20
-                short_reasons.append(f"거래량 부진({last_volume / volume_ma20:.1f}x)")
-            if ema50 < ema200:
-                short_score += 10
-                short_reasons.append("역배열(Death Cross 상태)")
-
-        # 둘 중 더 강한 시그널을 리턴
-        if score >= 40 and score >= short_score:
-            return {
-                'ticker': ticker,
-                'name': name,
-                'market': market,
-                'price': last_price,
-                'score': score,
-                'reasons': reasons,
-                'rsi': last_rsi,
-                'atr': atr14,
-                'type': 'LONG (매수)',
-                'stop_loss': max(last_price - (1.5 * atr14), 0),
-                'take_profit_1': last_price + (2 * atr14),
-            }
-        elif short_score >= 50:
-            return {
-                'ticker': ticker,
-                'name': name,
-                'market': market,
-                'price': last_price,
-                'score': short_score,
-                'reasons': short_reasons,
-                'rsi': last_rsi,
-                'atr': atr14,
-                'type': 'SHORT (공매도)',
-                'stop_loss': last_price + (1.5 * atr14),
-                'take_profit_1': max(last_price - (3 * atr14), 0),
-            }
-        
-        return None
+        with scan_metrics.stage('scoring'):
+            # 마지막 데이터 확인
+            last_row = df.iloc[-1]
+            prev_row = df.iloc[-2] # 전일 데이터 (크로스 확인용)
+            high_52w = df['High'].rolling(window=252, min_periods=100).max().iloc[-1]
+
+            return score_setup(ticker, name, market, last_row, prev_row, high_52w)
 
     except Exception as e:
-        # print(f"Error analyzing {name}: {e}")
+        if ohlcv_cache.is_throttle_error(e):
+            raise  # 병렬 실행기가 백오프 후 재시도
+        scan_metrics.skip(scan_metrics.SKIP_ANALYSIS_ERROR)
+        print(f"⚠️ {name}({ticker}) 분석 실패: {e}")
         return None
+    finally:
+        scan_metrics.ticker_latency(time.perf_counter() - started)
+
+def analyze_stock_measured(ticker, name, market, df):
+    """프로세스 풀용 analyze_stock: (결과, 자식 프로세스 계측값) 반환"""
+    return scan_metrics.measured_call(analyze_stock, ticker, name, market, df)
+
+def scan_concurrently(watchlist, market, workers, rate):
+    """
+    analyze_stock을 제한된 스레드 풀 + 초당 요청 수 제한으로 병렬 실행.
+    결과는 watchlist 순서 그대로라 순차 실행과 같은 신호 목록을 반환.
+    """
+    items = [(ticker, name, market) for ticker, name in watchlist.items()]
+    results, errors = scan_executor.run_scan(analyze_stock, items, max_workers=workers, rate=rate)
+    scan_metrics.skip(scan_metrics.SKIP_FETCH_ERROR, len(errors))  # 재시도 후에도 남은 요청 제한
+    report_fetch_errors({items[i][0]: reason for i, reason in errors.items()})
+    return [result for result in results if result]
+
+def scan_pipelined(watchlist, market, compute_workers=None):
+    """
+    다운로드(스레드)와 지표 계산+점수화(프로세스 풀)를 겹쳐서 실행.
+    결과는 watchlist 순서 그대로라 순차 실행과 같은 신호 목록을 반환.
+    """
+    items = [(ticker, name, market) for ticker, name in watchlist.items()]
+    # --rules 로 바꾼 규칙이 spawn 방식의 계산 프로세스에도 적용되도록 명시적으로 넘김
+    results, errors = scan_pipeline.run_pipeline(
+        items, fetch_histories, analyze_stock_measured, compute_workers=compute_workers,
+        initializer=scoring_rules.set_rules, initargs=(scoring_rules.get_rules(),),
+    )
+    signals = []
+    for measured in results:
+        if measured is None:
+            continue
+        result, raw = measured
+        scan_metrics.merge(raw)
+        if result:
+            signals.append(result)
+    scan_metrics.skip(scan_metrics.SKIP_FETCH_ERROR, len(errors))
+    report_fetch_errors(errors)
+    return signals
+
+def analyze_universe(frames, watchlist, market, compact=False):
+    """
+    watchlist 전 종목의 지표를 indicator_panel로 한 번에 계산하고, 점수도 배열 연산으로 한 번에 매김.
+    종목마다 analyze_stock을 호출한 것과 같은 신호 목록을 반환.
+    compact: 거래량 패널을 float32 로 보관 (indicator_panel.COMPACT_FIELDS)
+    """
+    import indicator_panel
+
+    with scan_metrics.stage('indicators'):
+        tickers, fields, lengths = indicator_panel.build_panel(
+            {ticker: frames[ticker] for ticker in watchlist if ticker in frames},
+            compact=compact,
+        )
+        if not tickers or fields['Close'].shape[0] < TREND_SLOW_EMA + 20:
+            scan_metrics.skip(scan_metrics.SKIP_SHORT_HISTORY, len(tickers))
+            return []
+
+        indicators = indicator_panel.compute_indicators(
+            fields,
+            rsi_period=RSI_PERIOD,
+            fast_ema=TREND_FAST_EMA,
+            slow_ema=TREND_SLOW_EMA,
+            atr_period=ATR_PERIOD,
+        )
+        last_values = indicator_panel.row_values(fields, indicators, -1)
+        prev_values = indicator_panel.row_values(fields, indicators, -2)
+
+    eligible = [j for j in range(len(tickers)) if lengths[j] >= TREND_SLOW_EMA + 20]
+    scan_metrics.skip(scan_metrics.SKIP_SHORT_HISTORY, len(tickers) - len(eligible))
+    started = time.perf_counter()
+    with scan_metrics.stage('scoring'):
+        signals = score_rows(
+            [tickers[j] for j in eligible],
+            [watchlist[tickers[j]] for j in eligible],
+            market,
+            {column: values[eligible] for column, values in last_values.items()},
+            {column: values[eligible] for column, values in prev_values.items()},
+        )
+    # 전 종목을 한 번에 점수화하므로 종목별 지연은 균등 분배한 값
+    elapsed = time.perf_counter() - started
+    for _ in eligible:
+        scan_metrics.ticker_latency(elapsed / len(eligible))
+    return signals
+
+def analyze_incremental(frames, watchlist, market):
+    """
+    저장된 indicator_state를 새 봉만큼 O(1)로 갱신한 뒤 전 종목을 한 번에 점수화.
+    상태가 없거나 과거 가격이 바뀐 종목만 전체 이력으로 다시 계산.
+    """
+    ready, last_rows, prev_rows = [], [], []
+    rebuilt_count = 0
+    for ticker, name in watchlist.items():
+        if ticker not in frames:
+            continue
+        started = time.perf_counter()
+        try:
+            with scan_metrics.stage('indicators'):
+                state, rebuilt = indicator_state.sync_state(ticker, frames[ticker])
+            rebuilt_count += rebuilt
+            if state.bar_count < TREND_SLOW_EMA + 20:
+                scan_metrics.skip(scan_metrics.SKIP_SHORT_HISTORY)
+                continue
+            last_rows.append(state.values())
+            prev_rows.append(state.previous_values())
+            ready.append(ticker)
+        except Exception as e:
+            scan_metrics.skip(scan_metrics.SKIP_ANALYSIS_ERROR)
+            print(f"⚠️ {name}({ticker}) 분석 실패: {e}")
+            continue
+        finally:
+            scan_metrics.ticker_latency(time.perf_counter() - started)
+    print(f"   지표 상태: 증분 갱신 {len(frames) - rebuilt_count}개 / 전체 재계산 {rebuilt_count}개")
+
+    rules = scoring_rules.get_rules()
+    with scan_metrics.stage('scoring'):
+        return score_rows(
+            ready,
+            [watchlist[ticker] for ticker in ready],
+            market,
+            _stack(last_rows, set(rules.fields) | set(SIGNAL_FIELDS)),
+            _stack(prev_rows, rules.previous_fields),
+        )
+
+def stream_signals(watchlist, market, chunk_size=STREAM_CHUNK_SIZE, incremental=False, use_prefilter=False):
+    """
+    watchlist 를 chunk_size 종목씩 받아 분석하고, 신호를 찾는 즉시 하나씩 내보내는 generator.
+    chunk 가 끝나면 그 종목들의 프레임/지표 상태를 메모리에서 내려놓으므로 사용 메모리는
+    유니버스 크기가 아니라 chunk 크기에 비례한다. 점수화에는 마지막 두 봉(+52주 고가)만 남긴다.
+    """
+    tickers = list(watchlist)
+    for start in range(0, len(tickers), chunk_size):
+        chunk = {ticker: watchlist[ticker] for ticker in tickers[start:start + chunk_size]}
+        stale = []
+        if use_prefilter:
+            with scan_metrics.stage('prefilter'):
+                chunk, stale = prefilter(chunk)
+        frames, errors = fetch_histories(chunk.keys())
+        scan_metrics.skip(scan_metrics.SKIP_FETCH_ERROR, sum(1 for t in chunk if t not in frames))
+        report_fetch_errors(errors)
+        if incremental:
+            signals = analyze_incremental(frames, chunk, market)
+        else:
+            if stale:
+                seed_states(frames, stale)
+            signals = analyze_universe(frames, chunk, market, compact=True)
+        del frames
+        ohlcv_cache.forget(chunk)
+        indicator_state.forget(chunk)
+        yield from signals
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Smart Stock Radar - KR/US Top100 스캐너")
+    market_data.add_provider_args(parser)
+    parser.add_argument('--refresh-universe', action='store_true',
+                        help="캐시된 Top100 구성 종목을 무시하고 새로 수집")
+    parser.add_argument('--per-ticker', action='store_true',
+                        help="종목별 다운로드+분석을 스레드 풀에서 병렬 실행 (일괄 다운로드 대신)")
+    parser.add_argument('--workers', type=int, default=scan_executor.DEFAULT_WORKERS,
+                        help="--per-ticker 동시 실행 스레드 수")
+    parser.add_argument('--rate', type=float, default=scan_executor.DEFAULT_RATE,
+                        help="--per-ticker 초당 최대 요청 수")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="다운로드와 지표 계산을 겹쳐서 실행 (계산은 프로세스 풀)")
+    parser.add_argument('--compute-workers', type=int, default=None,
+                        help="--pipeline 계산 프로세스 수 (기본: CPU 코어 수)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="저장된 지표 상태를 새 봉만큼만 갱신 (전체 재계산은 이력 변경 시에만)")
+    parser.add_argument('--stream', action='store_true',
+                        help="유니버스를 chunk 단위로 받아 분석하고 신호를 찾는 즉시 출력 (메모리 사용량이 유니버스 크기와 무관,"
+                             " --per-ticker/--pipeline 대신 사용)")
+    parser.add_argument('--stream-chunk', type=int, default=STREAM_CHUNK_SIZE,
+                        help=f"--stream 에서 한 번에 처리하는 티커 수 (기본: {STREAM_CHUNK_SIZE})")
+    parser.add_argument('--prefilter', action='store_true',
+                        help="지표 상태 + 최근 시세만으로 신호가 날 수 없는 종목을 먼저 제외하고 나머지만 전체 분석"
+                             " (상태는 일괄 다운로드 경로에서 생성)")
+    scoring_rules.add_rules_args(parser)
+    scan_metrics.add_metrics_args(parser)
+    return parser.parse_args(argv)
+
+def scan(args, on_signal=None):
+    """
+    KR/US 유니버스를 스캔해 점수 순 신호 목록을 반환하고, 강한 신호는 가상 매매 장부에 기록.
+    --stream 이면 신호를 찾을 때마다 on_signal(signal) 호출.
+    (공급자 설정은 호출하는 쪽에서 market_data.configure_from_args 로 먼저 해둔다)
+    """
+    analyze = analyze_incremental if args.incremental else analyze_universe
 
-def main():
     print(f"📊 **Smart Stock Radar (Trend + RSI + MACD + Bollinger + ATR)**")
     print(f"Time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("-" * 50)
 
     signals = []
-    watchlist_kr, watchlist_us = build_watchlists()
+    with scan_metrics.stage('universe'):
+        watchlist_kr, watchlist_us = market_data.get_provider().watchlists(
+            lambda: build_watchlists(refresh=args.refresh_universe)
+        )
+    scan_metrics.count('tickers', len(watchlist_kr) + len(watchlist_us))
     print(f"Universe: KR {len(watchlist_kr)}개 / US {len(watchlist_us)}개")
 
-    # 1. 한국 주식 스캔
-    print("🇰🇷 Scanning KOSPI Top100...")
-    for ticker, name in watchlist_kr.items():
-        result = analyze_stock(ticker, name, 'KR')
-        if result:
-            signals.append(result)
-
-    # 2. 미국 주식 스캔
-    print("🇺🇸 Scanning US Top100...")
-    for ticker, name in watchlist_us.items():
-        result = analyze_stock(ticker, name, 'US')
-        if result:
-            signals.append(result)
+    markets = [
+        ("🇰🇷 Scanning KOSPI Top100...", watchlist_kr, 'KR'),
+        ("🇺🇸 Scanning US Top100...", watchlist_us, 'US'),
+    ]
+    for label, watchlist, market in markets:
+        print(label)
+        if args.stream:
+            for signal in stream_signals(watchlist, market, max(1, args.stream_chunk), args.incremental, args.prefilter):
+                signals.append(signal)
+                if on_signal:
+                    on_signal(signal)
+            continue
+        stale = []
+        if args.prefilter:
+            with scan_metrics.stage('prefilter'):
+                watchlist, stale = prefilter(watchlist)
+        if args.per_ticker:
+            signals.extend(scan_concurrently(watchlist, market, args.workers, args.rate))
+            continue
+        if args.pipeline:
+            signals.extend(scan_pipelined(watchlist, market, args.compute_workers))
+            continue
+        frames, errors = fetch_histories(watchlist.keys())
+        scan_metrics.skip(scan_metrics.SKIP_FETCH_ERROR, sum(1 for t in watchlist if t not in frames))
+        report_fetch_errors(errors)
+        if stale and not args.incremental:  # incremental 은 analyze 에서 상태를 맞춤
+            seed_states(frames, stale)
+        signals.extend(analyze(frames, watchlist, market))
 
     print("-" * 50)
     
@@ -328,56 +671,55 @@ def main():
     signals.sort(key=lambda x: x['score'], reverse=True)
 
     # --- 가상 매매(Paper Trading) 기록 로직 ---
+    # 강한 신호는 한 트랜잭션으로 장부에 기록 (하루 1회 제한은 장부의 (date, ticker) 유일 제약)
     today_str = datetime.datetime.now().strftime('%Y-%m-%d')
-    trade_log_file = 'paper_trades.csv'
-    logged_tickers = set()
-    
-    if os.path.exists(trade_log_file):
-        with open(trade_log_file, 'r', encoding='utf-8-sig') as f:
-            reader = csv.reader(f)
-            next(reader, None) # skip header
-            for row in reader:
-                if row and row[0] == today_str:
-                    logged_tickers.add(row[1])
+    strong = [s for s in signals if s['score'] >= LEDGER_MIN_SCORE]
+    if strong:
+        with scan_metrics.stage('ledger'), trade_ledger.open_ledger() as conn:
+            trade_ledger.record_signals(conn, today_str, strong)
+    scan_metrics.count('signals', len(signals))
+    return signals
+
+def print_signal(s):
+    currency = "₩" if s['market'] == 'KR' else "$"
+
+    if "SHORT" in s.get('type', ''):
+        icon = "🩸" if s['score'] >= 60 else "📉"
+    else:
+        icon = "🚀" if s['score'] >= 60 else "👀"
+
+    print(f"{icon} **[{s.get('type', 'LONG')}] {s['name']} ({s['ticker']})**")
+    print(f"   Score: {s['score']}점")
+    if s['market'] == 'KR':
+        print(f"   Price: {currency}{s['price']:,.0f}")
+        print(f"   Risk: ATR14 {s['atr']:.0f} | SL {currency}{s['stop_loss']:,.0f} | TP1 {currency}{s['take_profit_1']:,.0f}")
+    else:
+        print(f"   Price: {currency}{s['price']:,.2f}")
+        print(f"   Risk: ATR14 {s['atr']:.2f} | SL {currency}{s['stop_loss']:,.2f} | TP1 {currency}{s['take_profit_1']:,.2f}")
+    print(f"   Signals: {', '.join(s['reasons'])}")
+    print("")
 
+def print_signals(signals):
     if not signals:
         print("✅ **특이사항 없음** (관망세)")
     else:
         print(f"🚨 **Found {len(signals)} Actionable Setups!**\n")
         
         for s in signals:
-            # 60점 이상 강력 신호는 가상 매매 장부에 기록 (하루 1회 제한)
-            if s['score'] >= 60 and s['ticker'] not in logged_tickers:
-                file_exists = os.path.isfile(trade_log_file)
-                with open(trade_log_file, mode='a', newline='', encoding='utf-8-sig') as f:
-                    writer = csv.writer(f)
-                    if not file_exists:
-                        writer.writerow(['Date', 'Ticker', 'Name', 'Market', 'Type', 'Entry_Price', 'SL', 'TP', 'Score', 'Reasons'])
-                    writer.writerow([
-                        today_str, s['ticker'], s['name'], s['market'], s.get('type', 'LONG'),
-                        round(s['price'], 2), round(s['stop_loss'], 2), round(s['take_profit_1'], 2),
-                        s['score'], " | ".join(s['reasons'])
-                    ])
-
-            currency = "₩" if s['market'] == 'KR' else "$"
-
-            currency = "₩" if s['market'] == 'KR' else "$"
-            
-            if "SHORT" in s.get('type', ''):
-                icon = "🩸" if s['score'] >= 60 else "📉"
-            else:
-                icon = "🚀" if s['score'] >= 60 else "👀"
-            
-            print(f"{icon} **[{s.get('type', 'LONG')}] {s['name']} ({s['ticker']})**")
-            print(f"   Score: {s['score']}점")
-            if s['market'] == 'KR':
-                print(f"   Price: {currency}{s['price']:,.0f}")
-                print(f"   Risk: ATR14 {s['atr']:.0f} | SL {currency}{s['stop_loss']:,.0f} | TP1 {currency}{s['take_profit_1']:,.0f}")
-            else:
-                print(f"   Price: {currency}{s['price']:,.2f}")
-                print(f"   Risk: ATR14 {s['atr']:.2f} | SL {currency}{s['stop_loss']:,.2f} | TP1 {currency}{s['take_profit_1']:,.2f}")
-            print(f"   Signals: {', '.join(s['reasons'])}")
-            print("")
+            print_signal(s)
+
+def main():
+    args = parse_args()
+    market_data.configure_from_args(args)
+    scoring_rules.configure_from_args(args)
+    with scan_metrics.profiled(args.profile):
+        signals = scan(args, on_signal=print_signal if args.stream else None)
+    if args.stream:
+        # 신호는 찾는 즉시 위에 출력했으므로 개수만
+        print(f"🚨 **Found {len(signals)} Actionable Setups!**" if signals else "✅ **특이사항 없음** (관망세)")
+    else:
+        print_signals(signals)
+    scan_metrics.finish(args, 'simple_scanner')
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# 저장소 최상위의 스크립트 모듈(market_data, simple_scanner ...)을 그대로 import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import market_data  # noqa: E402
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """.cache/ 등 상대 경로 파일이 임시 디렉터리에 생기도록 작업 디렉터리를 옮김"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def use_provider():
+    """테스트 안에서 시세 공급자를 바꾸고, 끝나면 원래 공급자로 되돌림"""
+    saved = market_data.get_provider()
+    yield market_data.set_provider
+    market_data.set_provider(saved)
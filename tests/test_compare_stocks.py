@@ -0,0 +1,8 @@
+import compare_stocks
+
+
+def test_prompt_asks_for_every_remaining_candidate():
+    prompt = compare_stocks.build_prompt("...", 30)
+
+    assert "나머지 29개 종목 모두" in prompt
+    assert "[종목명2]" not in prompt and "[종목명3]" not in prompt
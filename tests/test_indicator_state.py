@@ -0,0 +1,42 @@
+import compare_stocks
+import indicator_state
+import market_data
+import ohlcv_cache
+import scan_metrics
+import simple_scanner
+
+TICKERS = ['SYN0001', 'SYN0002', 'SYN0003']
+
+
+def test_scan_rebuilds_checkpoint_seeded_from_shorter_history(workdir, use_provider):
+    use_provider(market_data.SyntheticProvider(seed=0, universe_size=len(TICKERS)))
+    indicator_state.forget(TICKERS)
+
+    # compare_stocks --incremental 이 6mo 이력으로 먼저 상태를 만든 뒤
+    short, _ = ohlcv_cache.get_histories(TICKERS[:2], period=compare_stocks.HISTORY_PERIOD)
+    for ticker in TICKERS[:2]:
+        compare_stocks.summarize(ticker, short[ticker], incremental=True)
+        assert indicator_state.load_state(ticker).bar_count == len(short[ticker])
+
+    # 스캐너의 1y 증분 스캔은 짧은 상태를 다시 계산해야 한다
+    frames, _ = ohlcv_cache.get_histories(TICKERS, period=simple_scanner.HISTORY_PERIOD)
+    scan_metrics.reset()
+    simple_scanner.analyze_incremental(frames, {ticker: ticker for ticker in TICKERS}, 'US')
+
+    for ticker in TICKERS:
+        assert indicator_state.load_state(ticker).bar_count == len(frames[ticker])
+    assert scan_metrics.SKIP_SHORT_HISTORY not in scan_metrics.snapshot()['skips']
+
+
+def test_shorter_history_reuses_longer_checkpoint(workdir, use_provider):
+    use_provider(market_data.SyntheticProvider(seed=0, universe_size=1))
+    ticker = TICKERS[0]
+    indicator_state.forget([ticker])
+
+    full, _ = ohlcv_cache.get_histories([ticker], period=simple_scanner.HISTORY_PERIOD)
+    indicator_state.sync_state(ticker, full[ticker])
+    short, _ = ohlcv_cache.get_histories([ticker], period=compare_stocks.HISTORY_PERIOD)
+    state, rebuilt = indicator_state.sync_state(ticker, short[ticker])
+
+    assert not rebuilt
+    assert state.bar_count == len(full[ticker])
@@ -0,0 +1,158 @@
+"""
+indicators 커널의 골든 테스트: ta 패키지 / pandas rolling·ewm 기준 구현과 같은 값을 내는지 고정.
+(전체 시계열 커널과 마지막 값 커널 모두, NaN 위치까지 비교)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+import market_data
+
+ta = pytest.importorskip('ta')
+
+RTOL = 1e-9
+ATOL = 1e-9
+N_BARS = 300
+
+
+@pytest.fixture(scope='module')
+def df():
+    return market_data.generate_ohlcv('SYN0001', N_BARS, seed=7)
+
+
+@pytest.fixture(scope='module')
+def panel():
+    """indicator_panel 처럼 짧은 이력은 앞쪽이 NaN 인 (T, N) 종가 패널"""
+    columns = []
+    for j, length in enumerate((N_BARS, 260, 120)):
+        close = market_data.generate_ohlcv(f'SYN{j:04d}', length, seed=3)['Close'].to_numpy()
+        columns.append(np.concatenate((np.full(N_BARS - length, np.nan), close)))
+    return np.column_stack(columns)
+
+
+def assert_series_close(actual, expected):
+    expected = np.asarray(expected, dtype=np.float64)
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(actual, expected, rtol=RTOL, atol=ATOL, equal_nan=True)
+
+
+def assert_last_close(actual, expected):
+    if np.isnan(expected):
+        assert np.isnan(actual)
+    else:
+        assert actual == pytest.approx(expected, rel=RTOL, abs=ATOL)
+
+
+# --- ta 패키지 기준 ---
+def test_rsi_ewm_matches_ta(df):
+    expected = ta.momentum.RSIIndicator(df['Close'], window=14).rsi()
+    assert_series_close(indicators.rsi_ewm(df['Close'].to_numpy()), expected)
+    assert_last_close(indicators.last_rsi_ewm(df['Close'].to_numpy()), expected.iloc[-1])
+
+
+def test_stochastic_matches_ta(df):
+    stoch = ta.momentum.StochasticOscillator(
+        high=df['High'], low=df['Low'], close=df['Close'], window=14, smooth_window=3,
+    )
+    high, low, close = (df[c].to_numpy() for c in ('High', 'Low', 'Close'))
+    k, d = indicators.stochastic(high, low, close)
+    assert_series_close(k, stoch.stoch())
+    assert_series_close(d, stoch.stoch_signal())
+
+    last_k, last_d = indicators.last_stochastic(high, low, close)
+    assert_last_close(last_k, stoch.stoch().iloc[-1])
+    assert_last_close(last_d, stoch.stoch_signal().iloc[-1])
+
+
+def test_ichimoku_matches_ta(df):
+    ichimoku = ta.trend.IchimokuIndicator(
+        high=df['High'], low=df['Low'], window1=9, window2=26, window3=52, visual=False,
+    )
+    expected = {
+        'conversion': ichimoku.ichimoku_conversion_line(),
+        'base': ichimoku.ichimoku_base_line(),
+        'span_a': ichimoku.ichimoku_a(),
+        'span_b': ichimoku.ichimoku_b(),
+    }
+    high, low = df['High'].to_numpy(), df['Low'].to_numpy()
+    series = indicators.ichimoku(high, low)
+    last = indicators.last_ichimoku(high, low)
+    for name, values in expected.items():
+        assert_series_close(series[name], values)
+        assert_last_close(last[name], values.iloc[-1])
+
+
+@pytest.mark.parametrize('length', [5, 13, 14, 15, 30])
+def test_last_kernels_on_short_history(df, length):
+    short = df.head(length)
+    high, low, close = (short[c].to_numpy() for c in ('High', 'Low', 'Close'))
+    assert_last_close(indicators.last_rsi_ewm(close), indicators.rsi_ewm(close)[-1])
+    k, d = indicators.stochastic(high, low, close)
+    last_k, last_d = indicators.last_stochastic(high, low, close)
+    assert_last_close(last_k, k[-1])
+    assert_last_close(last_d, d[-1])
+
+
+# --- pandas rolling / ewm 기준 (스캐너·compare 의 예전 pandas 구현) ---
+def test_rsi_sma_matches_pandas(df):
+    delta = df['Close'].diff(1)
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    expected = 100 - (100 / (1 + gain.rolling(window=14).mean() / loss.rolling(window=14).mean()))
+    assert_series_close(indicators.rsi_sma(df['Close'].to_numpy()), expected)
+
+
+@pytest.mark.parametrize('ddof', [1, 0])
+def test_bollinger_matches_pandas(df, ddof):
+    close = df['Close']
+    mid = close.rolling(window=20).mean()
+    std = close.rolling(window=20).std(ddof=ddof)
+    actual = indicators.bollinger(close.to_numpy(), 20, 2, ddof=ddof)
+    for values, expected in zip(actual, (mid, std, mid + std * 2, mid - std * 2)):
+        assert_series_close(values, expected)
+    for value, expected in zip(indicators.last_bollinger(close.to_numpy(), 20, 2, ddof=ddof),
+                               (mid, std, mid + std * 2, mid - std * 2)):
+        assert_last_close(value, expected.iloc[-1])
+
+
+@pytest.mark.parametrize('span', [9, 12, 26, 50, 200])
+def test_ewm_mean_matches_pandas(df, span):
+    close = df['Close']
+    expected = close.ewm(span=span, adjust=False).mean()
+    # 짧은 1차원(행렬 곱 경로)과 긴 1차원(순회 경로) 모두
+    assert_series_close(indicators.ewm_mean(close.to_numpy(), span), expected)
+    long_close = pd.concat([close] * 2, ignore_index=True)
+    assert len(long_close) > indicators.EWM_MATRIX_MAX_LEN
+    assert_series_close(indicators.ewm_mean(long_close.to_numpy(), span),
+                        long_close.ewm(span=span, adjust=False).mean())
+
+
+def test_panel_kernels_match_pandas_per_column(panel):
+    frame = pd.DataFrame(panel)
+    assert_series_close(indicators.ewm_mean(panel, 50), frame.ewm(span=50, adjust=False).mean())
+    assert_series_close(indicators.rolling_mean(panel, 20), frame.rolling(window=20).mean())
+    assert_series_close(indicators.rolling_std(panel, 20), frame.rolling(window=20).std())
+    assert_series_close(indicators.rolling_max(panel, 252, 100),
+                        frame.rolling(window=252, min_periods=100).max())
+    for j in range(panel.shape[1]):
+        assert_series_close(indicators.rsi_sma(panel[:, j]), indicators.rsi_sma(panel)[:, j])
+
+
+def test_macd_and_atr_match_pandas(df):
+    close = df['Close']
+    line = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    macd, signal = indicators.macd(close.to_numpy())
+    assert_series_close(macd, line)
+    assert_series_close(signal, line.ewm(span=9, adjust=False).mean())
+
+    prev_close = close.shift(1)
+    tr = pd.concat([
+        (df['High'] - df['Low']).abs(),
+        (df['High'] - prev_close).abs(),
+        (df['Low'] - prev_close).abs(),
+    ], axis=1).max(axis=1)
+    high, low = df['High'].to_numpy(), df['Low'].to_numpy()
+    assert_series_close(indicators.true_range(high, low, close.to_numpy()), tr)
+    assert_series_close(indicators.atr(high, low, close.to_numpy()), tr.rolling(window=14).mean())
@@ -0,0 +1,158 @@
+import pandas as pd
+import pytest
+
+import market_data
+import ohlcv_cache
+import scan_executor
+import watch
+
+yf = pytest.importorskip('yfinance')
+from yfinance.exceptions import YFRateLimitError  # noqa: E402
+
+
+def _bars(n=3):
+    index = pd.date_range('2026-01-02', periods=n, tz='America/New_York')
+    prices = [100.0 + i for i in range(n)]
+    return pd.DataFrame({
+        'Open': prices, 'High': prices, 'Low': prices, 'Close': prices,
+        'Volume': [1000] * n, 'Dividends': 0.0, 'Stock Splits': 0.0,
+    }, index=index)
+
+
+def fake_history(failures):
+    """yf.Ticker.history 대체: failures[티커] 가 예외면 발생, None 이면 빈 응답, 없으면 정상 일봉"""
+    def history(self, *args, **kwargs):
+        if self.ticker not in failures:
+            return _bars()
+        error = failures[self.ticker]
+        if error is not None:
+            raise error
+        return pd.DataFrame()
+    return history
+
+
+def test_live_download_reports_real_failure_reason(monkeypatch):
+    monkeypatch.setattr(yf.Ticker, 'history', fake_history({
+        'SLOW': TimeoutError("read timed out"),
+        'EMPTY': None,
+    }))
+    frames, errors = market_data.LiveProvider().download(['AAA', 'SLOW', 'EMPTY'], period='5d')
+
+    assert list(frames) == ['AAA']
+    assert errors['SLOW'] == "TimeoutError: read timed out"
+    # 예외 없이 빈 프레임이 온 종목만 일반 사유
+    assert errors['EMPTY'] == market_data.EMPTY_RESPONSE
+
+
+def test_live_download_keeps_frame_recovered_by_probe(monkeypatch):
+    calls = []
+
+    def flaky(self, *args, **kwargs):
+        # 일괄 조회(첫 호출)에서는 비어 있다가 단건 재조회에서 받아지는 종목
+        calls.append(self.ticker)
+        return _bars() if calls.count(self.ticker) > 1 else pd.DataFrame()
+
+    monkeypatch.setattr(yf.Ticker, 'history', flaky)
+    frames, errors = market_data.LiveProvider().download(['AAA'], period='5d')
+
+    assert errors == {}
+    assert len(frames['AAA']) == 3
+
+
+def test_live_download_stops_probing_when_rate_limited(monkeypatch):
+    calls = []
+
+    def limited(self, *args, **kwargs):
+        calls.append(self.ticker)
+        raise YFRateLimitError()
+
+    monkeypatch.setattr(yf.Ticker, 'history', limited)
+    tickers = ['AAA', 'BBB', 'CCC']
+    frames, errors = market_data.LiveProvider().download(tickers, period='5d')
+
+    assert frames == {}
+    assert all(ohlcv_cache.is_throttle_error(errors[t]) for t in tickers)
+    # 일괄 조회 3건 + 단건 재조회는 첫 429 에서 멈춤
+    assert len(calls) == len(tickers) + 1
+
+
+def test_rate_limit_triggers_backoff_and_halves_rate(monkeypatch, workdir, use_provider):
+    use_provider(market_data.LiveProvider())
+    monkeypatch.setattr(yf.Ticker, 'history', fake_history({'AAA': YFRateLimitError()}))
+
+    with pytest.raises(ohlcv_cache.RateLimitError):
+        ohlcv_cache.get_history('AAA', period='1y')
+
+    buckets = []
+    throttle = scan_executor.TokenBucket.throttle
+
+    def spy(bucket):
+        buckets.append(bucket)
+        throttle(bucket)
+
+    monkeypatch.setattr(scan_executor.TokenBucket, 'throttle', spy)
+    results, errors = scan_executor.run_scan(
+        lambda ticker: ohlcv_cache.get_history(ticker, period='1y'),
+        [('AAA',), ('BBB',)], max_workers=1, rate=4.0, max_retries=2, backoff_base=0,
+    )
+
+    assert len(results[1]) == 3
+    assert errors[0].startswith('RateLimitError')
+    assert len(buckets) == 2   # 재시도마다 한 번씩
+    assert buckets[0].rate < buckets[0].max_rate
+
+
+def test_watcher_throttles_on_rate_limited_tickers(monkeypatch, use_provider):
+    use_provider(market_data.LiveProvider())
+    monkeypatch.setattr(yf.Ticker, 'history', fake_history({'BBB': YFRateLimitError()}))
+    watcher = watch.Watcher(emit=lambda event: None, rate=4.0)
+
+    frames, errors = watcher._fetch_chunk(['AAA', 'BBB'])
+
+    assert list(frames) == ['AAA']
+    assert ohlcv_cache.is_throttle_error(errors['BBB'])
+    assert watcher.bucket.rate == 2.0
+
+
+@pytest.mark.parametrize('reason, throttled', [
+    ("YFRateLimitError: Too Many Requests. Rate limited. Try after a while.", True),
+    ("HTTPError: HTTP Error 429: Too Many Requests", True),
+    ("HTTPError: 429 Client Error: for url: https://query2.finance.yahoo.com/v8/finance/chart/AAPL", True),
+    ("status code 429", True),
+    ("rate limit exceeded", True),
+    # 티커 코드/URL 에 든 429 는 요청 제한이 아님
+    ("HTTPError: 404 Client Error: Not Found for url: https://query2.finance.yahoo.com/v8/finance/chart/004290.KS", False),
+    ("possibly delisted; no price data found (period=1y) 004290.KS", False),
+    ("증분 갱신 실패(캐시 사용): 응답에 데이터 없음", False),
+])
+def test_is_throttle_error_ignores_429_inside_symbols(reason, throttled):
+    assert ohlcv_cache.is_throttle_error(reason) is throttled
+
+
+def test_not_found_for_symbol_containing_429_keeps_probing(monkeypatch):
+    url = "https://query2.finance.yahoo.com/v8/finance/chart/004290.KS"
+    monkeypatch.setattr(yf.Ticker, 'history', fake_history({
+        '004290.KS': RuntimeError(f"404 Client Error: Not Found for url: {url}"),
+        'SLOW': TimeoutError("read timed out"),
+    }))
+    frames, errors = market_data.LiveProvider().download(['004290.KS', 'SLOW', 'AAA'], period='5d')
+
+    assert list(frames) == ['AAA']
+    assert not ohlcv_cache.is_throttle_error(errors['004290.KS'])
+    assert errors['SLOW'] == "TimeoutError: read timed out"
+
+
+def test_synthetic_memo_is_bounded_and_thread_safe(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setattr(market_data, 'SYNTHETIC_MEMORY_TICKERS', 4)
+    provider = market_data.SyntheticProvider(seed=1, history_bars=60)
+    tickers = [f'SYN{i:04d}' for i in range(24)] * 8
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        frames = list(pool.map(lambda t: provider.history(t, period='1mo'), tickers))
+
+    assert len(provider._full) <= 4
+    for ticker, df in zip(tickers, frames):
+        expected = market_data.generate_ohlcv(ticker, 60, seed=1).tail(len(df))
+        pd.testing.assert_frame_equal(df, expected)
@@ -0,0 +1,58 @@
+import pandas as pd
+
+import market_data
+import portfolio_tracker
+import trade_ledger
+
+
+def _trades(frames, dates):
+    """frames 첫 티커로 진입한 SHORT 거래들 (SL 은 닿지 않고 TP 는 진입 다음 봉에서 바로 닿음)"""
+    ticker = next(iter(frames))
+    price = float(frames[ticker]['Close'].iloc[0])
+    return pd.DataFrame({
+        'Id': range(1, len(dates) + 1),
+        'Date': dates,
+        'Ticker': ticker,
+        'Name': ticker,
+        'Market': 'US',
+        'Type': 'SHORT (공매도)',
+        'Entry_Price': price,
+        'SL': price * 10,       # 닿지 않음
+        'TP': price * 5,        # 다음 봉에서 바로 닿음
+    })
+
+
+def _frames():
+    return {'SYN0001': market_data.generate_ohlcv('SYN0001', 252, seed=0, end='2025-12-31')}
+
+
+def test_trade_older_than_history_is_not_closed_on_first_bar():
+    frames = _frames()
+    trades = _trades(frames, ['2015-01-02'])
+
+    assert portfolio_tracker.starts_after_entry(trades, frames).tolist() == [True]
+    assert portfolio_tracker.find_trade_exits(trades, frames).empty
+    # watch 처럼 최근 봉만 받은 경우에는 명시적으로 첫 봉부터 탐색
+    assert len(portfolio_tracker.find_trade_exits(trades, frames, from_first_bar=True)) == 1
+
+
+def test_settle_exits_keeps_uncovered_trade_open(monkeypatch, workdir, capsys):
+    frames = _frames()
+    first_date = frames['SYN0001'].index[0].strftime('%Y-%m-%d')
+    covered_date = frames['SYN0001'].index[5].strftime('%Y-%m-%d')
+    price = float(frames['SYN0001']['Close'].iloc[0])
+    signal = {
+        'ticker': 'SYN0001', 'name': 'SYN0001', 'market': 'US', 'type': 'SHORT (공매도)',
+        'price': price, 'stop_loss': price * 10, 'take_profit_1': price * 5, 'score': 70, 'reasons': [],
+    }
+    monkeypatch.setattr(portfolio_tracker.ohlcv_cache, 'get_histories', lambda tickers, period: (frames, {}))
+
+    with trade_ledger.open_ledger(str(workdir / "ledger.db")) as conn:
+        for date in ('2015-01-02', covered_date):
+            trade_ledger.record_signals(conn, date, [signal])
+        closed = portfolio_tracker.settle_exits(conn, trade_ledger.open_trades(conn))
+        still_open = trade_ledger.open_trades(conn)
+
+    assert closed['Date'].tolist() == [covered_date]
+    assert still_open['Date'].tolist() == ['2015-01-02']
+    assert f"진입일(2015-01-02)이 받은 일봉({first_date})보다 앞서" in capsys.readouterr().out
@@ -0,0 +1,31 @@
+import copy
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import market_data
+import scan_pipeline
+import scoring_rules
+import simple_scanner
+
+
+def test_pipeline_workers_use_custom_rules_under_spawn(monkeypatch, use_provider):
+    provider = market_data.SyntheticProvider(seed=0, universe_size=40)
+    use_provider(provider)
+    watchlist, _ = provider.watchlists(simple_scanner.build_watchlists)
+    # spawn 은 부모의 모듈 상태(활성 규칙)를 복사하지 않는다 (macOS 기본 방식)
+    monkeypatch.setattr(scan_pipeline, 'ProcessPoolExecutor', functools.partial(
+        ProcessPoolExecutor, mp_context=multiprocessing.get_context('spawn'),
+    ))
+
+    saved = scoring_rules.get_rules()
+    try:
+        assert simple_scanner.scan_pipelined(watchlist, 'KR', compute_workers=2)
+
+        strict = copy.deepcopy(scoring_rules.DEFAULT_RULES)
+        for side in strict['sides']:
+            side['min_score'] = 1000
+        scoring_rules.set_rules(scoring_rules.RuleSet(strict))
+        assert simple_scanner.scan_pipelined(watchlist, 'KR', compute_workers=2) == []
+    finally:
+        scoring_rules.set_rules(saved)
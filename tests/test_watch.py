@@ -0,0 +1,23 @@
+import asyncio
+
+import watch
+
+
+def test_run_keeps_polling_after_a_failed_poll(workdir):
+    watcher = watch.Watcher(emit=lambda event: None, interval=0)
+    outcomes = iter([OSError("database is locked"), None, None])
+
+    async def flaky_poll():
+        error = next(outcomes)
+        if error:
+            raise error
+        watcher.polls += 1
+        return {'poll': watcher.polls, 'elapsed': 0.0}
+
+    watcher.poll_once = flaky_poll
+    summaries, failures = [], []
+    asyncio.run(watcher.run(iterations=3, report=summaries.append,
+                            on_error=lambda poll, error: failures.append((poll, str(error)))))
+
+    assert failures == [(1, "database is locked")]
+    assert [s['poll'] for s in summaries] == [2, 3]
@@ -0,0 +1,209 @@
+"""
+가상 매매(Paper Trading) 장부 - SQLite.
+- (date, ticker) 유일 제약으로 '하루 1회 기록' 규칙을 DB가 보장 (INSERT OR IGNORE)
+- 스캔 한 번의 강한 신호를 한 트랜잭션으로 일괄 기록
+- status 인덱스로 진행중(OPEN) 포지션만 빠르게 조회
+- 예전 paper_trades.csv 가 있으면 장부를 처음 열 때 한 번만 가져옴
+"""
+
+import argparse
+import contextlib
+import csv
+import os
+import sqlite3
+
+LEDGER_DB = os.environ.get("SIMPLESTOCK_LEDGER_DB", "paper_trades.db")
+LEGACY_CSV = "paper_trades.csv"
+STATUS_OPEN = 'OPEN'
+STATUS_STOP = 'SL'
+STATUS_TARGET = 'TP'
+
+# DataFrame 으로 돌려줄 때는 예전 CSV 헤더와 같은 이름을 사용
+COLUMNS = {
+    'date': 'Date',
+    'ticker': 'Ticker',
+    'name': 'Name',
+    'market': 'Market',
+    'type': 'Type',
+    'entry_price': 'Entry_Price',
+    'sl': 'SL',
+    'tp': 'TP',
+    'score': 'Score',
+    'reasons': 'Reasons',
+    'status': 'Status',
+    'exit_date': 'Exit_Date',
+    'exit_price': 'Exit_Price',
+    'realized_pct': 'Realized_Pct',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    name TEXT,
+    market TEXT,
+    type TEXT NOT NULL DEFAULT 'LONG',
+    entry_price REAL NOT NULL,
+    sl REAL,
+    tp REAL,
+    score INTEGER,
+    reasons TEXT,
+    status TEXT NOT NULL DEFAULT 'OPEN',
+    exit_date TEXT,
+    exit_price REAL,
+    realized_pct REAL,
+    UNIQUE (date, ticker)
+);
+CREATE INDEX IF NOT EXISTS idx_trades_status ON trades (status, date);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def connect(path=None, import_legacy=True):
+    """장부 DB 연결 (스키마 생성 + 예전 CSV 1회 가져오기)"""
+    conn = sqlite3.connect(path or LEDGER_DB)
+    conn.executescript(SCHEMA)
+    if import_legacy and os.path.exists(LEGACY_CSV):
+        done = conn.execute("SELECT value FROM meta WHERE key = 'legacy_csv_imported'").fetchone()
+        if done is None:
+            count = import_csv(conn, LEGACY_CSV)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_csv_imported', ?)",
+                (str(count),),
+            )
+            conn.commit()
+            print(f"📥 {LEGACY_CSV} 에서 가상 매매 기록 {count}건을 장부로 가져왔습니다.")
+    return conn
+
+
+@contextlib.contextmanager
+def open_ledger(path=None):
+    """with 블록이 정상 종료되면 commit, 예외면 rollback 후 연결 종료"""
+    conn = connect(path)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _insert(conn, rows):
+    before = conn.total_changes
+    conn.executemany(
+        """
+        INSERT OR IGNORE INTO trades
+            (date, ticker, name, market, type, entry_price, sl, tp, score, reasons)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+    return conn.total_changes - before
+
+
+def import_csv(conn, csv_path):
+    """paper_trades.csv 형식 파일을 장부에 추가. 이미 있는 (date, ticker)는 건너뜀. 반환: 추가 건수"""
+    with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+        rows = [
+            (
+                row['Date'], row['Ticker'], row.get('Name'), row.get('Market'),
+                row.get('Type') or 'LONG', float(row['Entry_Price']),
+                float(row['SL']) if row.get('SL') else None,
+                float(row['TP']) if row.get('TP') else None,
+                int(float(row['Score'])) if row.get('Score') else None,
+                row.get('Reasons'),
+            )
+            for row in csv.DictReader(f)
+            if row.get('Date') and row.get('Ticker')
+        ]
+    return _insert(conn, rows)
+
+
+def record_signals(conn, date, signals):
+    """
+    스캔 신호(analyze_stock 결과 dict 목록)를 한 번에 기록.
+    같은 날 이미 기록된 티커는 유일 제약으로 무시된다. 반환: 새로 기록된 건수
+    """
+    rows = [
+        (
+            date, s['ticker'], s['name'], s['market'], s.get('type', 'LONG'),
+            round(s['price'], 2), round(s['stop_loss'], 2), round(s['take_profit_1'], 2),
+            s['score'], " | ".join(s['reasons']),
+        )
+        for s in signals
+    ]
+    return _insert(conn, rows)
+
+
+def _query(conn, where="", params=(), order="date, id"):
+    import pandas as pd
+
+    columns = ", ".join(f"{col} AS {alias}" for col, alias in COLUMNS.items())
+    sql = f"SELECT id AS Id, {columns} FROM trades {where} ORDER BY {order}"
+    return pd.read_sql_query(sql, conn, params=params)
+
+
+def open_trades(conn):
+    """진행중(OPEN) 포지션 DataFrame (컬럼명은 예전 CSV 헤더 + Id/Status/Exit_*)"""
+    return _query(conn, "WHERE status = ?", (STATUS_OPEN,))
+
+
+def closed_trades(conn):
+    return _query(conn, "WHERE status != ?", (STATUS_OPEN,))
+
+
+def close_trades(conn, exits):
+    """
+    exits: [(id, status, exit_date, exit_price, realized_pct)]
+    OPEN 상태인 거래만 청산 처리하므로 한 번 청산된 거래는 다시 평가·변경되지 않는다. 반환: 변경 건수
+    """
+    before = conn.total_changes
+    conn.executemany(
+        """
+        UPDATE trades SET status = ?, exit_date = ?, exit_price = ?, realized_pct = ?
+        WHERE id = ? AND status = ?
+        """,
+        [(status, exit_date, exit_price, realized_pct, trade_id, STATUS_OPEN)
+         for trade_id, status, exit_date, exit_price, realized_pct in exits],
+    )
+    return conn.total_changes - before
+
+
+def top_signals(conn, limit, date=None):
+    """date(기본: 가장 최근 기록일)에 기록된 신호를 점수 높은 순으로 limit개"""
+    if date is None:
+        date = conn.execute("SELECT MAX(date) FROM trades").fetchone()[0]
+    return _query(conn, "WHERE date = ?", (date,), order=f"score DESC, id LIMIT {int(limit)}")
+
+
+def all_trades(conn):
+    return _query(conn)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="가상 매매 장부(SQLite) 관리")
+    parser.add_argument('--db', default=LEDGER_DB, help=f"장부 DB 경로 (기본: {LEDGER_DB})")
+    parser.add_argument('--import-csv', metavar='CSV', help="paper_trades.csv 형식 파일을 장부에 추가")
+    parser.add_argument('--export-csv', metavar='CSV', help="장부 전체를 CSV로 내보내기")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    with open_ledger(args.db) as conn:
+        if args.import_csv:
+            count = import_csv(conn, args.import_csv)
+            print(f"📥 {args.import_csv}: {count}건 추가")
+        trades = all_trades(conn)
+        if args.export_csv:
+            trades.to_csv(args.export_csv, index=False, encoding='utf-8-sig')
+            print(f"📤 {len(trades)}건을 {args.export_csv} 로 내보냈습니다.")
+    counts = trades['Status'].value_counts()
+    print(f"📒 장부 {args.db}: 총 {len(trades)}건 " + ", ".join(f"{k} {v}" for k, v in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
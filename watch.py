@@ -0,0 +1,352 @@
+"""
+장중 감시 모드 (asyncio).
+- 감시 대상: 장부의 진행중 포지션 + 가장 최근 스캔 신호 (+ --tickers). 매 주기 장부를 다시 읽어 새로 기록된 것도 포함
+- interval 초마다 최근 며칠 일봉을 chunk 단위 일괄 요청으로 조회 (동시 요청 수 + 초당 요청 수 제한)
+- 포지션: 진입일 이후 봉의 고가/저가가 SL/TP 에 닿으면 이벤트 + 장부에 청산 기록
+  (portfolio_tracker 와 같은 규칙: 갭은 시가 체결, 같은 봉에서 둘 다 닿으면 손절)
+- 모든 감시 종목: 지표 상태(indicator_state)에 최신 봉을 증분 반영해 MACD 크로스가 새로 생기면 이벤트
+  장중 봉은 같은 날짜로 다시 반영되므로, 같은 날 같은 크로스는 한 번만 알린다.
+
+    python3 watch.py --interval 60            # 사람이 읽는 이벤트 출력
+    python3 watch.py --json --tickers NVDA    # 이벤트를 한 줄 JSON 으로 (주기 요약은 stderr)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import indicator_state
+import market_data
+import ohlcv_cache
+import quotes
+import scan_executor
+import trade_ledger
+
+DEFAULT_INTERVAL = 60        # 초
+DEFAULT_CHUNK_SIZE = quotes.CHUNK_SIZE
+DEFAULT_RATE = 2.0           # 초당 일괄 조회 요청 수
+DEFAULT_CONCURRENCY = 4      # 동시에 진행하는 일괄 조회 수
+DEFAULT_SIGNAL_LIMIT = 50    # 감시할 최근 스캔 신호 수
+HISTORY_PERIOD = "1y"        # 지표 상태가 없거나 최근 시세와 끊긴 종목을 다시 계산할 이력
+MACD_MIN_BARS = 26 + 9       # MACD/Signal 이 자리 잡기 전의 크로스는 무시
+
+EVENT_STOP = 'SL_HIT'
+EVENT_TARGET = 'TP_HIT'
+EVENT_GOLDEN = 'MACD_GOLDEN_CROSS'
+EVENT_DEAD = 'MACD_DEAD_CROSS'
+
+
+def macd_cross(state):
+    """상태의 마지막 봉에서 MACD 가 Signal 을 상향 돌파하면 1, 하향 돌파하면 -1, 아니면 0"""
+    if state.bar_count < MACD_MIN_BARS:
+        return 0
+    now = state.values()
+    prev = state.previous_values()
+    if prev is None or None in (now['MACD'], now['Signal_Line'], prev['MACD'], prev['Signal_Line']):
+        return 0
+    if prev['MACD'] < prev['Signal_Line'] and now['MACD'] > now['Signal_Line']:
+        return 1
+    if prev['MACD'] > prev['Signal_Line'] and now['MACD'] < now['Signal_Line']:
+        return -1
+    return 0
+
+
+def format_event(event):
+    """이벤트 한 줄 문장"""
+    currency = "₩" if event.get('market') == 'KR' else "$"
+    label = f"{event.get('name') or event['ticker']} ({event['ticker']})"
+    clock = event['time'][11:19]
+    if event['event'] in (EVENT_STOP, EVENT_TARGET):
+        icon, what = ("🛑", "손절(SL)") if event['event'] == EVENT_STOP else ("🎯", "익절(TP)")
+        sign = "+" if event['realized_pct'] > 0 else ""
+        return (f"{icon} [{clock}] {label} {event['type']} {what} 도달 - 진입 {event['entry_date']}"
+                f" {currency}{event['entry_price']:,.2f} -> {event['exit_date']} {currency}{event['exit_price']:,.2f}"
+                f" (실현 {sign}{event['realized_pct']:.2f}%)")
+    icon, what = ("📈", "MACD 골든크로스") if event['event'] == EVENT_GOLDEN else ("📉", "MACD 데드크로스")
+    return (f"{icon} [{clock}] {label} {what} - {currency}{event['price']:,.2f}"
+            f" (MACD {event['macd']:.3f} / Signal {event['signal']:.3f}, 봉 {event['date'][:10]})")
+
+
+class Watcher:
+    """감시 대상을 주기적으로 일괄 조회해 이벤트를 emit(event) 로 내보냄"""
+
+    def __init__(self, emit, tickers=(), interval=DEFAULT_INTERVAL, chunk_size=DEFAULT_CHUNK_SIZE,
+                 rate=DEFAULT_RATE, concurrency=DEFAULT_CONCURRENCY, signal_limit=DEFAULT_SIGNAL_LIMIT):
+        self.emit = emit
+        self.extra_tickers = list(tickers)
+        self.interval = interval
+        self.chunk_size = max(1, chunk_size)
+        self.concurrency = max(1, concurrency)
+        self.signal_limit = signal_limit
+        self.bucket = scan_executor.TokenBucket(rate)
+        self.announced = set()   # (ticker, 봉 날짜, 이벤트) - 장중 봉이 다시 반영돼도 한 번만 알림
+        self.polls = 0
+
+    # --- 감시 대상 ---
+    def targets(self):
+        """반환: (진행중 포지션 DataFrame 또는 None, 감시 티커 목록, {ticker: (이름, 시장)})"""
+        positions = None
+        info = {}
+        tickers = []
+        if os.path.exists(trade_ledger.LEDGER_DB):
+            with trade_ledger.open_ledger() as conn:
+                positions = trade_ledger.open_trades(conn)
+                signals = trade_ledger.top_signals(conn, self.signal_limit) if self.signal_limit else positions[:0]
+            for frame in (positions, signals):
+                for row in frame[['Ticker', 'Name', 'Market']].itertuples(index=False):
+                    info.setdefault(row.Ticker, (row.Name, row.Market))
+                    tickers.append(row.Ticker)
+        tickers.extend(self.extra_tickers)
+        return positions, list(dict.fromkeys(tickers)), info
+
+    # --- 일괄 조회 ---
+    def _fetch_chunk(self, chunk):
+        """스레드에서 실행: 요청 토큰을 얻은 뒤 chunk 의 최근 일봉을 한 번에 조회"""
+        self.bucket.acquire()
+        try:
+            frames, errors = quotes.fetch_recent_frames(chunk, chunk_size=len(chunk))
+        except Exception as e:
+            if ohlcv_cache.is_throttle_error(e):
+                self.bucket.throttle()  # 다음 주기에 다시 시도
+            return {}, {ticker: f"{type(e).__name__}: {e}" for ticker in chunk}
+        # 요청 제한은 예외가 아니라 종목별 실패 사유로 돌아온다
+        if any(ohlcv_cache.is_throttle_error(reason) for reason in errors.values()):
+            self.bucket.throttle()
+        else:
+            self.bucket.recover()
+        return frames, errors
+
+    async def fetch_recent(self, tickers):
+        """tickers 를 chunk 로 나눠 동시에 최대 concurrency 개씩 조회. 반환: (frames, errors)"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(chunk):
+            async with semaphore:
+                return await asyncio.to_thread(self._fetch_chunk, chunk)
+
+        chunks = [tickers[i:i + self.chunk_size] for i in range(0, len(tickers), self.chunk_size)]
+        frames, errors = {}, {}
+        for chunk_frames, chunk_errors in await asyncio.gather(*(fetch(chunk) for chunk in chunks)):
+            frames.update(chunk_frames)
+            errors.update(chunk_errors)
+        return frames, errors
+
+    # --- 포지션 SL/TP ---
+    def exit_events(self, closed):
+        events = []
+        for row in closed.itertuples(index=False):
+            events.append({
+                'event': EVENT_STOP if row.Status == trade_ledger.STATUS_STOP else EVENT_TARGET,
+                'ticker': row.Ticker,
+                'name': row.Name,
+                'market': row.Market,
+                'type': row.Type,
+                'trade_id': int(row.Id),
+                'entry_date': row.Date,
+                'entry_price': float(row.Entry_Price),
+                'sl': float(row.SL),
+                'tp': float(row.TP),
+                'exit_date': row.Exit_Date,
+                'exit_price': float(row.Exit_Price),
+                'realized_pct': float(row.Realized_Pct),
+            })
+        return events
+
+    def catch_up(self):
+        """시작할 때 한 번: 감시하지 않는 동안 진입일부터 SL/TP 에 닿은 포지션을 전체 일봉으로 정리"""
+        import portfolio_tracker
+
+        if not os.path.exists(trade_ledger.LEDGER_DB):
+            return []
+        with trade_ledger.open_ledger() as conn:
+            closed = portfolio_tracker.settle_exits(conn, trade_ledger.open_trades(conn))
+        return self.exit_events(closed)
+
+    def check_positions(self, positions, frames):
+        import portfolio_tracker
+
+        if positions is None or positions.empty or not frames:
+            return []
+        with trade_ledger.open_ledger() as conn:
+            # 최근 며칠 봉만 받으므로 진입일이 더 오래된 포지션도 받은 첫 봉부터 확인 (이전 봉은 catch_up 에서 확인)
+            closed = portfolio_tracker.record_exits(conn, positions, frames, from_first_bar=True)
+        return self.exit_events(closed)
+
+    # --- 지표 / MACD 크로스 ---
+    def update_states(self, tickers, frames):
+        """
+        최근 봉을 지표 상태에 증분 반영.
+        반환: ({ticker: state}, 상태가 없거나 최근 시세와 이어지지 않아 전체 이력이 필요한 티커 목록)
+        """
+        states, stale = {}, []
+        for ticker in tickers:
+            if ticker not in frames:
+                continue
+            state = indicator_state.load_state(ticker)
+            pending = state.pending_bars(frames[ticker]) if state is not None else None
+            if pending is None:
+                stale.append(ticker)
+                continue
+            if indicator_state.is_unchanged(state, pending):
+                indicator_state.remember(ticker, state)
+            else:
+                indicator_state.feed(state, pending)
+                indicator_state.save_state(ticker, state)
+            states[ticker] = state
+        return states, stale
+
+    def rebuild_states(self, tickers):
+        """스레드에서 실행: 전체 이력을 받아 상태를 다시 만듦. 반환: ({ticker: state}, errors)"""
+        self.bucket.acquire()
+        frames, errors = ohlcv_cache.get_histories(tickers, period=HISTORY_PERIOD)
+        return {ticker: indicator_state.sync_state(ticker, df)[0] for ticker, df in frames.items()}, errors
+
+    def cross_events(self, states, info):
+        events = []
+        for ticker, state in states.items():
+            direction = macd_cross(state)
+            if not direction:
+                continue
+            event = EVENT_GOLDEN if direction > 0 else EVENT_DEAD
+            key = (ticker, state.last_date, event)
+            if key in self.announced:
+                continue
+            self.announced.add(key)
+            values = state.values()
+            name, market = info.get(ticker, (None, 'KR' if ticker.endswith(('.KS', '.KQ')) else 'US'))
+            events.append({
+                'event': event,
+                'ticker': ticker,
+                'name': name,
+                'market': market,
+                'date': state.last_date,
+                'price': values['Close'],
+                'macd': values['MACD'],
+                'signal': values['Signal_Line'],
+            })
+        return events
+
+    # --- 주기 ---
+    def publish(self, events):
+        now = datetime.now().isoformat(timespec='seconds')
+        for event in events:
+            event['time'] = now
+            self.emit(event)
+
+    async def poll_once(self):
+        """한 주기: 조회 -> SL/TP -> 지표 갱신 -> MACD 크로스. 반환: 주기 요약 dict"""
+        started = time.monotonic()
+        positions, tickers, info = self.targets()
+        frames, errors = await self.fetch_recent(tickers)
+        events = self.check_positions(positions, frames)
+
+        states, stale = self.update_states(tickers, frames)
+        if stale:
+            rebuilt, rebuild_errors = await asyncio.to_thread(self.rebuild_states, stale)
+            states.update(rebuilt)
+            errors.update(rebuild_errors)
+        events += self.cross_events(states, info)
+        self.publish(events)
+        self.polls += 1
+        return {
+            'poll': self.polls,
+            'tickers': len(tickers),
+            'positions': 0 if positions is None else len(positions),
+            'rebuilt': len(stale),
+            'events': len(events),
+            'errors': errors,
+            'elapsed': time.monotonic() - started,
+        }
+
+    async def run(self, iterations=None, report=None, on_error=None):
+        """
+        iterations 번(기본: 무한) 감시. report(요약) 는 주기마다 호출.
+        주기 중 예외(장부 읽기/쓰기, 이력 재조회 등)는 on_error(주기 번호, 예외) 로 알리고 다음 주기에 다시 시도
+        (on_error 가 없으면 stderr 에 출력).
+        """
+        on_error = on_error or _print_error
+        try:
+            self.publish(self.catch_up())
+        except Exception as e:
+            on_error(self.polls, e)
+        while True:
+            started = time.monotonic()
+            try:
+                summary = await self.poll_once()
+            except Exception as e:
+                self.polls += 1   # 실패한 주기도 iterations 에 포함
+                on_error(self.polls, e)
+            else:
+                if report:
+                    report(summary)
+            if iterations and self.polls >= iterations:
+                return
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+def _print_error(poll, error):
+    print(f"⚠️ #{poll} 감시 주기 실패 (다음 주기에 다시 시도): {type(error).__name__}: {error}",
+          file=sys.stderr, flush=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="진행중 포지션 SL/TP · 신호 종목 MACD 크로스 장중 감시")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help="조회 주기(초)")
+    parser.add_argument('--tickers', nargs='*', default=[], help="장부 외에 추가로 감시할 티커")
+    parser.add_argument('--signals', type=int, default=DEFAULT_SIGNAL_LIMIT,
+                        help="감시할 최근 스캔 신호 수 (0: 신호는 감시하지 않음)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="일괄 조회 한 번에 묶는 티커 수")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="초당 최대 일괄 조회 요청 수")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="동시에 진행하는 일괄 조회 수")
+    parser.add_argument('--iterations', type=int, default=0, help="이 횟수만큼 조회하고 종료 (0: 계속)")
+    parser.add_argument('--json', action='store_true', help="이벤트를 한 줄 JSON 으로 stdout 에 출력 (주기 요약은 stderr)")
+    market_data.add_provider_args(parser)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    market_data.configure_from_args(args)
+
+    if args.json:
+        def emit(event):
+            print(json.dumps(event, ensure_ascii=False, default=str), flush=True)
+        log = sys.stderr
+    else:
+        def emit(event):
+            print(format_event(event), flush=True)
+        log = sys.stdout
+
+    def report(summary):
+        failed = f" / 조회 실패 {len(summary['errors'])}" if summary['errors'] else ""
+        print(f"⏱️ [{datetime.now().strftime('%H:%M:%S')}] #{summary['poll']} 감시 {summary['tickers']}종목"
+              f" (포지션 {summary['positions']}, 이력 재계산 {summary['rebuilt']}){failed}"
+              f" / 이벤트 {summary['events']} / {summary['elapsed']:.2f}s", file=log, flush=True)
+
+    def on_error(poll, error):
+        print(f"⚠️ [{datetime.now().strftime('%H:%M:%S')}] #{poll} 감시 주기 실패 (다음 주기에 다시 시도):"
+              f" {type(error).__name__}: {error}", file=log, flush=True)
+
+    watcher = Watcher(
+        emit,
+        tickers=[t.upper() for t in args.tickers],
+        interval=args.interval,
+        chunk_size=args.chunk_size,
+        rate=args.rate,
+        concurrency=args.concurrency,
+        signal_limit=args.signals,
+    )
+    print(f"👀 감시 시작: {args.interval:g}초 주기, 일괄 조회 {watcher.chunk_size}종목씩"
+          f" (초당 {args.rate:g}회, 동시 {watcher.concurrency}개)", file=log, flush=True)
+    try:
+        asyncio.run(watcher.run(iterations=args.iterations or None, report=report, on_error=on_error))
+    except KeyboardInterrupt:
+        print("👋 감시 종료", file=log)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Node(python-shell)에서 띄워 두고 계속 쓰는 상주 워커.
+stdin 으로 한 줄에 JSON 요청 하나를 받고, stdout 으로 한 줄에 JSON 응답 하나를 돌려준다.
+
+요청: {"id": 1, "op": "scan", "args": ["--incremental"]}
+  - op: scan / compare / committee / portfolio / stats / ping / shutdown
+  - args: 각 스크립트 CLI 와 같은 인자 목록 (simple_scanner, compare_stocks,
+          ai_investment_committee_cli, portfolio_tracker 의 parse_args 로 해석)
+응답: {"id": 1, "op": "scan", "ok": true, "result": ..., "log": "작업 중 출력", "elapsed": 1.23,
+       "metrics": {단계별 시간 / 종목 지연 백분위수 / 제외 사유 - scan_metrics.snapshot()}}
+      실패 시 "ok": false, "error": "사유"
+
+인터프리터 시작과 pandas/yfinance import 는 한 번만 하고, 요청 사이에 다음을 메모리에 유지한다.
+  - Top100 유니버스 (simple_scanner, TTL 안에서는 파일도 다시 읽지 않음)
+  - OHLCV 캐시 프레임/인덱스 (ohlcv_cache, 파일 mtime 이 같으면 재사용)
+  - 지표 상태 (indicator_state, 직전에 저장한 객체 재사용)
+  - HTTP keep-alive 세션
+
+Node 쪽 예시:
+    const { PythonShell } = require('python-shell');
+    const worker = new PythonShell('worker.py', { mode: 'json' });
+    worker.on('message', (res) => console.log(res.id, res.ok, res.result));
+    worker.send({ id: 1, op: 'scan', args: ['--incremental'] });
+
+작업 중 print 는 응답의 log 로 모으고, 그 밖의 출력(경고 등)은 stderr 로 보내서
+stdout 에는 응답 JSON 만 나가도록 한다.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import ai_investment_committee_cli
+import compare_stocks
+import gemini_cache
+import indicator_state
+import market_data
+import ohlcv_cache
+import portfolio_tracker
+import scan_metrics
+import scoring_rules
+import simple_scanner
+
+PROVIDER_KEYS = ('provider', 'data_dir', 'seed', 'universe_size')
+
+
+class RequestError(Exception):
+    """요청 내용이 잘못되었을 때 (응답의 error 로 전달)"""
+
+
+def _jsonable(value):
+    """numpy/pandas 값을 JSON 으로 바꿀 수 있는 형태로 (NaN/inf 는 null - JS JSON.parse 호환)"""
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, pd.DataFrame):
+        return _jsonable(value.to_dict(orient='records'))
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, np.ndarray):
+        return _jsonable(value.tolist())
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+class Worker:
+    def __init__(self, base_argv):
+        self.base_argv = list(base_argv)   # 공급자 옵션 - 요청 args 앞에 붙여서 요청마다 덮어쓸 수 있음
+        self.provider_key = None
+        self.started = time.time()
+        self.requests = 0
+        self.operations = {
+            'scan': self.scan,
+            'compare': self.compare,
+            'committee': self.committee,
+            'portfolio': self.portfolio,
+            'stats': self.stats,
+            'ping': self.ping,
+            'shutdown': self.ping,
+        }
+
+    def _parse(self, parse_args, argv):
+        if not isinstance(argv, list) or not all(isinstance(a, str) for a in argv):
+            raise RequestError("args 는 문자열 목록이어야 합니다")
+        try:
+            args = parse_args(self.base_argv + argv)
+        except SystemExit:
+            raise RequestError(f"인자 해석 실패: {' '.join(argv)}") from None
+        self._configure_provider(args)
+        return args
+
+    def _configure_provider(self, args):
+        """공급자 설정이 바뀐 경우에만 새로 만듦 (같으면 기존 공급자를 계속 사용)"""
+        key = tuple(getattr(args, name) for name in PROVIDER_KEYS)
+        if key != self.provider_key:
+            market_data.configure_from_args(args)
+            self.provider_key = key
+
+    def scan(self, argv):
+        args = self._parse(simple_scanner.parse_args, argv)
+        scoring_rules.configure_from_args(args)
+        return simple_scanner.scan(args)
+
+    def compare(self, argv):
+        args = self._parse(compare_stocks.parse_args, argv)
+        gemini_cache.configure_from_args(args)
+        tickers = compare_stocks.resolve_tickers(args)
+        if len(tickers) < 2:
+            raise RequestError("compare 에는 티커가 2개 이상 필요합니다")
+        return compare_stocks.compare(tickers, args)
+
+    def committee(self, argv):
+        args = self._parse(ai_investment_committee_cli.parse_args, argv)
+        gemini_cache.configure_from_args(args)
+        tickers = ai_investment_committee_cli.resolve_tickers(args)
+        if not tickers:
+            raise RequestError("committee 에는 티커가 필요합니다 (워커는 입력 프롬프트를 쓰지 않음)")
+        if ai_investment_committee_cli.is_batch(args, tickers):
+            outcomes = ai_investment_committee_cli.analyze_many(tickers, args)
+            return {
+                ticker: {'status': status, 'seconds': round(elapsed, 3), 'detail': detail}
+                for ticker, (status, elapsed, detail) in outcomes.items()
+            }
+        return ai_investment_committee_cli.analyze_one(tickers[0], args)
+
+    def portfolio(self, argv):
+        self._parse(portfolio_tracker.parse_args, argv)
+        checked = portfolio_tracker.check_portfolio()
+        if checked is None:
+            return None
+        closed, positions = checked
+        return {'closed': closed, 'open': positions}
+
+    def stats(self, argv):
+        return {
+            'ohlcv_frames': len(ohlcv_cache._frame_memory),
+            'indicator_states': len(indicator_state._memory),
+            'universe_cached': bool(simple_scanner._universe_memory),
+            'gemini_cache': dict(gemini_cache.STATS),
+        }
+
+    def ping(self, argv):
+        return {'pid': os.getpid(), 'uptime': round(time.time() - self.started, 3), 'requests': self.requests}
+
+    def handle(self, line):
+        """요청 한 줄 -> 응답 dict"""
+        started = time.time()
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return {'id': None, 'ok': False, 'error': f"JSON 해석 실패: {e}"}
+        if not isinstance(request, dict):
+            return {'id': None, 'ok': False, 'error': "요청은 JSON 객체여야 합니다"}
+
+        op = request.get('op')
+        response = {'id': request.get('id'), 'op': op}
+        operation = self.operations.get(op)
+        if operation is None:
+            response.update(ok=False, error=f"알 수 없는 op: {op}")
+            return response
+
+        self.requests += 1
+        log = io.StringIO()
+        scan_metrics.reset()
+        try:
+            with contextlib.redirect_stdout(log):
+                result = operation(request.get('args', []))
+            response.update(ok=True, result=_jsonable(result))
+        except RequestError as e:
+            response.update(ok=False, error=str(e))
+        except Exception as e:
+            response.update(ok=False, error=f"{type(e).__name__}: {e}")
+        response.update(log=log.getvalue(), elapsed=round(time.time() - started, 3), metrics=scan_metrics.snapshot())
+        return response
+
+
+def serve(worker, stdin, stdout):
+    """EOF 또는 shutdown 요청까지 요청을 순서대로 처리"""
+    for line in iter(stdin.readline, ''):
+        if not line.strip():
+            continue
+        response = worker.handle(line)
+        stdout.write(json.dumps(response, ensure_ascii=False, default=str) + "\n")
+        stdout.flush()
+        if response.get('op') == 'shutdown' and response['ok']:
+            return
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="JSON-lines 상주 워커 (stdin 요청 / stdout 응답)")
+    market_data.add_provider_args(parser)
+    args = parser.parse_args(argv)
+    return args, argv if argv is not None else sys.argv[1:]
+
+
+def main():
+    _, provider_argv = parse_args()
+    protocol = sys.stdout
+    sys.stdout = sys.stderr  # 요청 밖의 출력(스레드 경고 등)이 응답 줄에 섞이지 않도록
+    serve(Worker(provider_argv), sys.stdin, protocol)
+
+
+if __name__ == "__main__":
+    main()